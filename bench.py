@@ -0,0 +1,449 @@
+"""
+gg-lead: วัดประสิทธิภาพการค้นหา การแปลงข้อมูล และการส่งออกไฟล์ด้วยผลลัพธ์ SerpApi ที่บันทึกไว้
+
+เล่นซ้ำผลลัพธ์ google_maps จาก fixture (รูปแบบเดียวกับ fixture_server.py) ผ่านขั้นตอนจริงของระบบ
+พร้อมหน่วงเวลาเครือข่ายจำลอง แล้วรายงาน throughput, latency p50/p95 และหน่วยความจำสูงสุด
+ของแต่ละขั้นตอนที่แต่ละขนาดข้อมูล ไม่เรียก SerpApi จริงและไม่ใช้ credit
+
+ขั้นตอนที่วัด:
+    search    BusinessSearcher.search_businesses (ทุกหน้าพร้อมกัน ผ่าน retry / circuit breaker / key pool)
+    extract   BusinessSearcher.extract_business_info ทีละรายการ
+    frame     FrameBuffer.append ทีละหน้า แล้วสร้างตารางครั้งเดียว (to_frame)
+    normalize normalize_frame (เบอร์โทร E.164 และแยกที่อยู่ ด้วย AddressIndex ใหม่ที่ยังไม่มีผลที่จำไว้)
+    csv       build_export(df, "csv")
+    xlsx      build_export(df, "xlsx")
+
+เมื่อวัดขั้นตอน search จะตรวจด้วยว่าการค้นหาที่ได้ผลลัพธ์หน้าเดียว (ไม่มีหน้าถัดไป) ใช้ SerpApi เพียงหนึ่ง credit
+(exit code 1 หากใช้มากกว่านั้น)
+
+ตัวอย่าง:
+    python bench.py --save benchmarks/baseline.json
+    python bench.py --latency 80 --jitter 0.5 --compare benchmarks/baseline.json
+    python bench.py --scales 20,1000 --stages extract,frame,csv --fixtures fixtures/google_maps
+"""
+import argparse
+import gc
+import glob
+import json
+import math
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from business_search import MAX_PAGES, PAGE_SIZE, BusinessSearcher
+from exports import build_export
+from extraction import FrameBuffer
+from key_pool import KeyPool
+from normalization import AddressIndex, normalize_frame
+
+
+STAGES = ("search", "extract", "frame", "normalize", "csv", "xlsx")
+DEFAULT_SCALES = (20, 1000, 100000)
+
+# exit code
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+EXIT_USAGE = 2
+
+
+def synthetic_page(page, size=PAGE_SIZE):
+    """
+    หน้าผลลัพธ์ google_maps จำลอง (ใช้เมื่อไม่มี fixture ที่บันทึกไว้) มีฟิลด์ครบเหมือนผลลัพธ์จริง
+
+    Args:
+        page (int): ลำดับหน้า (ใช้สร้างข้อมูลที่ต่างกัน)
+        size (int): จำนวนรายการในหน้า
+
+    Returns:
+        dict: ผลลัพธ์ในรูปแบบเดียวกับ SerpApi
+    """
+    rnd = random.Random(page)
+    types = ["ร้านกาแฟ", "ร้านอาหาร", "โรงแรม", "คลินิกทันตกรรม", "ร้านเสริมสวย"]
+    local_results = []
+    for i in range(size):
+        number = page * size + i
+        local_results.append({
+            "position": i + 1,
+            "title": f"{rnd.choice(types)} สาขา {number}",
+            "place_id": f"ChIJbench{number:08d}",
+            "data_id": f"0x30e29e{number:010x}:0x{number:016x}",
+            "gps_coordinates": {"latitude": 13.5 + rnd.random(), "longitude": 100.2 + rnd.random()},
+            "rating": round(rnd.uniform(3.0, 5.0), 1),
+            "reviews": rnd.randint(0, 5000),
+            "price": rnd.choice(["฿", "฿฿", "฿฿฿", None]),
+            "type": rnd.choice(types),
+            "types": types[:3],
+            "address": f"{number} ถนนสุขุมวิท แขวงคลองเตย เขตคลองเตย กรุงเทพมหานคร 10110",
+            "open_state": "เปิดอยู่ ⋅ ปิด 20:00",
+            "hours": "เปิดอยู่ ⋅ ปิด 20:00",
+            "operating_hours": {day: "08:00–20:00" for day in ("monday", "tuesday", "wednesday")},
+            "phone": None if number % 4 == 0 else f"02 {rnd.randint(100, 999)} {rnd.randint(1000, 9999)}",
+            "website": None if number % 3 == 0 else f"https://shop{number}.example.co.th/",
+            "description": "ร้านบรรยากาศดี มีที่จอดรถ",
+            "snippet": f"ติดต่อ shop{number}@mail.co.th" if number % 5 == 0 else "บริการดี ราคาเป็นกันเอง",
+            "service_options": {"dine_in": True, "takeout": True, "delivery": number % 2 == 0},
+            "thumbnail": f"https://lh5.googleusercontent.com/p/bench{number}=w80-h106-k-no",
+        })
+    return {
+        "search_metadata": {"status": "Success"},
+        "local_results": local_results,
+        "serpapi_pagination": {"next": "https://serpapi.com/search.json?start=20"},
+    }
+
+
+def load_fixture_pages(directory):
+    """
+    อ่านหน้าผลลัพธ์ google_maps ที่บันทึกไว้ (ไฟล์ .json ที่มี local_results)
+
+    Returns:
+        list: เนื้อหา JSON ของแต่ละหน้า (bytes) ตามชื่อไฟล์
+    """
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, "rb") as handle:
+            data = handle.read()
+        payload = json.loads(data)
+        if payload.get("local_results"):
+            # ให้มีหน้าถัดไปเสมอ เพื่อให้การค้นหาดึงครบทุกหน้า
+            payload.setdefault("serpapi_pagination", {"next": "bench"})
+            pages.append(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    return pages
+
+
+class ReplayTransport:
+    """
+    ชั้นเชื่อมต่อจำลองที่ตอบด้วยหน้าผลลัพธ์ที่บันทึกไว้ หลังหน่วงเวลาตามที่กำหนด
+
+    แต่ละคำขอ parse JSON ใหม่ (เหมือนรับจากเครือข่าย) และเปลี่ยน place_id / data_id ให้ไม่ซ้ำ
+    เพื่อไม่ให้ถูกตัดเป็นรายการซ้ำเมื่อใช้ fixture ชุดเดิมหลายหน้า
+    """
+
+    def __init__(self, pages, latency=0.0, jitter=0.0, seed=0):
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._random = random.Random(seed)
+        # หน้าของการค้นหาเดียวกันถูกดึงพร้อมกันหลาย thread
+        self._lock = threading.Lock()
+
+    def get_json(self, params, path="/search.json"):
+        with self._lock:
+            number = self.requests
+            self.requests += 1
+            delay = self.latency + self._random.uniform(-1, 1) * self.latency * self.jitter
+        if delay > 0:
+            time.sleep(delay)
+
+        payload = json.loads(self.pages[number % len(self.pages)])
+        for i, result in enumerate(payload["local_results"]):
+            result["place_id"] = f"{result.get('place_id')}#{number}.{i}"
+            result["data_id"] = f"{result.get('data_id')}#{number}.{i}"
+        return payload
+
+    def close(self):
+        pass
+
+
+def replay_records(pages, count):
+    """
+    ผลลัพธ์ดิบจำนวน count รายการจาก fixture (วนซ้ำหน้าโดยเปลี่ยน place_id ให้ไม่ซ้ำ)
+
+    Returns:
+        list: หน้าผลลัพธ์ (list ของ local_results) รวมกันได้ count รายการ
+    """
+    transport = ReplayTransport(pages)
+    result_pages = []
+    remaining = count
+    while remaining > 0:
+        local_results = transport.get_json({})["local_results"][:remaining]
+        result_pages.append(local_results)
+        remaining -= len(local_results)
+    return result_pages
+
+
+def percentile(samples, fraction):
+    """percentile แบบ nearest-rank ของ samples"""
+    ordered = sorted(samples)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def _searcher(transport):
+    # key pool ที่ไม่จำกัดอัตรา เพื่อวัดเฉพาะเวลาของระบบและเครือข่ายจำลอง
+    key_pool = KeyPool(["bench"], rate=1e9, burst=10 ** 9)
+    return BusinessSearcher("bench", transport=transport, key_pool=key_pool)
+
+
+def _bench_search(pages, scale, latency, jitter):
+    searcher = _searcher(ReplayTransport(pages, latency, jitter))
+
+    per_search = PAGE_SIZE * MAX_PAGES
+    samples = []
+    processed = 0
+    while processed < scale:
+        started = time.perf_counter()
+        df = searcher.search_businesses("ร้านกาแฟ", "กรุงเทพมหานคร", min(per_search, scale - processed),
+                                        use_cache=False, raise_errors=True)
+        samples.append(time.perf_counter() - started)
+        processed += len(df)
+    return processed, samples
+
+
+def check_search_credits(pages):
+    """
+    ตรวจว่าการค้นหาที่ได้ผลลัพธ์หน้าเดียว (ไม่มีหน้าถัดไป) เรียก SerpApi เพียงครั้งเดียว
+
+    Returns:
+        list: ข้อความของการตรวจที่ไม่ผ่าน
+    """
+    last_page = json.loads(pages[0])
+    last_page.pop("serpapi_pagination", None)
+    transport = ReplayTransport([json.dumps(last_page, ensure_ascii=False).encode("utf-8")])
+    _searcher(transport).search_businesses("ร้านกาแฟ", "กรุงเทพมหานคร", PAGE_SIZE * MAX_PAGES, use_cache=False)
+    if transport.requests != 1:
+        return [f"ผลลัพธ์หน้าเดียวใช้ {transport.requests} credit (ควรเป็น 1)"]
+    return []
+
+
+def _bench_extract(pages, result_pages):
+    extract = _searcher(ReplayTransport(pages)).extract_business_info
+    samples = []
+    for local_results in result_pages:
+        for result in local_results:
+            started = time.perf_counter()
+            extract(result)
+            samples.append(time.perf_counter() - started)
+    return len(samples), samples
+
+
+def _build_frame(result_pages):
+    buffer = FrameBuffer()
+    for local_results in result_pages:
+        buffer.append(local_results)
+    return buffer.to_frame()
+
+
+def _bench_frame(result_pages):
+    samples = []
+    buffer = FrameBuffer()
+    for local_results in result_pages:
+        started = time.perf_counter()
+        buffer.append(local_results)
+        samples.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    df = buffer.to_frame()
+    samples.append(time.perf_counter() - started)
+    return len(df), samples
+
+
+def _bench_normalize(df):
+    started = time.perf_counter()
+    normalize_frame(df, AddressIndex())
+    return len(df), [time.perf_counter() - started]
+
+
+def _bench_export(df, fmt):
+    started = time.perf_counter()
+    build_export(df, fmt)
+    return len(df), [time.perf_counter() - started]
+
+
+def measure(func, memory=True):
+    """
+    วัดเวลาของ func หนึ่งรอบ และหน่วยความจำสูงสุดอีกหนึ่งรอบ (แยกรอบกัน เพราะ tracemalloc ทำให้ช้าลง)
+
+    Args:
+        func (callable): func(timed) คืน (จำนวนรายการ, เวลาของแต่ละ operation เป็นวินาที)
+            timed เป็น False ในรอบวัดหน่วยความจำ (เช่น ไม่ต้องหน่วงเวลาเครือข่าย)
+        memory (bool): วัดหน่วยความจำสูงสุดหรือไม่
+
+    Returns:
+        dict: records, seconds, throughput, p50_ms, p95_ms, ops, peak_mb
+    """
+    gc.collect()
+    started = time.perf_counter()
+    records, samples = func(True)
+    seconds = time.perf_counter() - started
+
+    peak_mb = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func(False)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mb = round(peak / (1024 * 1024), 2)
+
+    return {
+        "records": records,
+        "seconds": round(seconds, 4),
+        "throughput": round(records / seconds, 1) if seconds else None,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 4),
+        "ops": len(samples),
+        "peak_mb": peak_mb,
+    }
+
+
+def run_benchmarks(pages, scales, stages, latency=0.0, jitter=0.0, memory=True, log=print):
+    """
+    วัดทุกขั้นตอนที่เลือกที่ทุกขนาดข้อมูล
+
+    Args:
+        pages (list): หน้าผลลัพธ์ google_maps (bytes) ที่ใช้เล่นซ้ำ
+        scales (list): จำนวนรายการที่ใช้วัด
+        stages (list): ขั้นตอนที่วัด (ดู STAGES)
+        latency (float): เวลาหน่วงต่อคำขอ SerpApi (วินาที)
+        jitter (float): สัดส่วนความแปรปรวนของเวลาหน่วง (0.5 คือ ±50%)
+        memory (bool): วัดหน่วยความจำสูงสุดด้วยหรือไม่
+        log (callable): ฟังก์ชันแสดงความคืบหน้า
+
+    Returns:
+        dict: "<ขั้นตอน>@<ขนาด>" -> ผลการวัด
+    """
+    results = {}
+    for scale in scales:
+        result_pages = replay_records(pages, scale)
+        df = _build_frame(result_pages)
+
+        benches = {
+            "search": lambda timed: _bench_search(pages, scale, latency if timed else 0.0, jitter),
+            "extract": lambda timed: _bench_extract(pages, result_pages),
+            "frame": lambda timed: _bench_frame(result_pages),
+            "normalize": lambda timed: _bench_normalize(df),
+            "csv": lambda timed: _bench_export(df, "csv"),
+            "xlsx": lambda timed: _bench_export(df, "xlsx"),
+        }
+        for stage in stages:
+            log(f"วัด {stage} ที่ {scale:,} รายการ...")
+            results[f"{stage}@{scale}"] = {"stage": stage, "scale": scale, **measure(benches[stage], memory)}
+
+        del result_pages, df
+    return results
+
+
+def compare(current, baseline, threshold):
+    """
+    เปรียบเทียบผลการวัดกับ baseline
+
+    Args:
+        current (dict): ผลการวัดครั้งนี้ (จาก run_benchmarks)
+        baseline (dict): ผลการวัดที่บันทึกไว้
+        threshold (float): สัดส่วนที่ถือว่าช้าลง/ใช้หน่วยความจำมากขึ้น (0.1 คือ 10%)
+
+    Returns:
+        tuple: (ตารางเปรียบเทียบ, รายการที่แย่ลงเกิน threshold)
+    """
+    rows = []
+    regressions = []
+    for key, result in current.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        row = {"รายการ": key}
+        for metric in ("seconds", "p95_ms", "peak_mb"):
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                row[metric] = None
+                continue
+            change = (new - old) / old
+            row[metric] = f"{change:+.1%}"
+            if change > threshold:
+                regressions.append(f"{key} {metric} {old:g} -> {new:g} ({change:+.1%})")
+        rows.append(row)
+    return pd.DataFrame(rows), regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="gg-lead-bench", description="วัดประสิทธิภาพด้วยผลลัพธ์ SerpApi ที่บันทึกไว้")
+    parser.add_argument("--fixtures", default="fixtures/google_maps",
+                        help="โฟลเดอร์ fixture ของ google_maps (ถ้าไม่มีจะใช้ข้อมูลจำลอง)")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="จำนวนรายการที่ใช้วัด คั่นด้วยจุลภาค")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"ขั้นตอนที่วัด ({', '.join(STAGES)})")
+    parser.add_argument("--latency", type=float, default=0.0, help="เวลาหน่วงต่อคำขอ SerpApi (มิลลิวินาที)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="ความแปรปรวนของเวลาหน่วง (0.5 คือ ±50%%)")
+    parser.add_argument("--no-memory", action="store_true", help="ไม่วัดหน่วยความจำ (เร็วขึ้นประมาณครึ่งหนึ่ง)")
+    parser.add_argument("--save", help="บันทึกผลการวัดเป็นไฟล์ JSON (ใช้เป็น baseline)")
+    parser.add_argument("--compare", help="ไฟล์ baseline ที่ใช้เปรียบเทียบ")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="สัดส่วนที่ถือว่าแย่ลง เมื่อเทียบกับ baseline (ค่าเริ่มต้น 0.10)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        scales = [int(scale) for scale in args.scales.split(",") if scale.strip()]
+    except ValueError:
+        print(f"--scales ไม่ถูกต้อง: {args.scales}", file=sys.stderr)
+        return EXIT_USAGE
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown or not scales or min(scales) <= 0:
+        print(f"ขั้นตอนหรือขนาดข้อมูลไม่ถูกต้อง: {', '.join(unknown) or args.scales}", file=sys.stderr)
+        return EXIT_USAGE
+
+    pages = load_fixture_pages(args.fixtures) if os.path.isdir(args.fixtures) else []
+    source = args.fixtures if pages else "ข้อมูลจำลอง"
+    if not pages:
+        pages = [json.dumps(synthetic_page(page), ensure_ascii=False).encode("utf-8") for page in range(10)]
+
+    log = lambda message: print(message, file=sys.stderr)
+    log(f"ใช้ผลลัพธ์จาก {source} ({len(pages)} หน้า) หน่วงเวลา {args.latency:g} ms ±{args.jitter:.0%}")
+    results = run_benchmarks(pages, scales, stages, args.latency / 1000, args.jitter, not args.no_memory, log)
+
+    table = pd.DataFrame(results.values())
+    print(table.to_string(index=False))
+
+    failures = check_search_credits(pages) if "search" in stages else []
+    for failure in failures:
+        print(f"ตรวจการใช้ credit ไม่ผ่าน: {failure}")
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "fixtures": source,
+            "latency_ms": args.latency,
+            "jitter": args.jitter,
+        },
+        "results": results,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, ensure_ascii=False, indent=2)
+        log(f"บันทึกผลการวัดที่ {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        changes, regressions = compare(results, baseline["results"], args.threshold)
+        print()
+        print(f"เทียบกับ {args.compare} ({baseline['meta'].get('created_at')})")
+        print(changes.to_string(index=False) if not changes.empty else "ไม่มีรายการที่เทียบได้")
+        if regressions:
+            print()
+            print(f"แย่ลงเกิน {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return EXIT_REGRESSION
+
+    return EXIT_REGRESSION if failures else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,459 @@
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+from dotenv import load_dotenv
+
+import metrics
+from dedup import DedupIndex
+from exports import write_csv_chunked
+from extraction import FrameBuffer, extract_columns, extract_frame
+from key_pool import KeyPool
+from resilience import CircuitBreaker, RetryPolicy
+from transport import SerpApiError, create_transport
+
+# โหลดค่าจากไฟล์ .env
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# API Key สำหรับ SerpApi (ควรเก็บใน .env file)
+API_KEY = os.getenv('SERPAPI_KEY', '42ed65c54ab568d1396bbb8f10f5c80376f5e05e801f1ed41697bca017d214f0')
+
+# API key หลายตัวคั่นด้วยจุลภาค เพื่อกระจายคำขอและโควตา (ถ้าไม่ระบุจะใช้ SERPAPI_KEY ตัวเดียว)
+API_KEYS = [key.strip() for key in os.getenv('SERPAPI_KEYS', '').split(',') if key.strip()] or [API_KEY]
+KEY_STRATEGY = os.getenv('SERPAPI_KEY_STRATEGY', 'round_robin')
+KEY_COOLDOWN = float(os.getenv('SERPAPI_KEY_COOLDOWN', '60'))
+
+# การตั้งค่าแคชผลลัพธ์ของ SerpApi
+CACHE_PATH = os.getenv('CACHE_PATH', 'search_cache.sqlite3')
+CACHE_TTL = int(os.getenv('CACHE_TTL', '86400'))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '1000'))
+
+# ไฟล์ดัชนีธุรกิจที่เคยพบ สำหรับเก็บเฉพาะธุรกิจใหม่ในการค้นหาแบบกลุ่ม
+DEDUP_PATH = os.getenv('DEDUP_PATH', 'seen_businesses.sqlite3')
+
+# ฐานข้อมูลธุรกิจที่เคยพบ สำหรับโหมดรีเฟรช (ค้นหาใหม่เฉพาะงานที่ข้อมูลเก่ากว่า REFRESH_MAX_AGE_DAYS วัน)
+LEAD_STORE_PATH = os.getenv('LEAD_STORE_PATH', 'leads.sqlite3')
+REFRESH_MAX_AGE_DAYS = float(os.getenv('REFRESH_MAX_AGE_DAYS', '7'))
+
+# การแบ่งหน้าและอัตราการเรียก SerpApi
+PAGE_SIZE = 20  # Google Maps ส่งผลลัพธ์หน้าละ 20 รายการ
+MAX_PAGES = 3
+DEFAULT_LL = "@13.7563,100.5018,15z"  # พิกัดกรุงเทพฯ
+
+# อัตราการเรียกต่อหนึ่ง API key
+RATE_LIMIT_PER_SECOND = float(os.getenv('SERPAPI_RATE_LIMIT', '5'))
+RATE_LIMIT_BURST = int(os.getenv('SERPAPI_RATE_BURST', '5'))
+
+# การลองใหม่เมื่อเรียก SerpApi ไม่สำเร็จ และ circuit breaker
+RETRY_MAX_ATTEMPTS = int(os.getenv('SERPAPI_MAX_ATTEMPTS', '4'))
+RETRY_BASE_DELAY = float(os.getenv('SERPAPI_BACKOFF_BASE', '0.5'))
+RETRY_MAX_DELAY = float(os.getenv('SERPAPI_BACKOFF_MAX', '8'))
+BREAKER_THRESHOLD = int(os.getenv('SERPAPI_BREAKER_THRESHOLD', '5'))
+BREAKER_RESET = float(os.getenv('SERPAPI_BREAKER_RESET', '30'))
+
+# error payload ของ SerpApi ที่หมายถึง "ไม่มีผลลัพธ์" ไม่ใช่ข้อผิดพลาด
+EMPTY_RESULT_ERRORS = ("hasn't returned any results",)
+# error payload ที่เกิดชั่วคราว ลองใหม่ได้
+TRANSIENT_ERROR_HINTS = ("try again", "timed out", "timeout", "temporarily")
+
+# การค้นหาแบบแบ่งพื้นที่ (geo-grid tiling)
+TILE_MAX_DEPTH = int(os.getenv('TILE_MAX_DEPTH', '3'))
+TILE_MAX_TILES = int(os.getenv('TILE_MAX_TILES', '200'))
+
+
+def create_key_pool(keys=None):
+    """
+    สร้าง KeyPool จากการตั้งค่าใน .env
+    
+    Args:
+        keys (list): API key ที่ใช้ (ค่าเริ่มต้นคือ SERPAPI_KEYS หรือ SERPAPI_KEY)
+    
+    Returns:
+        KeyPool: กลุ่ม API key
+    """
+    return KeyPool(
+        keys or API_KEYS,
+        rate=RATE_LIMIT_PER_SECOND,
+        burst=RATE_LIMIT_BURST,
+        strategy=KEY_STRATEGY,
+        cooldown=KEY_COOLDOWN,
+    )
+
+
+class BusinessSearcher:
+    def __init__(self, api_key, cache=None, rate_limiter=None, transport=None,
+                 retry_policy=None, circuit_breaker=None, key_pool=None):
+        """
+        Args:
+            api_key (str): API key หลัก (ใช้เมื่อไม่ได้ระบุ key_pool)
+            cache (SearchCache): แคชผลลัพธ์
+            rate_limiter (TokenBucket): ตัวจำกัดอัตรารวมทุก key (ไม่บังคับ แต่ละ key มีตัวจำกัดของตัวเองแล้ว)
+            transport (SerpApiTransport): ชั้นเชื่อมต่อ SerpApi
+            retry_policy (RetryPolicy): นโยบายลองใหม่
+            circuit_breaker (CircuitBreaker): circuit breaker ที่ใช้ร่วมกัน
+            key_pool (KeyPool): กลุ่ม API key ที่กระจายคำขอ
+        """
+        self.api_key = api_key
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.key_pool = key_pool or create_key_pool([api_key])
+        self.transport = transport or create_transport()
+        self.retry_policy = retry_policy or RetryPolicy(RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET)
+    
+    def _request(self, params):
+        """
+        เรียก SerpApi หนึ่งครั้งด้วย key จาก key_pool ตามอัตราที่กำหนด
+        
+        Raises:
+            SerpApiError: เมื่อเรียกไม่สำเร็จ หรือผลลัพธ์เป็น error payload
+        """
+        # หน่วงเวลาตามอัตราที่กำหนด เฉพาะคำขอที่ต้องเรียก API จริง
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        key = self.key_pool.acquire()
+        
+        started = time.perf_counter()
+        try:
+            results = self.transport.get_json({**params, "api_key": key.value})
+            error = results.get("error")
+            if error and not any(hint in error for hint in EMPTY_RESULT_ERRORS):
+                transient = any(hint in error.lower() for hint in TRANSIENT_ERROR_HINTS)
+                raise SerpApiError(error, retryable=transient)
+        except SerpApiError as e:
+            metrics.observe("serpapi_request_seconds", time.perf_counter() - started)
+            metrics.inc("serpapi_requests_total", outcome="error")
+            metrics.inc("serpapi_errors_total", status=e.status or "network")
+            # key ที่โดนจำกัดหรือโควตาหมดจะถูกพัก แล้วลองใหม่ด้วย key อื่นได้ทันที
+            # โดยไม่นับเป็นความล้มเหลวของ circuit breaker (นับเฉพาะเมื่อไม่มี key เหลือ)
+            if self.key_pool.report_failure(key, e):
+                e.retryable = True
+                e.rotate_key = True
+                e.upstream = False
+                e.retry_after = None
+            raise
+        
+        metrics.observe("serpapi_request_seconds", time.perf_counter() - started)
+        metrics.inc("serpapi_requests_total", outcome="ok")
+        metrics.inc("serpapi_credits_used_total")
+        self.key_pool.report_success(key)
+        return results
+    
+    def _fetch(self, params, use_cache=True, budget=None):
+        """
+        เรียก SerpApi โดยตรวจสอบแคชก่อน
+        
+        คำขอที่ล้มเหลวชั่วคราว (เชื่อมต่อไม่ได้, 429, 5xx) จะถูกลองใหม่แบบ backoff
+        และเมื่อ SerpApi ล้มเหลวต่อเนื่อง circuit breaker จะปฏิเสธคำขอทันที
+        
+        Args:
+            params (dict): พารามิเตอร์ของคำขอ
+            use_cache (bool): อ่านผลลัพธ์จากแคชหรือไม่ (ผลลัพธ์ใหม่จะถูกบันทึกเสมอ)
+            budget (CreditBudget): งบ credit ของการค้นหานี้ (จองหนึ่ง credit ก่อนเรียก SerpApi จริง)
+        
+        Returns:
+            dict: ผลลัพธ์จาก SerpApi
+        
+        Raises:
+            SerpApiError: เมื่อลองครบแล้วยังไม่สำเร็จ (CircuitOpenError เมื่อวงจรเปิดอยู่,
+                BudgetExceeded เมื่อใช้ credit ครบงบ)
+        """
+        if self.cache is not None and use_cache:
+            cached = self.cache.get(params)
+            metrics.inc("search_cache_requests_total", result="miss" if cached is None else "hit")
+            if cached is not None:
+                return cached
+        
+        if budget is not None:
+            budget.reserve()
+        try:
+            results = self.retry_policy.call(self.circuit_breaker.call, self._request, params)
+        except Exception:
+            # SerpApi ไม่คิด credit ของคำขอที่ไม่สำเร็จ
+            if budget is not None:
+                budget.refund()
+            raise
+        
+        # ไม่เก็บผลลัพธ์ที่เป็น error ไว้ในแคช
+        if self.cache is not None and "error" not in results:
+            self.cache.set(params, results)
+        
+        return results
+    
+    def _page_offsets(self, num_results):
+        """
+        คำนวณค่า start ของแต่ละหน้าที่ต้องดึงให้ได้ครบ num_results
+        
+        Args:
+            num_results (int): จำนวนผลลัพธ์ที่ต้องการ
+        
+        Returns:
+            list: ค่า start ของแต่ละหน้า เรียงตามลำดับหน้า
+        """
+        pages = max(1, math.ceil(num_results / PAGE_SIZE))
+        pages = min(pages, MAX_PAGES)  # จำกัดจำนวนหน้าเพื่อควบคุมการใช้ credit
+        return [page * PAGE_SIZE for page in range(pages)]
+    
+    def page_count(self, num_results):
+        """จำนวนหน้าที่ต้องดึงให้ได้ครบ num_results (ไม่เกิน MAX_PAGES)"""
+        return len(self._page_offsets(num_results))
+    
+    @staticmethod
+    def page_params(params, start):
+        """พารามิเตอร์ของหน้าที่เริ่มที่ start"""
+        page_params = params.copy()
+        if start:
+            page_params["start"] = start
+        return page_params
+    
+    def plan_offsets(self, params, num_results, use_cache=True):
+        """
+        ค่า start ของหน้าที่จะดึงจริง
+        
+        หน้าหลังหน้าแรกถูกดึงพร้อมกัน จึงตัดหน้าที่อยู่หลังหน้าในแคชที่ไม่มีหน้าถัดไปออกก่อน
+        เพื่อไม่เสีย credit กับหน้าที่ Google Maps ไม่มีผลลัพธ์
+        
+        Args:
+            params (dict): พารามิเตอร์ของคำขอ (จาก build_params)
+            num_results (int): จำนวนผลลัพธ์ที่ต้องการ
+            use_cache (bool): ใช้ผลลัพธ์จากแคชหากมี
+        
+        Returns:
+            list: ค่า start ของแต่ละหน้า เรียงตามลำดับหน้า
+        """
+        offsets = self._page_offsets(num_results)
+        if self.cache is None or not use_cache:
+            return offsets
+        for index, start in enumerate(offsets[:-1]):
+            cached = self.cache.peek(self.page_params(params, start))
+            if cached is not None and "next" not in cached.get("serpapi_pagination", {}):
+                return offsets[:index + 1]
+        return offsets
+    
+    def _fetch_page(self, params, start, use_cache=True, budget=None):
+        """ดึงผลลัพธ์หน้าเดียวตามค่า start"""
+        metrics.inc("search_pages_total")
+        with metrics.timer("search_page_seconds"):
+            return self._fetch(self.page_params(params, start), use_cache, budget)
+    
+    def build_params(self, query, location="Thailand", num_results=20, ll=None):
+        """
+        สร้างพารามิเตอร์สำหรับเรียก SerpApi (engine google_maps)
+        
+        Args:
+            query (str): คำค้นหา
+            location (str): สถานที่ค้นหา (None หรือ "Thailand" คือไม่ต่อท้ายคำค้นหา)
+            num_results (int): จำนวนผลลัพธ์ที่ต้องการ
+            ll (str): viewport ในรูปแบบ "@lat,lng,zoomz" (ค่าเริ่มต้นคือกรุงเทพฯ)
+        
+        Returns:
+            dict: พารามิเตอร์ของคำขอ
+        """
+        params = {
+            "engine": "google_maps",
+            "q": query,
+            "ll": ll or DEFAULT_LL,
+            "type": "search",
+            "api_key": self.api_key,
+            "num": num_results
+        }
+        
+        if location and location != "Thailand":
+            params["q"] = f"{query} {location}"
+        
+        return params
+    
+    def iter_local_pages(self, params, num_results, use_cache=True, raise_errors=False,
+                         start_page=0, collected=0, budget=None):
+        """
+        ดึงหน้าแรกก่อน แล้วดึงหน้าที่เหลือพร้อมกัน และส่ง local_results ดิบออกมาทีละหน้าตามลำดับหน้า
+        
+        หน้าที่เหลือถูกดึงเฉพาะเมื่อหน้าแรกมีหน้าถัดไป ผลลัพธ์ที่มีไม่ถึงหนึ่งหน้าจึงใช้เพียงหนึ่ง credit
+        หน้าแรกถูกส่งออกทันทีที่ได้รับ โดยไม่ต้องรอหน้าอื่น
+        
+        Args:
+            params (dict): พารามิเตอร์ของคำขอ (จาก build_params)
+            num_results (int): จำนวนผลลัพธ์ที่ต้องการ
+            use_cache (bool): ใช้ผลลัพธ์จากแคชหากมี
+            raise_errors (bool): ส่งต่อข้อผิดพลาดให้ผู้เรียก (ถ้าไม่ส่งต่อจะบันทึก log แล้วคืนผลลัพธ์เท่าที่ได้)
+            start_page (int): เริ่มจากหน้านี้ (0 คือหน้าแรก ใช้ทำงานต่อจากหน้าที่ได้รับไว้แล้ว)
+            collected (int): จำนวนผลลัพธ์ที่ได้จากหน้าก่อน start_page
+            budget (CreditBudget): งบ credit ของการค้นหานี้ (None คือไม่จำกัด)
+        
+        Yields:
+            tuple: (ผลลัพธ์ดิบของหน้านั้น, มีหน้าถัดไปเหลืออยู่หรือไม่)
+        """
+        offsets = self.plan_offsets(params, num_results, use_cache)[start_page:]
+        if not offsets or collected >= num_results:
+            return
+        
+        def page_result(result):
+            # ผลลัพธ์ของหนึ่งหน้า ตัดให้ไม่เกิน num_results
+            page_results = result.get("local_results", [])[:num_results - collected]
+            metrics.inc("search_results_total", len(page_results))
+            return page_results, "next" in result.get("serpapi_pagination", {})
+        
+        # หน้าแรกดึงก่อนเพียงหน้าเดียว เพื่อไม่เสีย credit กับหน้าถัดไปที่ไม่มีอยู่จริง
+        try:
+            page_results, has_more = page_result(self._fetch_page(params, offsets[0], use_cache, budget))
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error("เกิดข้อผิดพลาดในการค้นหา ได้ผลลัพธ์บางส่วน %d รายการ: %s", collected, e)
+            return
+        collected += len(page_results)
+        yield page_results, has_more
+        
+        rest = offsets[1:]
+        if not rest or collected >= num_results or not has_more:
+            return
+        
+        with ThreadPoolExecutor(max_workers=len(rest)) as executor:
+            futures = [
+                executor.submit(self._fetch_page, params, start, use_cache, budget)
+                for start in rest
+            ]
+            
+            try:
+                # ส่งผลลัพธ์ตามลำดับหน้า และหยุดเมื่อหน้าใดไม่มีหน้าถัดไป
+                for future in futures:
+                    try:
+                        page_results, has_more = page_result(future.result())
+                    except Exception as e:
+                        if raise_errors:
+                            raise
+                        logger.error("เกิดข้อผิดพลาดในการค้นหา ได้ผลลัพธ์บางส่วน %d รายการ: %s",
+                                     collected, e)
+                        break
+                    
+                    collected += len(page_results)
+                    yield page_results, has_more
+                    
+                    if collected >= num_results or not has_more:
+                        break
+            finally:
+                # ยกเลิกหน้าที่ยังไม่เริ่มดึง หากไม่ต้องใช้แล้ว
+                for future in futures:
+                    future.cancel()
+    
+    def fetch_local_results(self, params, num_results, use_cache=True, raise_errors=False, budget=None):
+        """
+        ดึง local_results ดิบจากทุกหน้าที่ต้องใช้ แล้วรวมตามลำดับหน้า
+        
+        Args:
+            params (dict): พารามิเตอร์ของคำขอ (จาก build_params)
+            num_results (int): จำนวนผลลัพธ์ที่ต้องการ
+            use_cache (bool): ใช้ผลลัพธ์จากแคชหากมี
+            raise_errors (bool): ส่งต่อข้อผิดพลาดให้ผู้เรียก (ถ้าไม่ส่งต่อจะบันทึก log แล้วคืนผลลัพธ์เท่าที่ได้)
+            budget (CreditBudget): งบ credit ของการค้นหานี้ (None คือไม่จำกัด)
+        
+        Returns:
+            tuple: (รายการผลลัพธ์ดิบ, มีหน้าถัดไปเหลืออยู่หรือไม่)
+        """
+        local_results = []
+        has_more = False
+        for page_results, has_more in self.iter_local_pages(
+                params, num_results, use_cache, raise_errors, budget=budget):
+            local_results.extend(page_results)
+        return local_results, has_more
+    
+    def iter_search_results(self, query, location="Thailand", num_results=20, use_cache=True,
+                            raise_errors=False, ll=None, dedup_index=None, budget=None):
+        """
+        ค้นหาธุรกิจและส่งผลลัพธ์ดิบออกมาทีละหน้าทันทีที่ได้รับ
+        
+        ใช้อาร์กิวเมนต์เดียวกับ search_businesses
+        
+        Yields:
+            list: local_results ของแต่ละหน้า (ตัดรายการซ้ำแล้ว) ตามลำดับหน้า
+        """
+        params = self.build_params(query, location, num_results, ll)
+        
+        if dedup_index is None:
+            dedup_index = DedupIndex()
+        
+        for page_results, _ in self.iter_local_pages(params, num_results, use_cache, raise_errors,
+                                                      budget=budget):
+            yield dedup_index.filter_new(page_results)
+    
+    def iter_search_pages(self, query, location="Thailand", num_results=20, use_cache=True,
+                          raise_errors=False, ll=None, dedup_index=None, budget=None):
+        """
+        ค้นหาธุรกิจและส่งผลลัพธ์ออกมาทีละหน้าทันทีที่ได้รับ
+        
+        ใช้อาร์กิวเมนต์เดียวกับ search_businesses
+        
+        Yields:
+            pd.DataFrame: ข้อมูลธุรกิจของแต่ละหน้า (ตัดรายการซ้ำแล้ว) ตามลำดับหน้า
+        """
+        for page_results in self.iter_search_results(
+            query, location, num_results, use_cache, raise_errors, ll, dedup_index, budget
+        ):
+            yield extract_frame(page_results)
+    
+    def search_businesses(self, query, location="Thailand", num_results=20, use_cache=True,
+                          raise_errors=False, ll=None, dedup_index=None, budget=None):
+        """
+        ค้นหาธุรกิจใน Google Maps
+        
+        ดึงหน้าแรกก่อน แล้วดึงหน้าที่เหลือพร้อมกันเมื่อมีหน้าถัดไป โดยมี token bucket ควบคุมอัตราการเรียก API
+        แล้วนำมารวมตามลำดับหน้าใน FrameBuffer (สร้างตารางครั้งเดียว)
+        
+        Args:
+            query (str): คำค้นหา เช่น "ร้านอาหาร", "โรงแรม", "ร้านกาแฟ"
+            location (str): สถานที่ค้นหา
+            num_results (int): จำนวนผลลัพธ์ที่ต้องการ
+            use_cache (bool): ใช้ผลลัพธ์จากแคชหากมี
+            raise_errors (bool): ส่งต่อข้อผิดพลาดให้ผู้เรียก (ถ้าไม่ส่งต่อจะบันทึก log แล้วคืนผลลัพธ์เท่าที่ได้)
+            ll (str): viewport ที่ใช้ค้นหา (ค่าเริ่มต้นคือกรุงเทพฯ)
+            dedup_index (DedupIndex): ดัชนีตัดรายการซ้ำที่ใช้ร่วมกับการค้นหาอื่น
+                (ถ้าไม่ระบุจะตัดรายการซ้ำเฉพาะภายในการค้นหานี้)
+            budget (CreditBudget): งบ credit ของการค้นหานี้ (None คือไม่จำกัด)
+        
+        Returns:
+            pd.DataFrame: ตารางข้อมูลธุรกิจ (คอลัมน์ตัวเลขเป็น dtype ตัวเลข ค่าที่ไม่มีเป็น null)
+        """
+        buffer = FrameBuffer()
+        for page_results in self.iter_search_results(
+            query, location, num_results, use_cache, raise_errors, ll, dedup_index, budget
+        ):
+            buffer.append(page_results)
+        return buffer.to_frame()
+    
+    def extract_business_info(self, result):
+        """
+        ดึงข้อมูลธุรกิจจากผลลัพธ์
+        
+        Args:
+            result (dict): ข้อมูลผลลัพธ์จาก SerpApi
+        
+        Returns:
+            dict: ข้อมูลธุรกิจที่จัดรูปแบบแล้ว (ค่าที่ไม่มีเป็น None)
+        """
+        columns = extract_columns([result])
+        return {name: values[0] for name, values in columns.items()}
+    
+    def save_to_csv(self, businesses, filename=None):
+        """
+        บันทึกข้อมูลเป็นไฟล์ CSV
+        
+        Args:
+            businesses (pd.DataFrame | list): ตารางหรือรายการข้อมูลธุรกิจ
+            filename (str): ชื่อไฟล์ (ถ้าไม่ระบุจะใช้วันที่ปัจจุบัน)
+        
+        Returns:
+            str: ชื่อไฟล์ที่บันทึก
+        """
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"business_search_results_{timestamp}.csv"
+        
+        df = businesses if isinstance(businesses, pd.DataFrame) else pd.DataFrame(businesses)
+        write_csv_chunked(df, filename)
+        return filename
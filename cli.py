@@ -0,0 +1,346 @@
+"""
+gg-lead: เครื่องมือค้นหาธุรกิจจาก Google Maps ผ่าน command line (ไม่ใช้ Streamlit)
+
+ตัวอย่าง:
+    python cli.py search --type ร้านกาแฟ --province เชียงใหม่ --out results.parquet
+    python cli.py search --type ร้านกาแฟ --province เชียงใหม่ --enrich --out results.csv
+    python cli.py refresh --type ร้านกาแฟ --type โรงแรม --province เชียงใหม่ --out changes.csv
+    python cli.py search --type ร้านกาแฟ --province เชียงใหม่ --num 50 --plan --out results.csv
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+import pandas as pd
+
+from business_search import (
+    API_KEY, CACHE_MAX_ENTRIES, CACHE_PATH, CACHE_TTL, LEAD_STORE_PATH, MAX_PAGES, PAGE_SIZE,
+    REFRESH_MAX_AGE_DAYS, TILE_MAX_DEPTH, TILE_MAX_TILES, BusinessSearcher, create_key_pool
+)
+from enrichment import ENRICH_CACHE_MAX_ENTRIES, ENRICH_CACHE_PATH, ENRICH_CACHE_TTL, WebsiteEnricher
+from exports import export_to_path
+from extraction import FrameBuffer, extract_frame
+from lead_store import DIFF_STATUS_COLUMN, LeadStore
+from metrics import METRICS_FILE, REGISTRY
+from normalization import AddressIndex, normalize_frame
+from planner import SEARCH_CREDIT_BUDGET, CostPlanner, CreditBudget
+from reference_data import load_reference_data
+from search_cache import SearchCache
+from sweep import SweepRunner, expand_jobs
+from tiling import TileSearcher
+
+
+logger = logging.getLogger("gg_lead")
+
+# exit code
+EXIT_OK = 0
+EXIT_NO_RESULTS = 1
+EXIT_USAGE = 2
+EXIT_SEARCH_ERROR = 3
+EXIT_OUTPUT_ERROR = 4
+EXIT_PARTIAL = 5  # บันทึกผลลัพธ์แล้ว แต่บางหน้าหรือบางช่องค้นหาไม่สำเร็จ
+
+
+class JsonFormatter(logging.Formatter):
+    """จัดรูปแบบ log เป็น JSON หนึ่งบรรทัดต่อหนึ่งเหตุการณ์"""
+
+    def format(self, record):
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def configure_logging(level, json_logs):
+    handler = logging.StreamHandler(sys.stderr)
+    if json_logs:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+
+
+def add_budget_arguments(parser):
+    parser.add_argument("--budget", type=int, default=SEARCH_CREDIT_BUDGET,
+                        help=f"หยุดเมื่อใช้ credit ของ SerpApi ครบจำนวนนี้ (0 = ไม่จำกัด, ค่าเริ่มต้น {SEARCH_CREDIT_BUDGET})")
+    parser.add_argument("--plan", action="store_true",
+                        help="แสดงประมาณการ credit และเวลาแล้วจบ โดยไม่ค้นหา")
+
+
+def log_plan(plan, budget):
+    """บันทึกประมาณการลง log และคืน exit code (EXIT_USAGE หากเกินงบ)"""
+    logger.info(
+        "ประมาณการ %d credit (%d หน้า ในแคช %d) ใช้เวลาประมาณ %.0f วินาที ได้ประมาณ %d ธุรกิจ",
+        plan.credits,
+        plan.pages,
+        plan.cached_pages,
+        plan.seconds,
+        plan.expected_results,
+        extra={"fields": {
+            "searches": plan.searches,
+            "pages": plan.pages,
+            "cached_pages": plan.cached_pages,
+            "credits": plan.credits,
+            "seconds": round(plan.seconds, 1),
+            "expected_results": plan.expected_results,
+            "known_yields": plan.known_yields,
+            "quota_left": plan.quota_left,
+            "budget": budget,
+        }},
+    )
+    if plan.exceeds(budget):
+        logger.warning("ประมาณการเกินงบ %d credit", budget)
+        return EXIT_USAGE
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="gg-lead", description="ค้นหาธุรกิจใน Google Maps ผ่าน SerpApi")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    parser.add_argument("--log-json", action="store_true", help="เขียน log เป็น JSON หนึ่งบรรทัดต่อเหตุการณ์")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search = subparsers.add_parser("search", help="ค้นหาธุรกิจแล้วบันทึกเป็นไฟล์")
+    search.add_argument("--type", required=True, dest="business_type", help="ประเภทธุรกิจ เช่น ร้านอาหาร")
+    search.add_argument("--province", help="จังหวัด")
+    search.add_argument("--district", help="อำเภอ (ต้องระบุจังหวัดด้วย)")
+    search.add_argument("--num", type=int, default=20, help="จำนวนผลลัพธ์ (ค่าเริ่มต้น 20)")
+    search.add_argument("--tiling", action="store_true", help="ค้นหาแบบแบ่งพื้นที่ทั่วทั้งจังหวัด/อำเภอ")
+    search.add_argument("--no-cache", action="store_true", help="ไม่ใช้ผลลัพธ์จากแคช")
+    search.add_argument("--enrich", action="store_true",
+                        help="ดึงอีเมล ลิงก์ LINE / Facebook และเบอร์โทรเพิ่มเติมจากเว็บไซต์ของธุรกิจ")
+    search.add_argument("--out", required=True, help="ไฟล์ผลลัพธ์ (.csv, .xlsx หรือ .parquet)")
+    add_budget_arguments(search)
+
+    refresh = subparsers.add_parser(
+        "refresh", help="ค้นหาใหม่เฉพาะงานที่ข้อมูลเก่า แล้วบันทึกเฉพาะธุรกิจใหม่/เปลี่ยนแปลง/หายไป"
+    )
+    refresh.add_argument("--type", required=True, action="append", dest="business_types",
+                         help="ประเภทธุรกิจ (ระบุได้หลายครั้ง)")
+    refresh.add_argument("--province", required=True, action="append", dest="provinces",
+                         help="จังหวัด (ระบุได้หลายครั้ง)")
+    refresh.add_argument("--num", type=int, default=20, help="จำนวนผลลัพธ์ต่องาน (ค่าเริ่มต้น 20)")
+    refresh.add_argument("--max-age-days", type=float, default=REFRESH_MAX_AGE_DAYS,
+                         help=f"รีเฟรชงานที่ค้นหาล่าสุดนานกว่ากี่วัน (ค่าเริ่มต้น {REFRESH_MAX_AGE_DAYS:g})")
+    refresh.add_argument("--workers", type=int, default=4, help="จำนวนงานที่รันพร้อมกัน")
+    refresh.add_argument("--out", required=True, help="ไฟล์ผลลัพธ์ (.csv, .xlsx หรือ .parquet)")
+    add_budget_arguments(refresh)
+
+    return parser
+
+
+def run_search(args):
+    if args.district and not args.province:
+        logger.error("ต้องระบุ --province เมื่อใช้ --district")
+        return EXIT_USAGE
+    if args.tiling and not args.province:
+        logger.error("ต้องระบุ --province เมื่อใช้ --tiling")
+        return EXIT_USAGE
+
+    location = args.province or "Thailand"
+    if args.district:
+        location = f"{args.district}, {args.province}"
+
+    cache = SearchCache(CACHE_PATH, ttl_seconds=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+    key_pool = create_key_pool()
+    searcher = BusinessSearcher(API_KEY, cache=cache, key_pool=key_pool)
+    use_cache = not args.no_cache
+    if args.plan:
+        if args.tiling:
+            logger.info("ค้นหาแบบแบ่งพื้นที่ใช้สูงสุดประมาณ %d credit", TILE_MAX_TILES * MAX_PAGES + 1)
+            return EXIT_OK
+        plan = CostPlanner(searcher, LeadStore(LEAD_STORE_PATH)).plan_search(
+            args.business_type, location, args.num, use_cache, args.province, args.district
+        )
+        return log_plan(plan, args.budget)
+
+    budget = CreditBudget(args.budget)
+    started = time.monotonic()
+    failure = None
+
+    try:
+        if args.tiling:
+            tile_searcher = TileSearcher(
+                searcher, max_depth=TILE_MAX_DEPTH, max_tiles=TILE_MAX_TILES, page_size=PAGE_SIZE,
+                budget=budget
+            )
+            bbox = tile_searcher.resolve_bounds(args.business_type, args.province, args.district, use_cache)
+            if bbox is None:
+                logger.error("ไม่มีข้อมูลขอบเขตพื้นที่ของ %s", location)
+                return EXIT_USAGE
+            local_results, stats = tile_searcher.search(
+                args.business_type, bbox, per_tile=PAGE_SIZE * MAX_PAGES, use_cache=use_cache
+            )
+            df = extract_frame(local_results)
+            if stats.tiles_failed:
+                failure = f"ค้นหาไม่สำเร็จ {stats.tiles_failed} จาก {stats.tiles_searched} ช่อง"
+        else:
+            # เก็บหน้าที่ได้รับแล้วไว้ หากหน้าถัดไปล้มเหลว
+            buffer = FrameBuffer()
+            pages = 0
+            try:
+                for page_results in searcher.iter_search_results(
+                    args.business_type, location, args.num, use_cache=use_cache, raise_errors=True,
+                    budget=budget
+                ):
+                    buffer.append(page_results)
+                    pages += 1
+            except Exception as e:
+                if not pages:
+                    raise
+                failure = str(e)
+            df = buffer.to_frame()
+    except Exception:
+        logger.exception("ค้นหาไม่สำเร็จ", extra={"fields": {"query": args.business_type, "location": location}})
+        return EXIT_SEARCH_ERROR
+
+    elapsed = time.monotonic() - started
+    cache_stats = cache.stats()
+    logger.info(
+        "ค้นหาเสร็จ พบ %d รายการ ใช้เวลา %.2f วินาที",
+        len(df),
+        elapsed,
+        extra={"fields": {
+            "query": args.business_type,
+            "location": location,
+            "results": len(df),
+            "elapsed_s": round(elapsed, 3),
+            "cache_hits": cache_stats["hits"],
+            "cache_misses": cache_stats["misses"],
+            "partial": failure is not None,
+            "credits_used": budget.spent,
+            "keys": key_pool.usage(),
+        }},
+    )
+    if failure is not None:
+        logger.warning("ได้ผลลัพธ์บางส่วน: %s", failure, extra={"fields": {"error": failure}})
+
+    if df.empty:
+        logger.warning("ไม่พบผลลัพธ์การค้นหา")
+        return EXIT_NO_RESULTS
+
+    if args.enrich:
+        enricher = WebsiteEnricher(SearchCache(
+            ENRICH_CACHE_PATH, ttl_seconds=ENRICH_CACHE_TTL, max_entries=ENRICH_CACHE_MAX_ENTRIES
+        ))
+        started = time.monotonic()
+        df, added = enricher.enrich_frame(df)
+        enricher.close()
+        logger.info(
+            "ดึงข้อมูลจากเว็บไซต์เสร็จ ได้อีเมลเพิ่ม %d รายการ",
+            added,
+            extra={"fields": {
+                "emails_added": added,
+                "pages": enricher.pages_fetched,
+                "blocked": enricher.blocked,
+                "failed": enricher.failed,
+                "elapsed_s": round(time.monotonic() - started, 3),
+            }},
+        )
+
+    # บันทึกลงคลังรายชื่อเพื่อค้นหาภายหลังได้
+    LeadStore(LEAD_STORE_PATH).add(df, args.business_type, args.province, args.district)
+
+    try:
+        export_to_path(normalize_output(df), args.out)
+    except (OSError, ValueError, ImportError) as e:
+        logger.error("บันทึกไฟล์ %s ไม่สำเร็จ: %s", args.out, e)
+        return EXIT_OUTPUT_ERROR
+
+    logger.info("บันทึกผลลัพธ์ที่ %s", args.out, extra={"fields": {"out": args.out}})
+    return EXIT_PARTIAL if failure is not None else EXIT_OK
+
+
+def normalize_output(df):
+    """เพิ่มเบอร์โทร E.164 และส่วนประกอบของที่อยู่ให้ไฟล์ผลลัพธ์ (เหมือนผลลัพธ์ในหน้าเว็บ)"""
+    return normalize_frame(df, AddressIndex(load_reference_data().provinces_districts))
+
+
+def run_refresh(args):
+    jobs = expand_jobs(args.business_types, [(province, None) for province in args.provinces])
+    lead_store = LeadStore(LEAD_STORE_PATH)
+    key_pool = create_key_pool()
+    searcher = BusinessSearcher(API_KEY, key_pool=key_pool)
+    max_age_seconds = args.max_age_days * 86400
+    if args.plan:
+        # รีเฟรชเฉพาะงานที่ข้อมูลเก่า และไม่ใช้แคช
+        plan = CostPlanner(searcher, lead_store).plan_sweep(
+            lead_store.stale_jobs(jobs, max_age_seconds), args.num, use_cache=False, max_workers=args.workers
+        )
+        return log_plan(plan, args.budget)
+
+    budget = CreditBudget(args.budget)
+    runner = SweepRunner(searcher, max_workers=args.workers, budget=budget)
+    started = time.monotonic()
+
+    diffs = []
+    failed = 0
+    refreshed = 0
+    for result, diff in runner.refresh(jobs, lead_store, max_age_seconds, args.num):
+        refreshed += 1
+        failed += not result.ok
+        diffs.append(diff)
+        if not result.ok:
+            logger.warning("รีเฟรช %r ไม่สำเร็จ: %s", result.job, result.error,
+                           extra={"fields": {"job": result.job.location, "error": result.error}})
+
+    changes = pd.concat(diffs, ignore_index=True) if diffs else pd.DataFrame()
+    counts = changes[DIFF_STATUS_COLUMN].value_counts().to_dict() if not changes.empty else {}
+    logger.info(
+        "รีเฟรช %d จาก %d งาน พบการเปลี่ยนแปลง %d รายการ",
+        refreshed,
+        len(jobs),
+        len(changes),
+        extra={"fields": {
+            "jobs": len(jobs),
+            "refreshed": refreshed,
+            "failed": failed,
+            "credits_used": budget.spent,
+            "changes": counts,
+            "elapsed_s": round(time.monotonic() - started, 3),
+            "keys": key_pool.usage(),
+        }},
+    )
+
+    if changes.empty:
+        logger.info("ไม่มีการเปลี่ยนแปลงตั้งแต่การค้นหาครั้งก่อน")
+        return EXIT_PARTIAL if failed else EXIT_NO_RESULTS
+
+    try:
+        export_to_path(normalize_output(changes), args.out)
+    except (OSError, ValueError, ImportError) as e:
+        logger.error("บันทึกไฟล์ %s ไม่สำเร็จ: %s", args.out, e)
+        return EXIT_OUTPUT_ERROR
+
+    logger.info("บันทึกการเปลี่ยนแปลงที่ %s", args.out, extra={"fields": {"out": args.out}})
+    return EXIT_PARTIAL if failed else EXIT_OK
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level, args.log_json)
+
+    commands = {"search": run_search, "refresh": run_refresh}
+    if args.command in commands:
+        try:
+            return commands[args.command](args)
+        finally:
+            # เขียนไฟล์ metrics ของการรันครั้งนี้ (ถ้าตั้งค่า METRICS_FILE)
+            if METRICS_FILE:
+                REGISTRY.write_file(METRICS_FILE)
+
+    parser.error(f"ไม่รู้จักคำสั่ง {args.command}")
+    return EXIT_USAGE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from normalization import COUNTRY_CODE, to_e164
+
+
+_NON_DIGIT = re.compile(r"\D+")
+
+# ปัดพิกัดเป็นทศนิยม 4 ตำแหน่ง (ประมาณ 11 เมตร) สำหรับคีย์สำรอง
+COORD_PRECISION = 4
+
+
+def normalize_phone(phone):
+    """
+    แปลงเบอร์โทรให้อยู่ในรูปแบบตัวเลขล้วนแบบเลขหมายในประเทศ เช่น "021234567"
+
+    เบอร์ไทยที่ถูกต้องแปลงผ่าน E.164 ก่อน ("+66 2 123 4567", "02-123-4567 ต่อ 12"
+    และ "02-123-4567, 081-234-5678" จึงได้คีย์เดียวกัน) แต่คงรูปแบบในประเทศไว้
+    เพื่อให้ตรงกับคีย์ที่บันทึกไว้แล้ว
+
+    Args:
+        phone (str): เบอร์โทรตามที่ได้รับจาก SerpApi
+
+    Returns:
+        str: เบอร์โทรที่ normalize แล้ว หรือ None หากไม่มีตัวเลข
+    """
+    if not phone:
+        return None
+    e164 = to_e164(phone)
+    if e164:
+        return "0" + e164[len(COUNTRY_CODE) + 1:]
+    return legacy_phone(phone)
+
+
+def legacy_phone(phone):
+    """
+    เบอร์โทรในรูปแบบคีย์เดิม (ตัวเลขทุกตัวในข้อความ) ก่อนแปลงผ่าน E.164
+
+    เบอร์ที่มีเบอร์ต่อหรือหลายหมายเลขได้คีย์ต่างจาก normalize_phone
+    จึงใช้คีย์นี้ตรวจร่วมด้วย เพื่อให้ตรงกับคีย์ที่บันทึกไว้ใน DedupIndex ก่อนหน้า
+
+    Returns:
+        str: เบอร์โทรรูปแบบเดิม หรือ None หากไม่มีตัวเลข
+    """
+    if not phone:
+        return None
+    digits = _NON_DIGIT.sub("", str(phone))
+    if digits.startswith("66") and len(digits) > 9:
+        digits = "0" + digits[2:]
+    return digits or None
+
+
+def _geo_key(phone, lat, lng):
+    return f"geo:{phone}:{round(float(lat), COORD_PRECISION)}:{round(float(lng), COORD_PRECISION)}"
+
+
+def dedup_keys(result):
+    """
+    คีย์ทั้งหมดที่ใช้ระบุธุรกิจหนึ่งแห่ง
+
+    ใช้ place_id และ data_id ของ SerpApi เป็นหลัก หากไม่มีจะใช้เบอร์โทร
+    ร่วมกับพิกัดที่ปัดแล้วเป็นคีย์สำรอง (พร้อมคีย์เบอร์โทรรูปแบบเดิมหากต่างกัน
+    ธุรกิจที่พบผ่านคีย์เดิมจะถูกผูกกับคีย์ใหม่ในดัชนีไปด้วย)
+
+    Args:
+        result (dict): ผลลัพธ์ดิบจาก SerpApi (local_results)
+
+    Returns:
+        list: รายการคีย์ (อาจว่างหากข้อมูลไม่พอ)
+    """
+    keys = []
+    if result.get("place_id"):
+        keys.append(f"pid:{result['place_id']}")
+    if result.get("data_id"):
+        keys.append(f"did:{result['data_id']}")
+
+    phone = normalize_phone(result.get("phone"))
+    coords = result.get("gps_coordinates") or {}
+    lat, lng = coords.get("latitude"), coords.get("longitude")
+    if phone and lat is not None and lng is not None:
+        keys.append(_geo_key(phone, lat, lng))
+        legacy = legacy_phone(result.get("phone"))
+        if legacy != phone:
+            keys.append(_geo_key(legacy, lat, lng))
+
+    return keys
+
+
+class DedupIndex:
+    """
+    ดัชนีตัดธุรกิจซ้ำระหว่างหน้า ช่องพื้นที่ และคำค้นหา
+
+    ตรวจสอบด้วย set ในหน่วยความจำ (O(1) ต่อคีย์) และบันทึกคีย์ลง SQLite
+    เมื่อกำหนด path เพื่อให้การค้นหาครั้งถัดไปเพิ่มเฉพาะธุรกิจใหม่
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._keys = set()
+        self._pending = []
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen_keys (key TEXT PRIMARY KEY, first_seen REAL NOT NULL)"
+            )
+            self._conn.commit()
+            self._keys.update(row[0] for row in self._conn.execute("SELECT key FROM seen_keys"))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, result):
+        return any(key in self._keys for key in dedup_keys(result))
+
+    def add(self, result):
+        """
+        เพิ่มธุรกิจลงดัชนี
+
+        Args:
+            result (dict): ผลลัพธ์ดิบจาก SerpApi
+
+        Returns:
+            bool: True หากเป็นธุรกิจใหม่ (ยังไม่เคยพบ)
+        """
+        keys = dedup_keys(result)
+        if not keys:
+            # ไม่มีข้อมูลพอจะระบุตัวตน ถือเป็นรายการใหม่เสมอ
+            return True
+
+        with self._lock:
+            if any(key in self._keys for key in keys):
+                # ผูกคีย์ที่เพิ่งพบเข้ากับธุรกิจเดิม เผื่อรายการถัดไปมีเพียงคีย์นั้น
+                new_keys = [key for key in keys if key not in self._keys]
+                self._remember(new_keys)
+                return False
+
+            self._remember(keys)
+            return True
+
+    def _remember(self, keys):
+        self._keys.update(keys)
+        if self._conn is not None:
+            now = time.time()
+            self._pending.extend((key, now) for key in keys)
+
+    def filter_new(self, results):
+        """
+        คัดเฉพาะผลลัพธ์ที่ยังไม่เคยพบ และเพิ่มลงดัชนี
+
+        Args:
+            results (list): ผลลัพธ์ดิบจาก SerpApi
+
+        Returns:
+            list: ผลลัพธ์ที่เป็นธุรกิจใหม่ ตามลำดับเดิม
+        """
+        return [result for result in results if self.add(result)]
+
+    def flush(self):
+        """บันทึกคีย์ใหม่ลงดิสก์ (ไม่มีผลหากไม่ได้กำหนด path)"""
+        if self._conn is None:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if pending:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO seen_keys (key, first_seen) VALUES (?, ?)", pending
+                )
+                self._conn.commit()
+
+    def clear(self):
+        """ลบคีย์ทั้งหมดทั้งในหน่วยความจำและบนดิสก์"""
+        with self._lock:
+            self._keys.clear()
+            self._pending = []
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM seen_keys")
+                self._conn.commit()
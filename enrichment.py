@@ -0,0 +1,363 @@
+"""
+ดึงอีเมล ลิงก์ LINE / Facebook และเบอร์โทรเพิ่มเติมจากเว็บไซต์ของธุรกิจ (enrichment)
+
+เปิดหน้าแรกและหน้าติดต่อของแต่ละเว็บไซต์พร้อมกันหลายเว็บ โดย:
+    - เคารพ robots.txt (อ่านครั้งเดียวต่อเว็บไซต์)
+    - เว้นระยะระหว่างคำขอไปยังโดเมนเดียวกัน และส่งทีละคำขอต่อโดเมน
+    - จำกัดขนาดและเวลาในการอ่านแต่ละหน้า
+    - แยกข้อมูลระหว่างอ่าน (ไม่ต้องเก็บทั้งหน้าไว้ในหน่วยความจำ)
+    - แคชผลลัพธ์ของแต่ละเว็บไซต์ไว้บนดิสก์
+
+ทดสอบในเครื่องได้ด้วย python fixture_server.py --site <โฟลเดอร์เว็บไซต์>
+"""
+import asyncio
+import codecs
+import logging
+import os
+import re
+import time
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from extraction import EMAIL_PATTERN
+
+
+logger = logging.getLogger(__name__)
+
+ENRICH_CONCURRENCY = int(os.getenv('ENRICH_CONCURRENCY', '8'))
+# ระยะห่างขั้นต่ำระหว่างคำขอไปยังโดเมนเดียวกัน (วินาที)
+ENRICH_DOMAIN_DELAY = float(os.getenv('ENRICH_DOMAIN_DELAY', '1'))
+# เวลาสูงสุดในการอ่านหนึ่งหน้า (วินาที) และขนาดสูงสุดที่อ่าน (KB)
+ENRICH_TIMEOUT = float(os.getenv('ENRICH_TIMEOUT', '10'))
+ENRICH_MAX_KB = int(os.getenv('ENRICH_MAX_KB', '512'))
+ENRICH_USER_AGENT = os.getenv('ENRICH_USER_AGENT', 'gg-lead-enricher/1.0')
+ENRICH_CACHE_PATH = os.getenv('ENRICH_CACHE_PATH', 'enrich_cache.sqlite3')
+ENRICH_CACHE_TTL = int(os.getenv('ENRICH_CACHE_TTL', str(7 * 86400)))
+ENRICH_CACHE_MAX_ENTRIES = int(os.getenv('ENRICH_CACHE_MAX_ENTRIES', '20000'))
+
+# คอลัมน์ที่เพิ่มในตารางผลลัพธ์
+LINE_COLUMN = "LINE"
+FACEBOOK_COLUMN = "Facebook"
+EXTRA_PHONES_COLUMN = "เบอร์โทรเพิ่มเติม"
+
+LINE_PATTERN = re.compile(r"(?:line\.me/(?:R/)?ti/p/[~@%\w.-]+|lin\.ee/[\w-]+)", re.IGNORECASE)
+FACEBOOK_PATTERN = re.compile(
+    r"(?:facebook\.com|fb\.com|fb\.me)/"
+    r"(?!sharer|share\b|plugins|tr\b|dialog|login|policy|help|watch)"
+    r"(?:profile\.php\?id=\d+|[\w.%-]+)",
+    re.IGNORECASE,
+)
+# เบอร์โทรไทย: 0 หรือ +66 ตามด้วยตัวเลข 8-9 หลัก (คั่นด้วยช่องว่างหรือขีดได้)
+PHONE_PATTERN = re.compile(r"(?<![\w+])(?:\+66[\s-]?|0)\d(?:[\s-]?\d){7,8}(?![\d])")
+# ลิงก์ไปหน้าติดต่อ (contact / ติดต่อ ทั้งแบบตัวอักษรไทยและแบบ URL-encoded)
+CONTACT_LINK_PATTERN = re.compile(
+    r"""href\s*=\s*["']([^"'#>]*(?:contact|ติดต่อ|%E0%B8%95%E0%B8%B4%E0%B8%94%E0%B8%95%E0%B9%88%E0%B8%AD)[^"'#>]*)["']""",
+    re.IGNORECASE,
+)
+
+# อีเมลปลอมที่มักพบในไฟล์รูปภาพและโค้ดของเว็บไซต์
+_IGNORED_EMAIL_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp")
+_IGNORED_EMAIL_DOMAINS = ("example.com", "sentry.io", "wixpress.com")
+
+
+def normalize_url(website):
+    """
+    แปลงเว็บไซต์จาก SerpApi เป็น URL ที่เปิดได้ (เติม http:// หากไม่มี scheme)
+
+    Returns:
+        str: URL หรือ None หากไม่ใช่เว็บไซต์
+    """
+    if not isinstance(website, str) or not website.strip():
+        return None
+    url = website.strip()
+    if "://" not in url:
+        url = f"http://{url}"
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    return url
+
+
+def _host(url):
+    host = urlsplit(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def _phone_digits(phone):
+    digits = re.sub(r"\D", "", phone)
+    return f"0{digits[2:]}" if digits.startswith("66") else digits
+
+
+class ContactExtractor:
+    """
+    แยกอีเมล ลิงก์ LINE / Facebook เบอร์โทร และลิงก์หน้าติดต่อจากข้อความที่อ่านทีละส่วน
+
+    เก็บท้ายข้อความของส่วนก่อนหน้าไว้ OVERLAP ตัวอักษร เพื่อให้พบข้อมูลที่ถูกตัดระหว่างสองส่วน
+    """
+
+    OVERLAP = 256
+
+    def __init__(self):
+        self.emails = {}
+        self.line = {}
+        self.facebook = {}
+        self.phones = {}
+        self.contact_links = {}
+        self._tail = ""
+        # ตำแหน่งใน _tail ที่เป็นส่วนท้ายของข้อมูลที่พบไปแล้ว (แยกตามรูปแบบ)
+        self._skip = {}
+        self._patterns = (
+            ("email", EMAIL_PATTERN, self._add_email),
+            ("line", LINE_PATTERN, lambda m: self.line.setdefault(f"https://{m.group(0)}", None)),
+            ("facebook", FACEBOOK_PATTERN, self._add_facebook),
+            ("phone", PHONE_PATTERN, lambda m: self.phones.setdefault(_phone_digits(m.group(0)), None)),
+            ("contact", CONTACT_LINK_PATTERN, lambda m: self.contact_links.setdefault(m.group(1), None)),
+        )
+
+    def _add_email(self, match):
+        email = match.group(0).lower()
+        if email.endswith(_IGNORED_EMAIL_SUFFIXES) or email.split("@")[1] in _IGNORED_EMAIL_DOMAINS:
+            return
+        self.emails.setdefault(email, None)
+
+    def _add_facebook(self, match):
+        link = match.group(0)
+        if link.lower().startswith("facebook"):
+            link = f"www.{link}"
+        self.facebook.setdefault(f"https://{link}", None)
+
+    def feed(self, text, final=False):
+        """
+        อ่านข้อความส่วนถัดไป
+
+        Args:
+            text (str): ข้อความ (decode แล้ว)
+            final (bool): เป็นส่วนสุดท้ายของหน้า
+        """
+        buffer = self._tail + text
+        # ข้อมูลที่เริ่มหลัง cut อาจยังไม่ครบ จึงรอส่วนถัดไปก่อน
+        cut = len(buffer) if final else max(0, len(buffer) - self.OVERLAP)
+        for name, pattern, add in self._patterns:
+            skip = end = self._skip.get(name, 0)
+            for match in pattern.finditer(buffer):
+                if match.start() < skip:
+                    continue
+                if match.start() >= cut:
+                    break
+                add(match)
+                end = match.end()
+            self._skip[name] = 0 if final else max(0, end - cut)
+        self._tail = "" if final else buffer[cut:]
+
+    def contact_url(self, base_url):
+        """ลิงก์หน้าติดต่อแรกที่อยู่ในเว็บไซต์เดียวกัน (None หากไม่มี)"""
+        for href in self.contact_links:
+            url = urljoin(base_url, href.strip())
+            if urlsplit(url).scheme in ("http", "https") and _host(url) == _host(base_url):
+                return url
+        return None
+
+    def result(self):
+        """
+        ข้อมูลที่พบทั้งหมด
+
+        Returns:
+            dict: emails, line, facebook, phones (list ตามลำดับที่พบ)
+        """
+        return {
+            "emails": list(self.emails),
+            "line": list(self.line),
+            "facebook": list(self.facebook),
+            "phones": list(self.phones),
+        }
+
+
+class WebsiteEnricher:
+    """
+    ดึงข้อมูลติดต่อจากเว็บไซต์ของธุรกิจหลายเว็บพร้อมกัน
+
+    ใช้ asyncio ควบคุมจำนวนเว็บไซต์ที่เปิดพร้อมกันและระยะห่างต่อโดเมน
+    ส่วนการอ่าน HTTP ใช้ requests.Session (connection pool เดียวกัน) ใน thread pool
+    ควรสร้างใหม่ต่อการ enrich หนึ่งครั้ง ส่วน cache ใช้ร่วมกันได้
+    """
+
+    def __init__(self, cache=None, concurrency=ENRICH_CONCURRENCY, domain_delay=ENRICH_DOMAIN_DELAY,
+                 timeout=ENRICH_TIMEOUT, max_bytes=ENRICH_MAX_KB * 1024, user_agent=ENRICH_USER_AGENT):
+        self.cache = cache
+        self.concurrency = concurrency
+        self.domain_delay = domain_delay
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.user_agent = user_agent
+        self.pages_fetched = 0
+        self.blocked = 0
+        self.failed = 0
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"User-Agent": user_agent, "Accept": "text/html,*/*;q=0.5"})
+
+        self._robots = {}
+
+    def _read(self, url, sink):
+        # อ่านหน้าเว็บทีละส่วนจนครบ หรือเกินขนาด/เวลาที่กำหนด (ทำงานใน thread)
+        deadline = time.monotonic() + self.timeout
+        with self.session.get(url, stream=True, timeout=(min(5.0, self.timeout), self.timeout)) as response:
+            content_type = response.headers.get("Content-Type", "")
+            if response.status_code >= 400 or not content_type.startswith(("text/", "application/xhtml")):
+                return response.status_code, response.url
+
+            encoding = response.encoding if "charset" in content_type.lower() else "utf-8"
+            try:
+                decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+            received = 0
+            for chunk in response.iter_content(16 * 1024):
+                received += len(chunk)
+                sink(decoder.decode(chunk))
+                if received >= self.max_bytes or time.monotonic() > deadline:
+                    logger.debug("หยุดอ่าน %s ที่ %d bytes", url, received)
+                    break
+            sink(decoder.decode(b"", final=True), final=True)
+            return response.status_code, response.url
+
+    async def _get(self, url, sink):
+        # ส่งคำขอทีละคำขอต่อโดเมน และเว้นระยะตาม domain_delay (หรือ Crawl-delay ใน robots.txt)
+        host = _host(url)
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            delay = max(self.domain_delay, self._crawl_delays.get(host) or 0)
+            wait = self._last_request.get(host, float("-inf")) + delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await asyncio.to_thread(self._read, url, sink)
+            finally:
+                self._last_request[host] = time.monotonic()
+                self.pages_fetched += 1
+
+    async def _allowed(self, url):
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        lock = self._robots_locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            if origin not in self._robots:
+                self._robots[origin] = await self._load_robots(origin)
+        parser = self._robots[origin]
+        self._crawl_delays.setdefault(_host(url), parser.crawl_delay(self.user_agent))
+        return parser.can_fetch(self.user_agent, url)
+
+    async def _load_robots(self, origin):
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        parts = []
+        # เชื่อมต่อไม่ได้ให้ error ส่งต่อไป (ไม่ต้องลองเปิดหน้าอื่นของเว็บไซต์เดียวกัน)
+        status, _ = await self._get(parser.url, lambda text, final=False: parts.append(text))
+        if status in (401, 403):
+            parser.disallow_all = True
+        elif status >= 400:
+            parser.allow_all = True
+        else:
+            parser.parse("".join(parts).splitlines())
+        return parser
+
+    async def _enrich_site(self, url):
+        cached = self.cache.get({"enrich": url}) if self.cache is not None else None
+        if cached is not None:
+            return cached
+
+        extractor = ContactExtractor()
+        async with self._semaphore:
+            try:
+                if not await self._allowed(url):
+                    self.blocked += 1
+                    result = {**extractor.result(), "blocked": True}
+                else:
+                    status, final_url = await self._get(url, extractor.feed)
+                    contact = extractor.contact_url(final_url or url) if status < 400 else None
+                    if contact and contact.rstrip("/") != url.rstrip("/") and await self._allowed(contact):
+                        await self._get(contact, extractor.feed)
+                    result = extractor.result()
+            except (requests.RequestException, ValueError) as e:
+                logger.debug("อ่านเว็บไซต์ %s ไม่สำเร็จ: %s", url, e)
+                self.failed += 1
+                # ไม่แคชผลลัพธ์ที่ผิดพลาด เพื่อให้ลองใหม่ครั้งถัดไป
+                return extractor.result()
+
+        if self.cache is not None:
+            self.cache.set({"enrich": url}, result)
+        return result
+
+    async def enrich_many(self, websites):
+        """
+        ดึงข้อมูลติดต่อจากหลายเว็บไซต์พร้อมกัน
+
+        Args:
+            websites (list): เว็บไซต์ของธุรกิจ
+
+        Returns:
+            dict: เว็บไซต์ -> ข้อมูลที่พบ (emails, line, facebook, phones)
+        """
+        # สถานะของการรันครั้งนี้ (asyncio primitive ผูกกับ event loop ที่สร้าง)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._host_locks = {}
+        self._robots_locks = {}
+        self._last_request = {}
+        self._crawl_delays = {}
+
+        urls = {website: normalize_url(website) for website in dict.fromkeys(websites)}
+        unique = [url for url in dict.fromkeys(urls.values()) if url]
+        results = await asyncio.gather(*(self._enrich_site(url) for url in unique))
+        by_url = dict(zip(unique, results))
+        return {website: by_url[url] for website, url in urls.items() if url}
+
+    def enrich(self, websites):
+        """enrich_many แบบ synchronous (สำหรับ Streamlit และ command line)"""
+        return asyncio.run(self.enrich_many(websites))
+
+    def enrich_frame(self, df):
+        """
+        เติมอีเมลที่ไม่มี และเพิ่มคอลัมน์ LINE, Facebook และเบอร์โทรเพิ่มเติม จากเว็บไซต์ของแต่ละธุรกิจ
+
+        Args:
+            df (pd.DataFrame): ตารางข้อมูลธุรกิจ
+
+        Returns:
+            tuple: (ตารางที่เพิ่มข้อมูลแล้ว, จำนวนธุรกิจที่ได้อีเมลเพิ่ม)
+        """
+        found = self.enrich(df["เว็บไซต์"].dropna().tolist())
+
+        emails, line, facebook, phones = [], [], [], []
+        for website, known_phone in zip(df["เว็บไซต์"].tolist(), df["เบอร์โทรศัพท์"].tolist()):
+            result = found.get(website) if isinstance(website, str) else None
+            if not result:
+                emails.append(None)
+                line.append(None)
+                facebook.append(None)
+                phones.append(None)
+                continue
+            known = _phone_digits(known_phone) if isinstance(known_phone, str) else None
+            extra = [phone for phone in result["phones"] if phone != known]
+            emails.append(result["emails"][0] if result["emails"] else None)
+            line.append(result["line"][0] if result["line"] else None)
+            facebook.append(result["facebook"][0] if result["facebook"] else None)
+            phones.append(", ".join(extra) if extra else None)
+
+        enriched = df.copy(deep=False)
+        new_emails = pd.array(emails, dtype="string")
+        added = int((enriched["อีเมล"].isna() & pd.notna(new_emails)).sum())
+        enriched["อีเมล"] = enriched["อีเมล"].fillna(pd.Series(new_emails, index=df.index))
+        enriched[LINE_COLUMN] = pd.array(line, dtype="string")
+        enriched[FACEBOOK_COLUMN] = pd.array(facebook, dtype="string")
+        enriched[EXTRA_PHONES_COLUMN] = pd.array(phones, dtype="string")
+        return enriched, added
+
+    def close(self):
+        self.session.close()
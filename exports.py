@@ -0,0 +1,205 @@
+import hashlib
+import importlib.util
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import metrics
+
+
+# รูปแบบไฟล์ที่ส่งออกได้: รหัส -> (ชื่อที่แสดง, นามสกุลไฟล์, MIME type)
+EXPORT_FORMATS = {
+    "csv": ("CSV", "csv", "text/csv"),
+    "xlsx": ("Excel", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet"),
+}
+
+# จำนวนแถวต่อชุดเมื่อเขียน CSV แบบทยอยเขียน
+CSV_CHUNK_ROWS = 50000
+
+
+def available_formats():
+    """
+    รูปแบบไฟล์ที่ใช้ได้ในเครื่องนี้ (Parquet ต้องมี pyarrow)
+
+    Returns:
+        list: รหัสรูปแบบไฟล์
+    """
+    formats = ["csv", "xlsx"]
+    if importlib.util.find_spec("pyarrow") is not None:
+        formats.append("parquet")
+    return formats
+
+
+def frame_digest(df):
+    """
+    ค่า hash ของเนื้อหาใน DataFrame ใช้เป็นคีย์แคชไฟล์ส่งออก
+
+    Args:
+        df (pd.DataFrame): ตารางข้อมูล
+
+    Returns:
+        str: ค่า SHA-1 ของคอลัมน์และข้อมูลทุกแถว
+    """
+    digest = hashlib.sha1()
+    digest.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def write_csv_chunked(df, target, chunk_rows=CSV_CHUNK_ROWS, encoding="utf-8-sig"):
+    """
+    เขียน CSV ทีละชุดแถว เพื่อไม่ต้องสร้างข้อความ CSV ทั้งไฟล์ไว้ในหน่วยความจำ
+
+    Args:
+        df (pd.DataFrame): ตารางข้อมูล
+        target (str | file): path ของไฟล์ หรือ binary file object
+        chunk_rows (int): จำนวนแถวต่อชุด
+        encoding (str): encoding ของไฟล์ (ค่าเริ่มต้นมี BOM เพื่อให้ Excel อ่านภาษาไทยได้)
+    """
+    if isinstance(target, str):
+        with open(target, "wb") as handle:
+            write_csv_chunked(df, handle, chunk_rows, encoding)
+        return
+
+    writer = io.TextIOWrapper(target, encoding=encoding, newline="", write_through=True)
+    try:
+        if df.empty:
+            df.to_csv(writer, index=False)
+        for start in range(0, len(df), chunk_rows):
+            df.iloc[start:start + chunk_rows].to_csv(writer, index=False, header=start == 0)
+        writer.flush()
+    finally:
+        # คืน file object ให้ผู้เรียกโดยไม่ปิดไฟล์
+        writer.detach()
+
+
+def _write_excel(df, buffer):
+    if importlib.util.find_spec("xlsxwriter") is not None:
+        # xlsxwriter โหมด constant_memory เขียนทีละแถวลงไฟล์ ใช้หน่วยความจำคงที่
+        with pd.ExcelWriter(
+            buffer, engine="xlsxwriter", engine_kwargs={"options": {"constant_memory": True}}
+        ) as writer:
+            df.to_excel(writer, index=False)
+        return
+
+    # openpyxl โหมด write-only ไม่เก็บ cell ทั้งหมดไว้ในหน่วยความจำ
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append([str(column) for column in df.columns])
+    # แปลงเป็น object ทีละชุดแถว แทนการคัดลอกทั้งตารางในครั้งเดียว
+    for start in range(0, len(df), CSV_CHUNK_ROWS):
+        chunk = df.iloc[start:start + CSV_CHUNK_ROWS]
+        for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(buffer)
+
+
+def build_export(df, fmt):
+    """
+    สร้างไฟล์ส่งออกตามรูปแบบที่กำหนด
+
+    Args:
+        df (pd.DataFrame): ตารางข้อมูล
+        fmt (str): รหัสรูปแบบไฟล์ ("csv", "xlsx", "parquet")
+
+    Returns:
+        bytes: เนื้อหาไฟล์
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"ไม่รองรับรูปแบบไฟล์ {fmt}")
+
+    buffer = io.BytesIO()
+    with metrics.timer("export_seconds", format=fmt):
+        if fmt == "csv":
+            write_csv_chunked(df, buffer)
+        elif fmt == "xlsx":
+            _write_excel(df, buffer)
+        else:
+            df.to_parquet(buffer, index=False)
+
+    data = buffer.getvalue()
+    metrics.inc("export_bytes_total", len(data), format=fmt)
+    return data
+
+
+def export_to_path(df, path):
+    """
+    บันทึกตารางเป็นไฟล์ตามนามสกุลของ path (CSV เขียนแบบทยอยเขียน)
+
+    Args:
+        df (pd.DataFrame): ตารางข้อมูล
+        path (str): path ของไฟล์ (.csv, .xlsx หรือ .parquet)
+
+    Returns:
+        str: path ของไฟล์ที่บันทึก
+    """
+    extension = path.rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        with metrics.timer("export_seconds", format="csv"):
+            write_csv_chunked(df, path)
+        metrics.inc("export_bytes_total", os.path.getsize(path), format="csv")
+    elif extension in EXPORT_FORMATS:
+        with open(path, "wb") as handle:
+            handle.write(build_export(df, extension))
+    else:
+        raise ValueError(f"ไม่รองรับนามสกุลไฟล์ .{extension}")
+    return path
+
+
+class ExportCache:
+    """
+    แคชไฟล์ส่งออกตาม hash ของผลลัพธ์และรูปแบบไฟล์ (ลบแบบ LRU เมื่อเกินขนาด)
+    """
+
+    def __init__(self, max_bytes=200 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, digest, fmt):
+        """
+        อ่านไฟล์ที่เคยสร้างไว้
+
+        Returns:
+            bytes: เนื้อหาไฟล์ หรือ None หากยังไม่เคยสร้าง
+        """
+        with self._lock:
+            data = self._items.get((digest, fmt))
+            if data is not None:
+                self._items.move_to_end((digest, fmt))
+            return data
+
+    def build(self, df, fmt, digest=None):
+        """
+        สร้างไฟล์ (หากยังไม่มีในแคช) และเก็บไว้ใช้ซ้ำ
+
+        Args:
+            df (pd.DataFrame): ตารางข้อมูล
+            fmt (str): รหัสรูปแบบไฟล์
+            digest (str): hash ของตาราง (ถ้าไม่ระบุจะคำนวณให้)
+
+        Returns:
+            bytes: เนื้อหาไฟล์
+        """
+        digest = digest or frame_digest(df)
+        data = self.get(digest, fmt)
+        if data is not None:
+            return data
+
+        data = build_export(df, fmt)
+        with self._lock:
+            key = (digest, fmt)
+            if key not in self._items:
+                self._items[key] = data
+                self._size += len(data)
+            while self._size > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+        return data
@@ -0,0 +1,241 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+
+# คอมไพล์ regex ครั้งเดียวตอน import แทนการสร้างใหม่ทุกรายการ
+EMAIL_PATTERN = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+
+# คอลัมน์ผลลัพธ์ตามลำดับที่แสดง พร้อม dtype ของแต่ละคอลัมน์
+COLUMN_DTYPES = {
+    "รหัสสถานที่": "string",
+    "ชื่อธุรกิจ": "string",
+    "ที่อยู่": "string",
+    "เบอร์โทรศัพท์": "string",
+    "เว็บไซต์": "string",
+    "ประเภทธุรกิจ": "string",
+    "คะแนนรีวิว": "Float64",
+    "จำนวนรีวิว": "Int64",
+    "สถานะ": "string",
+    "พิกัด_lat": "Float64",
+    "พิกัด_lng": "Float64",
+    "อีเมล": "string",
+}
+
+# คอลัมน์ที่ค่าซ้ำกันมาก (ประเภทธุรกิจ และพื้นที่/คำค้นหาที่เพิ่มโดยการค้นหาแบบกลุ่ม)
+# เก็บเป็น categorical: เก็บข้อความแต่ละค่าครั้งเดียว และรหัสตัวเลขต่อแถว
+CATEGORY_COLUMNS = ("ประเภทธุรกิจ", "ประเภทที่ค้นหา", "จังหวัด", "อำเภอ")
+
+# ฟิลด์ข้อความที่คัดลอกจาก SerpApi ตรง ๆ
+_TEXT_FIELDS = (
+    ("รหัสสถานที่", "place_id"),
+    ("ชื่อธุรกิจ", "title"),
+    ("ที่อยู่", "address"),
+    ("เบอร์โทรศัพท์", "phone"),
+    ("เว็บไซต์", "website"),
+    ("ประเภทธุรกิจ", "type"),
+    ("สถานะ", "hours"),
+)
+
+
+def _to_float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value):
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        # จำนวนรีวิวบางครั้งมาเป็นข้อความ เช่น "1,234"
+        digits = re.sub(r"\D", "", str(value))
+        return int(digits) if digits else None
+
+
+def _to_text(value):
+    if value is None or value == "":
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def extract_columns(local_results):
+    """
+    แปลง local_results ทั้งหน้าเป็นข้อมูลแบบคอลัมน์ในรอบเดียว
+
+    Args:
+        local_results (list): ผลลัพธ์ดิบจาก SerpApi
+
+    Returns:
+        dict: ชื่อคอลัมน์ -> รายการค่า (ค่าที่ไม่มีเป็น None)
+    """
+    columns = {name: [] for name in COLUMN_DTYPES}
+    text_columns = [(columns[name], key) for name, key in _TEXT_FIELDS]
+    ratings = columns["คะแนนรีวิว"]
+    reviews = columns["จำนวนรีวิว"]
+    lats = columns["พิกัด_lat"]
+    lngs = columns["พิกัด_lng"]
+    emails = columns["อีเมล"]
+    find_email = EMAIL_PATTERN.search
+
+    for result in local_results:
+        for column, key in text_columns:
+            column.append(_to_text(result.get(key)))
+
+        ratings.append(_to_float(result.get("rating")))
+        reviews.append(_to_int(result.get("reviews")))
+
+        coords = result.get("gps_coordinates") or {}
+        lats.append(_to_float(coords.get("latitude")))
+        lngs.append(_to_float(coords.get("longitude")))
+
+        # พยายามหา email จาก snippet
+        match = find_email(result.get("snippet") or "")
+        emails.append(match.group(0) if match else None)
+
+    return columns
+
+
+def to_category(values):
+    """
+    แปลงคอลัมน์ข้อความเป็น categorical ที่ category เป็น dtype string (เรียงตามตัวอักษร)
+
+    Args:
+        values (list | pd.Series): ค่าในคอลัมน์ (ค่าที่ไม่มีเป็น None / NA)
+
+    Returns:
+        pd.Categorical | pd.Series: คอลัมน์ categorical
+    """
+    if isinstance(values, pd.Series):
+        return values.astype("string").astype("category")
+    return pd.array(values, dtype="string").astype("category")
+
+
+def compact_frame(df):
+    """
+    แปลงคอลัมน์ใน CATEGORY_COLUMNS ที่ยังเป็นข้อความให้เป็น categorical (แก้ไขตารางเดิม)
+
+    Args:
+        df (pd.DataFrame): ตารางข้อมูลธุรกิจ
+
+    Returns:
+        pd.DataFrame: ตารางเดิม
+    """
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = to_category(df[column])
+    return df
+
+
+def columns_to_frame(columns):
+    """
+    สร้าง DataFrame ที่มี dtype ถูกต้องจากข้อมูลแบบคอลัมน์
+
+    Args:
+        columns (dict): ผลลัพธ์จาก extract_columns
+
+    Returns:
+        pd.DataFrame: ตารางข้อมูลธุรกิจ
+    """
+    return pd.DataFrame({
+        name: to_category(columns[name]) if name in CATEGORY_COLUMNS else pd.array(columns[name], dtype=dtype)
+        for name, dtype in COLUMN_DTYPES.items()
+    })
+
+
+class FrameBuffer:
+    """
+    บัฟเฟอร์แบบคอลัมน์สำหรับสะสมผลลัพธ์หลายหน้า แล้วสร้าง DataFrame ครั้งเดียว
+
+    แต่ละหน้าถูกแปลงต่อท้ายรายการค่าของแต่ละคอลัมน์โดยตรง แทนการสร้าง DataFrame ทีละหน้า
+    แล้ว concat ซึ่งคัดลอกข้อมูลทุกหน้าอีกรอบ ตารางที่ได้ถูกใช้ร่วมกันทั้งการแสดงผลและการส่งออก
+    """
+
+    def __init__(self):
+        self.columns = {name: [] for name in COLUMN_DTYPES}
+        self._frame = None
+
+    def __len__(self):
+        return len(self.columns["รหัสสถานที่"])
+
+    def append(self, local_results):
+        """
+        แปลงผลลัพธ์หนึ่งหน้าต่อท้ายบัฟเฟอร์
+
+        Args:
+            local_results (list): ผลลัพธ์ดิบจาก SerpApi
+        """
+        with metrics.timer("extract_seconds"):
+            for name, values in extract_columns(local_results).items():
+                self.columns[name].extend(values)
+        metrics.inc("extract_records_total", len(local_results))
+        self._frame = None
+
+    def to_frame(self, sources=None):
+        """
+        สร้าง DataFrame จากบัฟเฟอร์ (สร้างใหม่เฉพาะเมื่อมีหน้าเพิ่มหลังการเรียกครั้งก่อน)
+
+        Args:
+            sources (dict): คอลัมน์ที่ทุกแถวมีค่าเดียวกัน เช่น {"จังหวัด": "เชียงใหม่"}
+                (เก็บเป็น categorical ที่มีค่าเดียว ใช้หน่วยความจำเพียงรหัสต่อแถว)
+
+        Returns:
+            pd.DataFrame: ตารางข้อมูลธุรกิจ
+        """
+        if self._frame is None:
+            self._frame = columns_to_frame(self.columns)
+        if not sources:
+            return self._frame
+        df = self._frame.copy(deep=False)
+        for name, value in sources.items():
+            # รหัส -1 คือค่าว่าง
+            categories = [] if value is None else [value]
+            codes = np.full(len(df), len(categories) - 1, dtype=np.int8)
+            df[name] = pd.Categorical.from_codes(
+                codes, dtype=pd.CategoricalDtype(pd.array(categories, dtype="string"))
+            )
+        return df
+
+
+def extract_frame(local_results):
+    """
+    แปลง local_results เป็น DataFrame ที่มี dtype ถูกต้องโดยตรง
+
+    Args:
+        local_results (list): ผลลัพธ์ดิบจาก SerpApi
+
+    Returns:
+        pd.DataFrame: ตารางข้อมูลธุรกิจ
+    """
+    with metrics.timer("extract_seconds"):
+        df = columns_to_frame(extract_columns(local_results))
+    metrics.inc("extract_records_total", len(df))
+    return df
+
+
+def empty_frame():
+    """DataFrame ว่างที่มีคอลัมน์และ dtype ครบ"""
+    return extract_frame([])
+
+
+def concat_frames(frames):
+    """
+    ต่อ DataFrame หลายชุดเข้าด้วยกันโดยคง dtype เดิม
+
+    Args:
+        frames (list): รายการ DataFrame
+
+    Returns:
+        pd.DataFrame: ตารางที่รวมแล้ว (ว่างหากไม่มีข้อมูล)
+    """
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return empty_frame()
+    # คอลัมน์ categorical ที่ category ต่างกันถูกต่อเป็นข้อความ จึงแปลงกลับเป็น categorical
+    return compact_frame(pd.concat(frames, ignore_index=True))
@@ -0,0 +1,168 @@
+"""
+เซิร์ฟเวอร์จำลอง SerpApi สำหรับทดสอบในเครื่อง โดยตอบกลับด้วยผลลัพธ์ที่บันทึกไว้ (recorded fixtures)
+
+ไฟล์ fixture ตั้งชื่อตาม cache key ของพารามิเตอร์ (ดู search_cache.make_cache_key)
+หากไม่พบไฟล์ที่ตรงกันจะใช้ default.json ในโฟลเดอร์เดียวกัน (ถ้ามี)
+
+ตัวอย่าง:
+    python fixture_server.py --fixtures fixtures/google_maps --port 8765
+    SERPAPI_BASE_URL=http://127.0.0.1:8765 streamlit run main.py
+
+    # บันทึกผลลัพธ์จริงจาก SerpApi ไว้ใช้ซ้ำ
+    python fixture_server.py --fixtures fixtures/google_maps --record
+
+    # เว็บไซต์จำลองสำหรับทดสอบการดึงอีเมล/โซเชียล (enrichment.py)
+    python fixture_server.py --site fixtures/sites --port 8766
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+from functools import partial
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from search_cache import make_cache_key
+
+
+logger = logging.getLogger(__name__)
+
+
+def fixture_path(directory, params):
+    """path ของไฟล์ fixture สำหรับพารามิเตอร์ที่กำหนด"""
+    return os.path.join(directory, f"{make_cache_key(params)}.json")
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    server_version = "gg-lead-fixtures/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        directory = self.server.fixtures_dir
+
+        path = fixture_path(directory, params)
+        if not os.path.exists(path) and self.server.upstream is not None:
+            self._record(params, path)
+
+        if not os.path.exists(path):
+            path = os.path.join(directory, "default.json")
+
+        if not os.path.exists(path):
+            self._send(404, {"error": "ไม่พบ fixture สำหรับคำขอนี้"})
+            return
+
+        with open(path, encoding="utf-8") as handle:
+            self._send(200, json.load(handle))
+
+    def _record(self, params, path):
+        try:
+            payload = self.server.upstream.get_json(params, urlsplit(self.path).path)
+        except Exception as e:
+            logger.warning("บันทึก fixture ไม่สำเร็จ: %s", e)
+            return
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, ensure_ascii=False)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+def start_fixture_server(fixtures_dir, host="127.0.0.1", port=0, upstream=None):
+    """
+    เริ่ม fixture server ใน background thread
+
+    Args:
+        fixtures_dir (str): โฟลเดอร์ที่เก็บไฟล์ fixture
+        host (str): host ที่ bind
+        port (int): port (0 คือให้ระบบเลือกให้)
+        upstream (SerpApiTransport): ชั้นเชื่อมต่อ SerpApi จริง สำหรับบันทึก fixture ที่ยังไม่มี
+
+    Returns:
+        ThreadingHTTPServer: เซิร์ฟเวอร์ (ดู base URL ได้จาก server.base_url)
+    """
+    os.makedirs(fixtures_dir, exist_ok=True)
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    server.daemon_threads = True
+    server.fixtures_dir = fixtures_dir
+    server.upstream = upstream
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+class SiteHandler(SimpleHTTPRequestHandler):
+    """ส่งไฟล์ในโฟลเดอร์ตรง ๆ (หน้าเว็บ และ robots.txt) โดยไม่เขียน log ลง stderr"""
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+def start_site_server(site_dir, host="127.0.0.1", port=0):
+    """
+    เริ่มเซิร์ฟเวอร์เว็บไซต์จำลองจากไฟล์ในโฟลเดอร์ ใน background thread
+
+    Args:
+        site_dir (str): โฟลเดอร์ไฟล์เว็บไซต์ (เช่น index.html, contact.html, robots.txt)
+        host (str): host ที่ bind
+        port (int): port (0 คือให้ระบบเลือกให้)
+
+    Returns:
+        ThreadingHTTPServer: เซิร์ฟเวอร์ (ดู base URL ได้จาก server.base_url)
+    """
+    server = ThreadingHTTPServer((host, port), partial(SiteHandler, directory=site_dir))
+    server.daemon_threads = True
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="เซิร์ฟเวอร์จำลอง SerpApi จาก fixture ที่บันทึกไว้")
+    parser.add_argument("--fixtures", default="fixtures/google_maps", help="โฟลเดอร์ไฟล์ fixture")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--record", action="store_true", help="ดึงผลลัพธ์จริงจาก SerpApi เมื่อไม่มี fixture")
+    parser.add_argument("--site", help="ส่งไฟล์เว็บไซต์จำลองจากโฟลเดอร์นี้แทน SerpApi")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.site:
+        server = start_site_server(args.site, args.host, args.port)
+        logger.info("เว็บไซต์จำลองพร้อมใช้งานที่ %s", server.base_url)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    upstream = None
+    if args.record:
+        from transport import SerpApiTransport
+        upstream = SerpApiTransport()
+
+    server = start_fixture_server(args.fixtures, args.host, args.port, upstream)
+    logger.info("fixture server พร้อมใช้งานที่ %s", server.base_url)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import numpy as np
+
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# ความละเอียดเริ่มต้นที่ใช้เก็บในฐานข้อมูล (7 ตัวอักษร ประมาณ 150 x 150 เมตร)
+DEFAULT_PRECISION = 7
+
+
+def encode(lat, lng, precision=DEFAULT_PRECISION):
+    """
+    แปลงพิกัดเป็น geohash
+
+    geohash ที่ขึ้นต้นเหมือนกันอยู่ในพื้นที่เดียวกัน จึงค้นหาตามพื้นที่ด้วย prefix ของ index ได้
+
+    Args:
+        lat (float): ละติจูด
+        lng (float): ลองจิจูด
+        precision (int): จำนวนตัวอักษร
+
+    Returns:
+        str: geohash หรือ None หากไม่มีพิกัด
+    """
+    if lat is None or lng is None:
+        return None
+
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        # บิตคู่แบ่งลองจิจูด บิตคี่แบ่งละติจูด สลับกันไป
+        value, bounds = (lng, lng_range) if even else (lat, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            bounds[0] = middle
+        else:
+            bits <<= 1
+            bounds[1] = middle
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def prefix_range(prefix):
+    """
+    ช่วงค่าของ geohash ที่ขึ้นต้นด้วย prefix สำหรับค้นหาด้วย index แบบช่วง (>= ต่ำสุด และ < สูงสุด)
+
+    Returns:
+        tuple: (ค่าต่ำสุด, ค่าสูงสุด)
+    """
+    return prefix, prefix + "~"
+
+
+def cell_size(precision):
+    """
+    ขนาดของช่อง geohash ที่ความละเอียดที่กำหนด
+
+    Returns:
+        tuple: (ความสูงเป็นองศาละติจูด, ความกว้างเป็นองศาลองจิจูด)
+    """
+    bits = precision * 5
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def covering(south, west, north, east, max_cells=32):
+    """
+    geohash ที่ครอบคลุมกรอบพื้นที่ โดยใช้ความละเอียดสูงสุดที่จำนวนช่องไม่เกิน max_cells
+
+    ใช้กับ prefix_range เพื่อให้ index ของ geohash คัดเฉพาะพื้นที่ใกล้เคียงก่อนตรวจพิกัดจริง
+
+    Args:
+        south, west, north, east (float): ขอบของกรอบพื้นที่ (องศา)
+        max_cells (int): จำนวนช่องสูงสุด
+
+    Returns:
+        list: geohash ที่เรียงแล้ว ([""] คือทุกพื้นที่)
+    """
+    for precision in range(DEFAULT_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        first_row, last_row = int((south + 90) // height), int((north + 90) // height)
+        first_col, last_col = int((west + 180) // width), int((east + 180) // width)
+        if (last_row - first_row + 1) * (last_col - first_col + 1) > max_cells:
+            continue
+        return sorted({
+            encode(-90 + (row + 0.5) * height, -180 + (col + 0.5) * width, precision)
+            for row in range(first_row, last_row + 1)
+            for col in range(first_col, last_col + 1)
+        })
+    return [""]
+
+
+def encode_many(lats, lngs, precision=DEFAULT_PRECISION):
+    """
+    แปลงพิกัดหลายจุดเป็น geohash ในครั้งเดียว (คำนวณทีละบิตพร้อมกันทุกจุดด้วย numpy)
+
+    Args:
+        lats, lngs (array-like): ละติจูดและลองจิจูด (NaN คือไม่มีพิกัด)
+        precision (int): จำนวนตัวอักษร
+
+    Returns:
+        np.ndarray: geohash ของแต่ละจุด (None หากไม่มีพิกัด)
+    """
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    valid = ~(np.isnan(lats) | np.isnan(lngs))
+    lat_low, lat_high = np.full(len(lats), -90.0), np.full(len(lats), 90.0)
+    lng_low, lng_high = np.full(len(lats), -180.0), np.full(len(lats), 180.0)
+    codes = np.zeros((len(lats), precision), dtype=np.int64)
+
+    for bit in range(precision * 5):
+        value, low, high = (lngs, lng_low, lng_high) if bit % 2 == 0 else (lats, lat_low, lat_high)
+        middle = (low + high) / 2
+        upper = value >= middle
+        np.copyto(low, middle, where=upper)
+        np.copyto(high, middle, where=~upper)
+        codes[:, bit // 5] = (codes[:, bit // 5] << 1) | upper
+
+    # แปลงรหัสเป็นตัวอักษรแบบ byte แล้วมองทั้งแถวเป็นข้อความเดียว
+    alphabet = np.frombuffer(_BASE32.encode("ascii"), dtype=np.uint8)
+    chars = np.ascontiguousarray(alphabet[codes])
+    hashes = chars.view(f"S{precision}").ravel().astype(str).astype(object)
+    hashes[~valid] = None
+    return hashes
@@ -0,0 +1,663 @@
+"""
+คิวงานค้นหาเบื้องหลัง พร้อมตารางงานบนดิสก์ (SQLite)
+
+การค้นหาถูกส่งเข้าคิวแล้วทำงานใน worker thread ของ process แทน thread ของ Streamlit
+หน้าเว็บจึงเพียงอ่านสถานะงานเป็นระยะ (การ rerun ไม่ทำให้งานหาย) และผู้ใช้หลายคนใช้ worker ชุดเดียวกัน
+
+ทุกหน้าผลลัพธ์ (งานค้นหา) ทุกช่อง (งานค้นหาแบบแบ่งพื้นที่) หรือทุกงานย่อย (งานค้นหาแบบกลุ่มและงานรีเฟรช)
+ถูกบันทึกเป็น checkpoint ทันที
+งานที่ค้างอยู่เมื่อ process หยุดจะทำต่อจาก checkpoint สุดท้ายเมื่อเริ่มคิวใหม่
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+import pandas as pd
+
+from business_search import MAX_PAGES, PAGE_SIZE, TILE_MAX_DEPTH, TILE_MAX_TILES
+from dedup import DedupIndex
+from extraction import COLUMN_DTYPES, FrameBuffer, compact_frame, concat_frames
+from planner import BudgetExceeded, CreditBudget
+from search_cache import make_cache_key
+from lead_store import DIFF_CHANGED, DIFF_GONE, DIFF_NEW, DIFF_STATUS_COLUMN
+from sweep import SweepJob, SweepRunner
+from tiling import BoundingBox, TileSearcher, TileSearchStats
+
+
+logger = logging.getLogger(__name__)
+
+# ตารางงาน จำนวน worker และอายุของงานที่เสร็จแล้วก่อนถูกลบ
+JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', 'jobs.sqlite3')
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+JOB_RETENTION_DAYS = int(os.getenv('JOB_RETENTION_DAYS', '7'))
+
+# ประเภทงาน
+KIND_SEARCH = "search"
+KIND_SWEEP = "sweep"
+KIND_TILE = "tile"
+KIND_REFRESH = "refresh"
+
+# สถานะงาน
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+
+class JobCancelled(Exception):
+    """ผู้ใช้ยกเลิกงานระหว่างทำงาน"""
+
+
+class Job:
+    """
+    สถานะของงานหนึ่งรายการ (อ่านจากตารางงาน)
+    """
+
+    def __init__(self, id, kind, params, status, steps_done, steps_total, results, message, error,
+                 created_at, updated_at, finished_at):
+        self.id = id
+        self.kind = kind
+        self.params = params
+        self.status = status
+        # จำนวนหน้า (งานค้นหา) ช่อง (งานค้นหาแบบแบ่งพื้นที่) หรืองานย่อย (งานค้นหาแบบกลุ่มและงานรีเฟรช)
+        # ที่เสร็จแล้ว / ทั้งหมด
+        self.steps_done = steps_done
+        self.steps_total = steps_total
+        self.results = results
+        self.message = message
+        self.error = error
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.finished_at = finished_at
+
+    @property
+    def active(self):
+        return self.status in ACTIVE_STATUSES
+
+    @property
+    def progress(self):
+        """สัดส่วนที่เสร็จแล้ว (0.0 - 1.0)"""
+        if self.status == DONE:
+            return 1.0
+        return min(1.0, self.steps_done / self.steps_total) if self.steps_total else 0.0
+
+    def __repr__(self):
+        return f"Job({self.id!r}, {self.kind!r}, {self.status!r}, {self.steps_done}/{self.steps_total})"
+
+
+def frame_to_payload(df):
+    """แปลงตารางผลลัพธ์เป็นข้อความ JSON สำหรับเก็บเป็น checkpoint"""
+    return df.to_json(orient="split", index=False, force_ascii=False)
+
+
+def payload_to_frame(payload):
+    """แปลง checkpoint กลับเป็นตารางผลลัพธ์ (คืน dtype ของคอลัมน์ผลลัพธ์)"""
+    df = pd.read_json(StringIO(payload), orient="split", dtype=False, convert_dates=False)
+    for column in df.columns:
+        df[column] = df[column].astype(COLUMN_DTYPES.get(column, "string"))
+    return compact_frame(df)
+
+
+class JobStore:
+    """
+    ตารางงานและ checkpoint บน SQLite (ใช้งานร่วมกันหลาย thread ได้)
+    """
+
+    _COLUMNS = ("id", "kind", "params", "status", "steps_done", "steps_total", "results", "message",
+                "error", "created_at", "updated_at", "finished_at")
+
+    def __init__(self, path=JOB_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL ให้หน้าเว็บอ่านสถานะได้ระหว่างที่ worker กำลังเขียน checkpoint
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                params_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                steps_done INTEGER NOT NULL DEFAULT 0,
+                steps_total INTEGER NOT NULL,
+                results INTEGER NOT NULL DEFAULT 0,
+                message TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS job_checkpoints (
+                job_id TEXT NOT NULL,
+                step INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (job_id, step)
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+            CREATE INDEX IF NOT EXISTS idx_jobs_params ON jobs (params_key, status);
+            """
+        )
+        self._conn.commit()
+
+    def _job(self, row):
+        if row is None:
+            return None
+        values = dict(zip(self._COLUMNS, row))
+        values["params"] = json.loads(values["params"])
+        return Job(**values)
+
+    def _select(self, where, args=()):
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE {where}", args
+            ).fetchall()
+
+    def create(self, kind, params, steps_total):
+        """
+        สร้างงานใหม่ในสถานะ queued
+
+        Returns:
+            Job: งานที่สร้าง
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, params, params_key, status, steps_total, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params, ensure_ascii=False), make_cache_key({"kind": kind, **params}),
+                 QUEUED, steps_total, now, now),
+            )
+            self._conn.commit()
+        return self.get(job_id)
+
+    def get(self, job_id):
+        """งานตาม ID (None หากไม่มี)"""
+        rows = self._select("id = ?", (job_id,))
+        return self._job(rows[0] if rows else None)
+
+    def find_active(self, kind, params):
+        """งานที่ยังไม่เสร็จซึ่งมีเงื่อนไขเดียวกัน (None หากไม่มี)"""
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        rows = self._select(
+            f"params_key = ? AND status IN ({placeholders}) ORDER BY created_at LIMIT 1",
+            (make_cache_key({"kind": kind, **params}), *ACTIVE_STATUSES),
+        )
+        return self._job(rows[0] if rows else None)
+
+    def unfinished(self):
+        """งานที่ยังไม่เสร็จทั้งหมด ตามลำดับที่สร้าง"""
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        return [self._job(row) for row in self._select(
+            f"status IN ({placeholders}) ORDER BY created_at", ACTIVE_STATUSES
+        )]
+
+    def update(self, job_id, **fields):
+        """แก้ไขสถานะ/ความคืบหน้าของงาน"""
+        fields["updated_at"] = time.time()
+        if fields.get("status") in (DONE, FAILED, CANCELLED):
+            fields["finished_at"] = fields["updated_at"]
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def add_checkpoint(self, job_id, step, payload, **fields):
+        """
+        บันทึกผลลัพธ์ของหนึ่งขั้น (หน้า/งานย่อย) พร้อมความคืบหน้าใน transaction เดียวกัน
+
+        Args:
+            job_id (str): ID ของงาน
+            step (int): ลำดับขั้น (เริ่มที่ 0)
+            payload (str): ผลลัพธ์ของขั้นนั้น (JSON)
+            **fields: ค่าที่แก้ไขในตารางงาน เช่น steps_done, results
+        """
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_checkpoints (job_id, step, payload) VALUES (?, ?, ?)",
+                (job_id, step, payload),
+            )
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def checkpoints(self, job_id):
+        """checkpoint ทั้งหมดของงาน เรียงตามลำดับขั้น"""
+        with self._lock:
+            return [payload for (payload,) in self._conn.execute(
+                "SELECT payload FROM job_checkpoints WHERE job_id = ? ORDER BY step", (job_id,)
+            )]
+
+    def purge(self, older_than_seconds):
+        """
+        ลบงานที่เสร็จแล้วนานกว่าที่กำหนด พร้อม checkpoint
+
+        Returns:
+            int: จำนวนงานที่ลบ
+        """
+        cutoff = time.time() - older_than_seconds
+        with self._lock:
+            ids = [job_id for (job_id,) in self._conn.execute(
+                "SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+            )]
+            self._conn.executemany("DELETE FROM job_checkpoints WHERE job_id = ?", [(i,) for i in ids])
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+        return len(ids)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """
+    รันงานค้นหาใน worker pool ของ process และบันทึกความคืบหน้าลง JobStore
+
+    งานที่มีเงื่อนไขเดียวกันและยังไม่เสร็จจะถูกใช้ร่วมกัน (ไม่เรียก API ซ้ำ)
+    การยกเลิกมีผลหลังหน้า/งานย่อยที่กำลังดึงอยู่เสร็จ และผลลัพธ์ที่ได้แล้วยังเปิดดูได้
+    """
+
+    def __init__(self, store, searcher, max_workers=JOB_WORKERS, dedup_index=None, lead_store=None,
+                 resume=True):
+        self.store = store
+        self.searcher = searcher
+        # ดัชนีธุรกิจที่เคยพบ สำหรับงานค้นหาแบบกลุ่มที่เลือกเฉพาะธุรกิจใหม่
+        self.dedup_index = dedup_index
+        # ฐานข้อมูลธุรกิจที่เคยพบ (จำเป็นสำหรับงานรีเฟรช)
+        self.lead_store = lead_store
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)),
+                                            thread_name_prefix="gg-lead-job")
+        self._cancel_events = {}
+        self._lock = threading.Lock()
+
+        if resume:
+            self.store.purge(JOB_RETENTION_DAYS * 86400)
+            for job in self.store.unfinished():
+                logger.info("ทำงาน %s ต่อจาก checkpoint (%d/%d)", job.id, job.steps_done, job.steps_total)
+                self._start(job.id)
+
+    def _start(self, job_id):
+        with self._lock:
+            self._cancel_events.setdefault(job_id, threading.Event())
+        self._executor.submit(self._run, job_id)
+
+    def submit(self, kind, params):
+        """
+        ส่งงานเข้าคิว
+
+        Args:
+            kind (str): KIND_SEARCH, KIND_SWEEP, KIND_TILE หรือ KIND_REFRESH
+            params (dict): เงื่อนไขของงาน (ต้องแปลงเป็น JSON ได้)
+                งานค้นหา: query, location, num_results, use_cache
+                งานค้นหาแบบกลุ่ม: jobs (รายการ [ประเภท, จังหวัด, อำเภอ]), num_results, use_cache,
+                only_new, max_workers
+                งานค้นหาแบบแบ่งพื้นที่: query, province, district (None คือทั้งจังหวัด), use_cache
+                งานรีเฟรช: jobs, num_results, max_workers, max_age_days
+                ทุกแบบ: budget (งบ credit ของงาน, 0 หรือไม่ระบุคือไม่จำกัด)
+
+        Returns:
+            Job: งานที่สร้าง หรืองานเดิมที่มีเงื่อนไขเดียวกันและยังไม่เสร็จ
+        """
+        if kind == KIND_SEARCH:
+            steps_total = self.searcher.page_count(params["num_results"])
+        elif kind == KIND_SWEEP:
+            steps_total = len(params["jobs"])
+        elif kind == KIND_TILE:
+            # จำนวนช่องทราบเมื่อหากรอบพื้นที่แล้ว (ขั้นแรก) และเพิ่มขึ้นเมื่อมีช่องถูกแบ่ง
+            steps_total = 1
+        elif kind == KIND_REFRESH:
+            if self.lead_store is None:
+                raise ValueError("งานรีเฟรชต้องใช้ฐานข้อมูลธุรกิจที่เคยพบ (lead_store)")
+            steps_total = len(self._stale_jobs(params))
+        else:
+            raise ValueError(f"ไม่รู้จักประเภทงาน {kind!r}")
+
+        with self._lock:
+            existing = self.store.find_active(kind, params)
+            if existing is not None and existing.id in self._cancel_events \
+                    and not self._cancel_events[existing.id].is_set():
+                return existing
+            job = self.store.create(kind, params, steps_total)
+        self._start(job.id)
+        return job
+
+    def get(self, job_id):
+        """สถานะล่าสุดของงาน"""
+        return self.store.get(job_id)
+
+    def cancel(self, job_id):
+        """ขอยกเลิกงาน (งานที่ยังไม่เริ่มถูกยกเลิกทันที)"""
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+        job = self.store.get(job_id)
+        if job is not None and job.status == QUEUED:
+            self.store.update(job_id, status=CANCELLED, message="ยกเลิกก่อนเริ่มทำงาน")
+
+    def result(self, job_id):
+        """
+        ตารางผลลัพธ์จาก checkpoint ของงาน (รวมผลลัพธ์บางส่วนของงานที่ล้มเหลวหรือถูกยกเลิก)
+
+        Returns:
+            pd.DataFrame: ตารางข้อมูลธุรกิจ
+        """
+        job = self.store.get(job_id)
+        checkpoints = self.store.checkpoints(job_id)
+        if job is None:
+            return concat_frames([])
+        if job.kind == KIND_SEARCH:
+            # ตัดรายการซ้ำระหว่างหน้าแบบเดียวกับ BusinessSearcher.iter_search_pages
+            dedup_index = DedupIndex()
+            buffer = FrameBuffer()
+            for payload in checkpoints:
+                buffer.append(dedup_index.filter_new(json.loads(payload)["local_results"]))
+            return buffer.to_frame()
+        if job.kind == KIND_TILE:
+            # checkpoint แรกคือกรอบพื้นที่ ผลลัพธ์ของแต่ละช่องตัดรายการซ้ำแล้ว
+            buffer = FrameBuffer()
+            for payload in checkpoints[1:]:
+                buffer.append(json.loads(payload)["local_results"])
+            return buffer.to_frame()
+        return concat_frames([payload_to_frame(json.loads(payload)["businesses"]) for payload in checkpoints])
+
+    def failures(self, job_id):
+        """
+        งานย่อยที่ล้มเหลวของงานค้นหาแบบกลุ่มหรืองานรีเฟรช
+
+        Returns:
+            list: dict ของแต่ละงานย่อย (business_type, location, error, results, partial)
+        """
+        job = self.store.get(job_id)
+        if job is None or job.kind not in (KIND_SWEEP, KIND_REFRESH):
+            return []
+        failures = []
+        for payload in self.store.checkpoints(job_id):
+            checkpoint = json.loads(payload)
+            if checkpoint.get("error") is None:
+                continue
+            job = SweepJob(*checkpoint["job"])
+            failures.append({
+                "business_type": job.business_type,
+                "location": job.location,
+                "error": checkpoint["error"],
+                "results": checkpoint["results"],
+                "partial": checkpoint["partial"],
+            })
+        return failures
+
+    def _check_cancelled(self, cancel):
+        if cancel.is_set():
+            raise JobCancelled()
+
+    def _run(self, job_id):
+        job = self.store.get(job_id)
+        with self._lock:
+            cancel = self._cancel_events.setdefault(job_id, threading.Event())
+        if job is None or not job.active:
+            return
+        if cancel.is_set():
+            self.store.update(job_id, status=CANCELLED, message="ยกเลิกก่อนเริ่มทำงาน")
+            return
+
+        self.store.update(job_id, status=RUNNING)
+        try:
+            if job.kind == KIND_SEARCH:
+                message = self._run_search(job, cancel)
+            elif job.kind == KIND_TILE:
+                message = self._run_tile(job, cancel)
+            elif job.kind == KIND_REFRESH:
+                message = self._run_refresh(job, cancel)
+            else:
+                message = self._run_sweep(job, cancel)
+        except JobCancelled:
+            self.store.update(job_id, status=CANCELLED, message="ผู้ใช้ยกเลิกงาน")
+        except BudgetExceeded as e:
+            # หยุดตามงบที่ผู้ใช้กำหนด ไม่ใช่ข้อผิดพลาด ผลลัพธ์ที่ได้แล้วยังใช้ได้
+            self.store.update(job_id, status=DONE, message=f"⛔ หยุดค้นหาเพราะ{e}")
+        except Exception as e:
+            logger.warning("งาน %s ล้มเหลว: %s", job_id, e)
+            self.store.update(job_id, status=FAILED, error=str(e))
+        else:
+            self.store.update(job_id, status=DONE, message=message)
+        finally:
+            with self._lock:
+                self._cancel_events.pop(job_id, None)
+
+    def _run_search(self, job, cancel):
+        params = job.params
+        num_results = params["num_results"]
+        checkpoints = [json.loads(payload) for payload in self.store.checkpoints(job.id)]
+        collected = sum(len(page["local_results"]) for page in checkpoints)
+        if checkpoints and not checkpoints[-1]["has_more"]:
+            self.store.update(job.id, steps_total=len(checkpoints))
+            return None
+        # credit ที่ใช้ไปก่อน process หยุดนับรวมในงบด้วย
+        budget = CreditBudget(
+            params.get("budget", 0), spent=checkpoints[-1].get("credits", 0) if checkpoints else 0
+        )
+
+        search_params = self.searcher.build_params(params["query"], params["location"], num_results)
+        step = len(checkpoints)
+        pages = self.searcher.iter_local_pages(
+            search_params, num_results, params["use_cache"], raise_errors=True,
+            start_page=step, collected=collected, budget=budget,
+        )
+        try:
+            for page_results, has_more in pages:
+                collected += len(page_results)
+                step += 1
+                self.store.add_checkpoint(
+                    job.id, step - 1,
+                    json.dumps({"local_results": page_results, "has_more": has_more, "credits": budget.spent},
+                               ensure_ascii=False),
+                    steps_done=step, results=collected,
+                    # หยุดก่อนครบจำนวนหน้าที่คาดไว้ เมื่อ Google Maps ไม่มีหน้าถัดไป
+                    steps_total=step if not has_more or collected >= num_results else job.steps_total,
+                )
+                self._check_cancelled(cancel)
+        finally:
+            pages.close()
+        return None
+
+    def _run_sweep(self, job, cancel):
+        params = job.params
+        checkpoints = [json.loads(payload) for payload in self.store.checkpoints(job.id)]
+        finished = {tuple(checkpoint["job"]) for checkpoint in checkpoints}
+        jobs = [SweepJob(*key) for key in params["jobs"] if tuple(key) not in finished]
+
+        if params["only_new"] and self.dedup_index is not None:
+            dedup_index = self.dedup_index
+        else:
+            dedup_index = DedupIndex()
+        # ธุรกิจจากงานย่อยที่ทำไปแล้ว (ก่อน process หยุด) ไม่ต้องนับเป็นธุรกิจใหม่อีก
+        for checkpoint in checkpoints:
+            for place_id in payload_to_frame(checkpoint["businesses"])["รหัสสถานที่"].dropna():
+                dedup_index.add({"place_id": place_id})
+
+        spent = max((checkpoint.get("credits", 0) for checkpoint in checkpoints), default=0)
+        budget = CreditBudget(params.get("budget", 0), spent=spent)
+        runner = SweepRunner(self.searcher, max_workers=params["max_workers"], dedup_index=dedup_index,
+                             budget=budget)
+        step = len(checkpoints)
+        results = sum(checkpoint["results"] for checkpoint in checkpoints)
+        failed = sum(checkpoint["error"] is not None for checkpoint in checkpoints)
+        partial = sum(checkpoint["partial"] for checkpoint in checkpoints)
+
+        sweep = runner.run(jobs, params["num_results"], params["use_cache"])
+        try:
+            for result in sweep:
+                step += 1
+                results += len(result.businesses)
+                failed += not result.ok
+                partial += result.partial
+                self.store.add_checkpoint(
+                    job.id, step - 1,
+                    json.dumps({
+                        "job": list(result.job.key),
+                        "businesses": frame_to_payload(result.businesses),
+                        "results": len(result.businesses),
+                        "error": result.error,
+                        "partial": result.partial,
+                        "credits": budget.spent,
+                    }, ensure_ascii=False),
+                    steps_done=step, results=results,
+                    message=f"ล่าสุด: {result.job.business_type} ใน {result.job.location}",
+                )
+                self._check_cancelled(cancel)
+        finally:
+            sweep.close()
+
+        total = len(params["jobs"])
+        message = (
+            f"🚀 ค้นหาแบบกลุ่ม {step} จาก {total} งาน | สำเร็จ {step - failed} งาน | "
+            f"ล้มเหลว {failed} งาน (ได้ผลลัพธ์บางส่วน {partial} งาน)"
+        )
+        if step < total:
+            message += f" | ⛔ หยุดเมื่อใช้ credit ครบงบ {budget.limit} (ไม่ได้ค้นหา {total - step} งาน)"
+        return message
+
+    def _run_tile(self, job, cancel):
+        params = job.params
+        query, province, district = params["query"], params["province"], params["district"]
+        location = f"{district}, {province}" if district else province
+        checkpoints = [json.loads(payload) for payload in self.store.checkpoints(job.id)]
+        spent = max((checkpoint.get("credits", 0) for checkpoint in checkpoints), default=0)
+        budget = CreditBudget(params.get("budget", 0), spent=spent)
+        tile_searcher = TileSearcher(self.searcher, max_depth=TILE_MAX_DEPTH, max_tiles=TILE_MAX_TILES,
+                                     page_size=PAGE_SIZE, budget=budget)
+
+        # ขั้นแรก: หากรอบพื้นที่ (อาจต้องค้นหาหนึ่งหน้า) แล้วบันทึกไว้ ไม่ต้องหาใหม่เมื่อทำต่อ
+        if not checkpoints:
+            bbox = tile_searcher.resolve_bounds(query, province, district, params["use_cache"])
+            if bbox is None:
+                raise ValueError(f"ไม่มีข้อมูลขอบเขตพื้นที่ของ {location} กรุณาปิดการค้นหาแบบแบ่งพื้นที่")
+            checkpoints.append({"bbox": bbox.key, "credits": budget.spent})
+            self.store.add_checkpoint(job.id, 0, json.dumps(checkpoints[0]), steps_done=0)
+            self._check_cancelled(cancel)
+        bbox = BoundingBox(*checkpoints[0]["bbox"])
+
+        # ช่องที่ค้นหาแล้ว (ก่อน process หยุด) ไม่ค้นหาซ้ำ และธุรกิจในช่องเหล่านั้นไม่นับซ้ำ
+        tiles = checkpoints[1:]
+        done = {tuple(tile["tile"]): (tile["full"], tile["error"] is not None) for tile in tiles}
+        dedup_index = DedupIndex()
+        for tile in tiles:
+            dedup_index.filter_new(tile["local_results"])
+        stats = TileSearchStats()
+        stats.duplicates = sum(tile["duplicates"] for tile in tiles)
+        results = sum(len(tile["local_results"]) for tile in tiles)
+        step = len(tiles)
+
+        search = tile_searcher.iter_search(query, bbox, PAGE_SIZE * MAX_PAGES, params["use_cache"],
+                                           dedup_index, stats, done)
+        try:
+            for result in search:
+                step += 1
+                results += len(result.results)
+                self.store.add_checkpoint(
+                    job.id, step,
+                    json.dumps({
+                        "tile": result.tile.key,
+                        "local_results": result.results,
+                        "duplicates": result.duplicates,
+                        "full": result.full,
+                        "error": result.error,
+                        "credits": budget.spent,
+                    }, ensure_ascii=False),
+                    steps_done=step, steps_total=step + result.pending, results=results,
+                )
+                self._check_cancelled(cancel)
+        finally:
+            search.close()
+        self.store.update(job.id, steps_total=step)
+
+        notes = [
+            f"🧩 ค้นหา {stats.tiles_searched} ช่อง | แบ่งย่อย {stats.tiles_subdivided} ช่อง | "
+            f"ล้มเหลว {stats.tiles_failed} ช่อง | ตัดรายการซ้ำ {stats.duplicates} รายการ"
+        ]
+        if stats.truncated:
+            notes.append(f"⚠️ ถึงจำนวนช่องสูงสุด ({TILE_MAX_TILES} ช่อง) ผลลัพธ์อาจไม่ครบทั้งพื้นที่")
+        if budget.exhausted:
+            notes.append(f"⛔ ใช้ credit ครบงบ {budget.limit} credit ผลลัพธ์อาจไม่ครบทั้งพื้นที่")
+        return "\n".join(notes)
+
+    def _stale_jobs(self, params):
+        jobs = [SweepJob(*key) for key in params["jobs"]]
+        return self.lead_store.stale_jobs(jobs, params["max_age_days"] * 86400)
+
+    def _run_refresh(self, job, cancel):
+        params = job.params
+        checkpoints = [json.loads(payload) for payload in self.store.checkpoints(job.id)]
+        finished = {tuple(checkpoint["job"]) for checkpoint in checkpoints}
+        # งานย่อยที่มี checkpoint แล้ว (ก่อน process หยุด) ไม่ต้องรีเฟรชซ้ำ แม้ผลลัพธ์จะไม่ครบ
+        stale = [stale_job for stale_job in self._stale_jobs(params) if stale_job.key not in finished]
+        self.store.update(job.id, steps_total=len(checkpoints) + len(stale))
+
+        spent = max((checkpoint.get("credits", 0) for checkpoint in checkpoints), default=0)
+        budget = CreditBudget(params.get("budget", 0), spent=spent)
+        runner = SweepRunner(self.searcher, max_workers=params["max_workers"], budget=budget)
+        step = len(checkpoints)
+        results = sum(checkpoint["results"] for checkpoint in checkpoints)
+        counts = {status: sum(checkpoint["counts"].get(status, 0) for checkpoint in checkpoints)
+                  for status in (DIFF_NEW, DIFF_CHANGED, DIFF_GONE)}
+        failed = sum(checkpoint["error"] is not None for checkpoint in checkpoints)
+
+        refresh = runner.refresh(stale, self.lead_store, params["max_age_days"] * 86400, params["num_results"])
+        try:
+            for result, diff in refresh:
+                step += 1
+                results += len(diff)
+                failed += not result.ok
+                diff_counts = diff[DIFF_STATUS_COLUMN].value_counts().to_dict() if not diff.empty else {}
+                for status in counts:
+                    counts[status] += diff_counts.get(status, 0)
+                self.store.add_checkpoint(
+                    job.id, step - 1,
+                    json.dumps({
+                        "job": list(result.job.key),
+                        "businesses": frame_to_payload(diff),
+                        "results": len(diff),
+                        "counts": {status: int(count) for status, count in diff_counts.items()},
+                        "error": result.error,
+                        "partial": result.partial,
+                        "credits": budget.spent,
+                    }, ensure_ascii=False),
+                    steps_done=step, results=results,
+                    message=f"ล่าสุด: {result.job.business_type} ใน {result.job.location}",
+                )
+                self._check_cancelled(cancel)
+        finally:
+            refresh.close()
+
+        total = len(params["jobs"])
+        stale_count = len(checkpoints) + len(stale)
+        notes = [
+            f"🔄 รีเฟรช {stale_count} จาก {total} งาน (ข้าม {total - stale_count} งานที่ข้อมูลใหม่กว่า "
+            f"{params['max_age_days']:g} วัน) | ใหม่ {counts[DIFF_NEW]} | เปลี่ยนแปลง {counts[DIFF_CHANGED]} | "
+            f"หายไป {counts[DIFF_GONE]}"
+        ]
+        if failed:
+            notes.append(f"⚠️ รีเฟรชไม่สำเร็จ {failed} งาน (จะถูกรีเฟรชอีกครั้งในรอบถัดไป)")
+        if budget.exhausted:
+            notes.append(f"⛔ ใช้ credit ครบงบ {budget.limit} credit งานที่ไม่ได้รีเฟรชจะถูกรีเฟรชในรอบถัดไป")
+        return "\n".join(notes)
+
+    def shutdown(self, wait=True):
+        """หยุดรับงานใหม่ งานที่ยังไม่เริ่มคงสถานะ queued และจะทำต่อเมื่อสร้างคิวใหม่"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,209 @@
+import logging
+import threading
+import time
+
+from rate_limit import TokenBucket
+from transport import SerpApiError
+
+
+logger = logging.getLogger(__name__)
+
+# กลยุทธ์การเลือก key
+ROUND_ROBIN = "round_robin"
+LEAST_USED = "least_used"
+
+# ข้อความ error ของ SerpApi ที่หมายถึงโควตาของ key หมดแล้ว
+QUOTA_ERROR_HINTS = ("run out of searches", "out of searches", "plan limit")
+
+
+def mask_key(value):
+    """ซ่อน API key สำหรับแสดงผล เหลือเฉพาะหัวท้าย"""
+    if len(value) <= 8:
+        return "****"
+    return f"{value[:4]}…{value[-4:]}"
+
+
+class ApiKey:
+    """
+    สถานะของ API key หนึ่งตัวใน KeyPool
+    """
+
+    def __init__(self, value, rate=5.0, burst=5):
+        self.value = value
+        self.bucket = TokenBucket(rate, burst)
+        self.requests = 0
+        self.errors = 0
+        # จำนวนการค้นหาที่เหลือในรอบบิล (None คือยังไม่ทราบ)
+        self.quota_left = None
+        self.cooldown_until = 0.0
+        # key ใช้ไม่ได้จนกว่าจะรีเฟรชโควตา (โควตาหมด หรือ key ไม่ถูกต้อง)
+        self.disabled_reason = None
+
+    @property
+    def label(self):
+        return mask_key(self.value)
+
+    def available(self, now):
+        return self.disabled_reason is None and now >= self.cooldown_until
+
+
+class KeyPool:
+    """
+    กลุ่ม API key ของ SerpApi ที่กระจายคำขอไปทุก key (ใช้งานร่วมกันหลาย thread ได้)
+
+    แต่ละ key มี token bucket ของตัวเอง ทำให้อัตราการเรียกรวมเพิ่มตามจำนวน key
+    key ที่โดน 429 จะพักตามเวลา cooldown ส่วน key ที่โควตาหมดหรือไม่ถูกต้องจะถูกข้ามไป
+
+    กลยุทธ์:
+        - round_robin: วนใช้ทีละ key โดยเลือก key ที่มี token เหลือก่อน
+        - least_used: เลือก key ที่เหลือโควตามากที่สุด (หรือใช้ไปน้อยที่สุดหากไม่ทราบโควตา)
+    """
+
+    def __init__(self, keys, rate=5.0, burst=5, strategy=ROUND_ROBIN, cooldown=60.0):
+        keys = list(dict.fromkeys(key for key in keys if key))
+        if not keys:
+            raise ValueError("ต้องมี API key อย่างน้อยหนึ่งตัว")
+        if strategy not in (ROUND_ROBIN, LEAST_USED):
+            raise ValueError(f"ไม่รู้จักกลยุทธ์ {strategy}")
+        self.keys = [ApiKey(key, rate, burst) for key in keys]
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _candidates(self, now):
+        available = [key for key in self.keys if key.available(now)]
+        if self.strategy == LEAST_USED:
+            return sorted(
+                available,
+                key=lambda k: (-(k.quota_left if k.quota_left is not None else float("inf")), k.requests),
+            )
+        # round robin: เริ่มจาก key ถัดจากที่ใช้ล่าสุด
+        count = len(self.keys)
+        order = [self.keys[(self._cursor + i) % count] for i in range(count)]
+        return [key for key in order if key in available]
+
+    def _unavailable_error(self, now):
+        cooling = [key.cooldown_until - now for key in self.keys if key.disabled_reason is None]
+        if not cooling:
+            return SerpApiError("API key ทุกตัวใช้โควตาหมดหรือใช้งานไม่ได้", retryable=False)
+        error = SerpApiError(
+            "API key ทุกตัวอยู่ระหว่างพักการใช้งาน",
+            status=429,
+            retry_after=max(0.0, min(cooling)),
+        )
+        # ไม่ได้ส่งคำขอไปที่ SerpApi จึงไม่นับเป็นความล้มเหลวของ circuit breaker
+        error.upstream = False
+        return error
+
+    def acquire(self):
+        """
+        เลือก key สำหรับคำขอถัดไป และรอจนกว่า key นั้นจะเรียกได้ตามอัตราที่กำหนด
+
+        Returns:
+            ApiKey: key ที่ใช้ส่งคำขอ
+
+        Raises:
+            SerpApiError: เมื่อไม่มี key ที่ใช้ได้ (status 429 พร้อม retry_after หากรอแล้วจะมี key ว่าง)
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = self._candidates(now)
+            if not candidates:
+                raise self._unavailable_error(now)
+
+            # เลือก key ที่มี token พร้อมใช้ทันทีก่อน หากไม่มีจึงรอ key ลำดับแรก
+            chosen = next((key for key in candidates if key.bucket.try_acquire()), None)
+            ready = chosen is not None
+            chosen = chosen or candidates[0]
+            self._cursor = (self.keys.index(chosen) + 1) % len(self.keys)
+            chosen.requests += 1
+
+        if not ready:
+            chosen.bucket.acquire()
+        return chosen
+
+    def report_success(self, key):
+        with self._lock:
+            if key.quota_left is not None:
+                key.quota_left = max(0, key.quota_left - 1)
+
+    def report_failure(self, key, error):
+        """
+        บันทึกความล้มเหลวของ key และพักหรือปิด key ตามชนิดของข้อผิดพลาด
+
+        Returns:
+            bool: True หากยังมี key อื่นที่ลองใหม่ได้
+        """
+        status = getattr(error, "status", None)
+        message = str(error).lower()
+
+        with self._lock:
+            key.errors += 1
+            if any(hint in message for hint in QUOTA_ERROR_HINTS):
+                key.disabled_reason = "โควตาหมด"
+                key.quota_left = 0
+            elif status in (401, 403):
+                key.disabled_reason = "key ไม่ถูกต้อง"
+            elif status == 429:
+                wait = getattr(error, "retry_after", None) or self.cooldown
+                key.cooldown_until = time.monotonic() + wait
+            else:
+                return False
+
+            logger.warning("พักการใช้ API key %s: %s", key.label, error)
+            now = time.monotonic()
+            return any(other.available(now) for other in self.keys)
+
+    def refresh_quota(self, transport):
+        """
+        อ่านโควตาคงเหลือของทุก key จาก Account API ของ SerpApi (ไม่เสีย credit)
+
+        key ที่ถูกปิดไว้จะกลับมาใช้ได้หากยังมีโควตาเหลือ
+
+        Args:
+            transport (SerpApiTransport): ชั้นเชื่อมต่อ SerpApi
+        """
+        for key in self.keys:
+            try:
+                account = transport.get_json({"api_key": key.value}, path="/account.json")
+            except SerpApiError as e:
+                logger.warning("อ่านโควตาของ key %s ไม่สำเร็จ: %s", key.label, e)
+                if e.status in (401, 403):
+                    with self._lock:
+                        key.disabled_reason = "key ไม่ถูกต้อง"
+                continue
+
+            left = account.get("total_searches_left", account.get("plan_searches_left"))
+            with self._lock:
+                key.quota_left = left
+                key.disabled_reason = "โควตาหมด" if left == 0 else None
+
+    def usage(self):
+        """
+        สถิติการใช้งานของแต่ละ key
+
+        Returns:
+            list: dict ของแต่ละ key (key, requests, errors, quota_left, state)
+        """
+        now = time.monotonic()
+        rows = []
+        with self._lock:
+            for key in self.keys:
+                if key.disabled_reason:
+                    state = key.disabled_reason
+                elif now < key.cooldown_until:
+                    state = f"พัก {key.cooldown_until - now:.0f} วินาที"
+                else:
+                    state = "พร้อมใช้งาน"
+                rows.append({
+                    "key": key.label,
+                    "requests": key.requests,
+                    "errors": key.errors,
+                    "quota_left": key.quota_left,
+                    "state": state,
+                })
+        return rows
@@ -0,0 +1,536 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from extraction import COLUMN_DTYPES, columns_to_frame, compact_frame, to_category
+from geohash import covering, encode as geohash_encode, prefix_range
+from spatial import CLUSTER_COLUMNS, MAP_MAX_CLUSTERS, bounding_box, cluster_precision, haversine_km
+
+
+# คอลัมน์ของตารางผลลัพธ์ -> คอลัมน์ในฐานข้อมูล
+STORE_COLUMNS = {
+    "รหัสสถานที่": "place_id",
+    "ชื่อธุรกิจ": "name",
+    "ที่อยู่": "address",
+    "เบอร์โทรศัพท์": "phone",
+    "เว็บไซต์": "website",
+    "ประเภทธุรกิจ": "category",
+    "คะแนนรีวิว": "rating",
+    "จำนวนรีวิว": "reviews",
+    "สถานะ": "hours",
+    "พิกัด_lat": "lat",
+    "พิกัด_lng": "lng",
+    "อีเมล": "email",
+}
+
+# คอลัมน์ที่มาของข้อมูล (เพิ่มโดยการค้นหาแบบกลุ่ม) -> คอลัมน์ในฐานข้อมูล
+SOURCE_COLUMNS = {
+    "ประเภทที่ค้นหา": "search_type",
+    "จังหวัด": "province",
+    "อำเภอ": "district",
+}
+
+# คอลัมน์ที่เพิ่มหลังสร้างตารางครั้งแรก (เพิ่มให้ฐานข้อมูลเดิมอัตโนมัติ)
+_ADDED_COLUMNS = {
+    "search_type": "TEXT",
+    "province": "TEXT",
+    "district": "TEXT",
+    "geohash": "TEXT",
+}
+
+# คอลัมน์ที่เรียงลำดับได้ในการค้นหา
+SORT_COLUMNS = {
+    "คะแนนรีวิว": "rating",
+    "จำนวนรีวิว": "reviews",
+    "ชื่อธุรกิจ": "name",
+    "พบล่าสุด": "last_seen",
+}
+
+LAST_SEEN_COLUMN = "พบล่าสุด"
+
+# คอลัมน์ที่ใช้ตรวจว่าข้อมูลธุรกิจเปลี่ยนไป
+# ไม่รวมคะแนน/จำนวนรีวิว (เปลี่ยนแทบทุกสัปดาห์) และสถานะเวลาเปิด-ปิด (ขึ้นกับเวลาที่ค้นหา)
+CHANGE_COLUMNS = ("ชื่อธุรกิจ", "ที่อยู่", "เบอร์โทรศัพท์", "เว็บไซต์", "ประเภทธุรกิจ", "อีเมล")
+
+# คอลัมน์ที่อาจได้จากการดึงข้อมูลเว็บไซต์ (enrichment.py) ผลการค้นหาที่ไม่มีค่าจะไม่ลบค่าเดิม
+KEPT_COLUMNS = ("อีเมล",)
+
+# คอลัมน์เพิ่มเติมของตารางผลลัพธ์การรีเฟรช
+DIFF_STATUS_COLUMN = "การเปลี่ยนแปลง"
+DIFF_FIELDS_COLUMN = "ฟิลด์ที่เปลี่ยน"
+DIFF_NEW = "ใหม่"
+DIFF_CHANGED = "เปลี่ยนแปลง"
+DIFF_GONE = "หายไป"
+
+
+def query_key(job):
+    """คีย์ของคำค้นหาในฐานข้อมูล (ประเภทธุรกิจ, จังหวัด, อำเภอ)"""
+    return json.dumps(list(job.key), ensure_ascii=False)
+
+
+def _source_value(record, column, default):
+    value = _clean(record.get(column, default))
+    # "ทุกอำเภอ" หมายถึงค้นหาทั้งจังหวัด ไม่ใช่ชื่ออำเภอ
+    return None if value == "ทุกอำเภอ" else value
+
+
+def _distance_km(lat, lng, center_lat, center_lng):
+    # ฟังก์ชัน distance_km ใน SQL (ธุรกิจที่ไม่มีพิกัดได้ NULL)
+    if lat is None or lng is None:
+        return None
+    return float(haversine_km(lat, lng, center_lat, center_lng))
+
+
+def _clean(value):
+    if value is None or pd.isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+class LeadStore:
+    """
+    ฐานข้อมูลธุรกิจที่เคยพบ (SQLite) คีย์คือ place_id พร้อมเวลาที่พบครั้งแรก/ล่าสุด
+
+    บันทึกเวลาที่ค้นหาแต่ละคำค้นหาล่าสุด และธุรกิจที่พบในแต่ละคำค้นหา
+    เพื่อให้การรีเฟรชค้นหาใหม่เฉพาะคำค้นหาที่ข้อมูลเก่า และรายงานเฉพาะส่วนที่เปลี่ยน
+
+    ทุกการค้นหาบันทึกผลลัพธ์ลงที่นี่ (add) และค้นหา/กรอง/เรียง/แบ่งหน้าได้ด้วย query
+    โดยมี index บนจังหวัด อำเภอ ประเภท คะแนนรีวิว และ geohash
+    """
+
+    def __init__(self, path="leads.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL ให้อ่านข้อมูลได้ระหว่างที่การค้นหาอื่นกำลังเขียน
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.create_function("distance_km", 4, _distance_km, deterministic=True)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS businesses (
+                place_id TEXT PRIMARY KEY,
+                name TEXT,
+                address TEXT,
+                phone TEXT,
+                website TEXT,
+                category TEXT,
+                rating REAL,
+                reviews INTEGER,
+                hours TEXT,
+                lat REAL,
+                lng REAL,
+                email TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS queries (
+                query_key TEXT PRIMARY KEY,
+                business_type TEXT NOT NULL,
+                province TEXT,
+                district TEXT,
+                fetched_at REAL NOT NULL,
+                result_count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS query_members (
+                query_key TEXT NOT NULL,
+                place_id TEXT NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (query_key, place_id)
+            );
+            """
+        )
+        self._migrate()
+        self._conn.executescript(
+            """
+            CREATE INDEX IF NOT EXISTS idx_businesses_location ON businesses (province, district);
+            CREATE INDEX IF NOT EXISTS idx_businesses_district ON businesses (district);
+            CREATE INDEX IF NOT EXISTS idx_businesses_type ON businesses (search_type, rating);
+            CREATE INDEX IF NOT EXISTS idx_businesses_category ON businesses (category);
+            CREATE INDEX IF NOT EXISTS idx_businesses_rating ON businesses (rating);
+            CREATE INDEX IF NOT EXISTS idx_businesses_geohash ON businesses (geohash);
+            CREATE INDEX IF NOT EXISTS idx_businesses_province_type ON businesses (province, search_type, rating);
+            """
+        )
+        self._conn.commit()
+
+    def _migrate(self):
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(businesses)")}
+        for column, sql_type in _ADDED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE businesses ADD COLUMN {column} {sql_type}")
+        if "geohash" not in existing:
+            rows = self._conn.execute(
+                "SELECT place_id, lat, lng FROM businesses WHERE lat IS NOT NULL AND lng IS NOT NULL"
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE businesses SET geohash = ? WHERE place_id = ?",
+                [(geohash_encode(lat, lng), place_id) for place_id, lat, lng in rows],
+            )
+
+    def last_fetched(self, job):
+        """
+        เวลาที่ค้นหางานนี้ล่าสุด
+
+        Returns:
+            float: epoch seconds หรือ None หากยังไม่เคยค้นหา
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at FROM queries WHERE query_key = ?", (query_key(job),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def last_result_count(self, job):
+        """
+        จำนวนธุรกิจที่พบจากการค้นหางานนี้ครั้งล่าสุด
+
+        Returns:
+            int: จำนวนธุรกิจ หรือ None หากยังไม่เคยค้นหา
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result_count FROM queries WHERE query_key = ?", (query_key(job),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def stale_jobs(self, jobs, max_age_seconds, now=None):
+        """
+        เลือกเฉพาะงานที่ยังไม่เคยค้นหา หรือค้นหาล่าสุดนานกว่า max_age_seconds
+
+        Args:
+            jobs (list): รายการ SweepJob
+            max_age_seconds (float): อายุข้อมูลสูงสุดที่ยังถือว่าใหม่
+            now (float): เวลาปัจจุบัน (epoch seconds)
+
+        Returns:
+            list: งานที่ต้องค้นหาใหม่ ตามลำดับเดิม
+        """
+        now = now or time.time()
+        stale = []
+        for job in jobs:
+            fetched_at = self.last_fetched(job)
+            if fetched_at is None or now - fetched_at >= max_age_seconds:
+                stale.append(job)
+        return stale
+
+    def apply(self, job, businesses, fetched_at=None, complete=True):
+        """
+        บันทึกผลลัพธ์การค้นหาของงานหนึ่งรายการ และคืนเฉพาะธุรกิจที่ใหม่ เปลี่ยนไป หรือหายไป
+
+        ธุรกิจที่ไม่มี place_id ไม่ถูกบันทึก เพราะระบุตัวตนข้ามการค้นหาไม่ได้
+
+        Args:
+            job (SweepJob): งานค้นหา
+            businesses (pd.DataFrame): ผลลัพธ์การค้นหาของงานนี้
+            fetched_at (float): เวลาที่ค้นหา (epoch seconds)
+            complete (bool): ผลลัพธ์ครบทุกหน้าหรือไม่
+                (ถ้าไม่ครบจะไม่รายงานธุรกิจที่หายไป และไม่บันทึกเวลาค้นหา เพื่อให้รีเฟรชซ้ำได้)
+
+        Returns:
+            pd.DataFrame: ธุรกิจที่เปลี่ยนแปลง พร้อมคอลัมน์ "การเปลี่ยนแปลง" และ "ฟิลด์ที่เปลี่ยน"
+        """
+        fetched_at = fetched_at or time.time()
+        key = query_key(job)
+        rows = businesses[businesses["รหัสสถานที่"].notna()].drop_duplicates("รหัสสถานที่")
+        place_ids = rows["รหัสสถานที่"].tolist()
+
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT fetched_at FROM queries WHERE query_key = ?", (key,)
+            ).fetchone()
+            existing = self._load(place_ids)
+
+            statuses = []
+            changed_fields = []
+            for record in rows.to_dict("records"):
+                place_id = record["รหัสสถานที่"]
+                old = existing.get(place_id)
+                if old is None:
+                    statuses.append(DIFF_NEW)
+                    changed_fields.append(None)
+                else:
+                    fields = [
+                        column for column in CHANGE_COLUMNS
+                        if _clean(record.get(column)) != old[STORE_COLUMNS[column]]
+                        and not (column in KEPT_COLUMNS and _clean(record.get(column)) is None)
+                    ]
+                    statuses.append(DIFF_CHANGED if fields else None)
+                    changed_fields.append(", ".join(fields) if fields else None)
+
+            gone = None
+            if complete and previous is not None:
+                # ธุรกิจที่พบในการค้นหาครั้งก่อนของงานนี้ แต่ไม่พบในครั้งนี้
+                current = set(place_ids)
+                gone_ids = [
+                    place_id for (place_id,) in self._conn.execute(
+                        "SELECT place_id FROM query_members WHERE query_key = ? AND last_seen >= ?",
+                        (key, previous[0]),
+                    )
+                    if place_id not in current
+                ]
+                gone = self._frame(self._load(gone_ids).values())
+
+            self._upsert(rows, fetched_at, job.business_type, job.province, job.district)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO query_members (query_key, place_id, last_seen) VALUES (?, ?, ?)",
+                [(key, place_id, fetched_at) for place_id in place_ids],
+            )
+            if complete:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO queries "
+                    "(query_key, business_type, province, district, fetched_at, result_count) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, job.business_type, job.province, job.district, fetched_at, len(place_ids)),
+                )
+            self._conn.commit()
+
+        diff = rows.assign(**{DIFF_STATUS_COLUMN: statuses, DIFF_FIELDS_COLUMN: changed_fields})
+        diff = diff[diff[DIFF_STATUS_COLUMN].notna()]
+        if gone is not None and not gone.empty:
+            if "ประเภทที่ค้นหา" in businesses.columns:
+                gone["ประเภทที่ค้นหา"] = job.business_type
+                gone["จังหวัด"] = job.province
+                gone["อำเภอ"] = job.district or "ทุกอำเภอ"
+            gone[DIFF_STATUS_COLUMN] = DIFF_GONE
+            diff = compact_frame(pd.concat([diff, gone], ignore_index=True))
+        return diff.reset_index(drop=True).astype({
+            DIFF_STATUS_COLUMN: "string", DIFF_FIELDS_COLUMN: "string"
+        })
+
+    def _upsert(self, rows, fetched_at, search_type=None, province=None, district=None):
+        # บันทึกธุรกิจหลายรายการในคำสั่งเดียว (ต้องถือ lock อยู่แล้ว)
+        # ที่มาของข้อมูลใช้คอลัมน์ในตารางก่อน (การค้นหาแบบกลุ่ม) แล้วจึงใช้ค่าที่ระบุ
+        defaults = {"ประเภทที่ค้นหา": search_type, "จังหวัด": province, "อำเภอ": district}
+        values = []
+        for record in rows.to_dict("records"):
+            row = [_clean(record.get(column)) for column in STORE_COLUMNS]
+            row += [_source_value(record, column, defaults[column]) for column in SOURCE_COLUMNS]
+            row.append(geohash_encode(_clean(record.get("พิกัด_lat")), _clean(record.get("พิกัด_lng"))))
+            row += [fetched_at, fetched_at, fetched_at]
+            values.append(row)
+
+        columns = list(STORE_COLUMNS.values()) + list(SOURCE_COLUMNS.values()) + ["geohash"]
+        placeholders = ", ".join("?" * (len(columns) + 3))
+        kept = [STORE_COLUMNS[column] for column in KEPT_COLUMNS]
+        updates = [
+            f"{column} = excluded.{column}"
+            for column in STORE_COLUMNS.values() if column != "place_id" and column not in kept
+        ]
+        # ที่มาของข้อมูลและข้อมูลจากเว็บไซต์เก็บค่าล่าสุดที่ไม่ว่าง
+        updates += [
+            f"{column} = COALESCE(excluded.{column}, businesses.{column})"
+            for column in list(SOURCE_COLUMNS.values()) + ["geohash"] + kept
+        ]
+        # updated_at เปลี่ยนเฉพาะเมื่อคอลัมน์ใน CHANGE_COLUMNS เปลี่ยน
+        changed = " OR ".join(
+            f"(excluded.{column} IS NOT NULL AND excluded.{column} IS NOT businesses.{column})"
+            if column in kept else f"excluded.{column} IS NOT businesses.{column}"
+            for column in (STORE_COLUMNS[name] for name in CHANGE_COLUMNS)
+        )
+        self._conn.executemany(
+            f"INSERT INTO businesses ({', '.join(columns)}, first_seen, last_seen, updated_at) "
+            f"VALUES ({placeholders}) "
+            f"ON CONFLICT(place_id) DO UPDATE SET {', '.join(updates)}, "
+            "last_seen = excluded.last_seen, "
+            f"updated_at = CASE WHEN {changed} THEN excluded.updated_at ELSE businesses.updated_at END",
+            values,
+        )
+
+    def add(self, businesses, search_type=None, province=None, district=None, fetched_at=None):
+        """
+        บันทึกผลลัพธ์การค้นหาลงฐานข้อมูลในคำสั่งเดียว (ธุรกิจเดิมจะถูกอัพเดท)
+
+        Args:
+            businesses (pd.DataFrame): ตารางข้อมูลธุรกิจ
+            search_type (str): ประเภทธุรกิจที่ค้นหา (ใช้เมื่อตารางไม่มีคอลัมน์ "ประเภทที่ค้นหา")
+            province (str): จังหวัดที่ค้นหา (ใช้เมื่อตารางไม่มีคอลัมน์ "จังหวัด")
+            district (str): อำเภอที่ค้นหา (ใช้เมื่อตารางไม่มีคอลัมน์ "อำเภอ")
+            fetched_at (float): เวลาที่ค้นหา (epoch seconds)
+
+        Returns:
+            int: จำนวนธุรกิจที่บันทึก (ไม่รวมรายการที่ไม่มี place_id)
+        """
+        if businesses.empty or "รหัสสถานที่" not in businesses.columns:
+            return 0
+        rows = businesses[businesses["รหัสสถานที่"].notna()].drop_duplicates("รหัสสถานที่")
+        with self._lock:
+            self._upsert(rows, fetched_at or time.time(), search_type, province, district)
+            self._conn.commit()
+        return len(rows)
+
+    @staticmethod
+    def _where(province=None, district=None, search_type=None, category=None, min_rating=None,
+               has_phone=False, has_website=False, text=None, geohash_prefix=None, bbox=None, near=None):
+        clauses = []
+        params = []
+        for column, value in (("province", province), ("district", district),
+                              ("search_type", search_type), ("category", category)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if min_rating is not None:
+            clauses.append("rating >= ?")
+            params.append(float(min_rating))
+        if has_phone:
+            clauses.append("phone IS NOT NULL")
+        if has_website:
+            clauses.append("website IS NOT NULL")
+        if text:
+            clauses.append("(name LIKE ? OR address LIKE ?)")
+            params += [f"%{text}%", f"%{text}%"]
+        if geohash_prefix:
+            low, high = prefix_range(geohash_prefix)
+            clauses.append("geohash >= ? AND geohash < ?")
+            params += [low, high]
+        if near:
+            bbox = bounding_box(*near)
+        if bbox:
+            # คัดด้วย index ของ geohash ก่อน แล้วตรวจกรอบ (และระยะทาง) จากพิกัดจริง
+            south, west, north, east = bbox
+            ranges = [prefix_range(prefix) for prefix in covering(south, west, north, east)]
+            clauses.append("(" + " OR ".join("(geohash >= ? AND geohash < ?)" for _ in ranges) + ")")
+            params += [value for pair in ranges for value in pair]
+            clauses.append("lat BETWEEN ? AND ? AND lng BETWEEN ? AND ?")
+            params += [south, north, west, east]
+        if near:
+            clauses.append("distance_km(lat, lng, ?, ?) <= ?")
+            params += [near[0], near[1], near[2]]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def count(self, **filters):
+        """
+        จำนวนธุรกิจที่ตรงเงื่อนไข (ไม่ระบุเงื่อนไขคือทั้งหมด)
+
+        Args:
+            **filters: เงื่อนไขเดียวกับ query
+        """
+        where, params = self._where(**filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM businesses {where}", params).fetchone()[0]
+
+    def query(self, order_by="คะแนนรีวิว", descending=True, limit=50, offset=0, **filters):
+        """
+        ค้นหาธุรกิจในฐานข้อมูลตามเงื่อนไข พร้อมเรียงลำดับและแบ่งหน้า
+
+        Args:
+            order_by (str): คอลัมน์ที่ใช้เรียง (ดู SORT_COLUMNS)
+            descending (bool): เรียงจากมากไปน้อย
+            limit (int): จำนวนรายการต่อหน้า
+            offset (int): จำนวนรายการที่ข้าม
+            **filters: เงื่อนไขการกรอง
+                province, district (str): จังหวัด อำเภอ
+                search_type (str): ประเภทธุรกิจที่ค้นหา
+                category (str): ประเภทธุรกิจจาก Google Maps
+                min_rating (float): คะแนนรีวิวขั้นต่ำ
+                has_phone, has_website (bool): เฉพาะธุรกิจที่มีเบอร์โทร / เว็บไซต์
+                text (str): คำที่อยู่ในชื่อหรือที่อยู่ (ค้นแบบไม่ใช้ index)
+                geohash_prefix (str): เฉพาะธุรกิจในพื้นที่ geohash นี้
+                bbox (tuple): เฉพาะธุรกิจในกรอบ (south, west, north, east)
+                near (tuple): เฉพาะธุรกิจในรัศมี (lat, lng, กิโลเมตร)
+
+        Returns:
+            pd.DataFrame: ตารางข้อมูลธุรกิจของหน้านั้น
+        """
+        where, params = self._where(**filters)
+        sort = SORT_COLUMNS.get(order_by, "rating")
+        direction = "DESC" if descending else "ASC"
+        columns = list(STORE_COLUMNS.values()) + list(SOURCE_COLUMNS.values()) + ["last_seen"]
+
+        with self._lock:
+            records = self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM businesses {where} "
+                f"ORDER BY {sort} IS NULL, {sort} {direction}, place_id LIMIT ? OFFSET ?",
+                params + [int(limit), int(offset)],
+            ).fetchall()
+
+        records = [dict(zip(columns, record)) for record in records]
+        df = self._frame(records)
+        for name, column in SOURCE_COLUMNS.items():
+            df[name] = to_category([record[column] for record in records])
+        df[LAST_SEEN_COLUMN] = pd.to_datetime([record["last_seen"] for record in records], unit="s")
+        return df
+
+    def clusters(self, max_clusters=MAP_MAX_CLUSTERS, **filters):
+        """
+        รวมธุรกิจที่ตรงเงื่อนไขเป็นกลุ่มตามช่อง geohash สำหรับแสดงบนแผนที่ (รวมในฐานข้อมูล)
+
+        Args:
+            max_clusters (int): จำนวนกลุ่มสูงสุดโดยประมาณ (ใช้เลือกความละเอียด)
+            **filters: เงื่อนไขเดียวกับ query
+
+        Returns:
+            tuple: (ตารางกลุ่ม lat / lng / count, ความละเอียด geohash ที่ใช้)
+        """
+        where, params = self._where(**filters)
+        where = f"{where} AND geohash IS NOT NULL" if where else "WHERE geohash IS NOT NULL"
+        with self._lock:
+            south, north, west, east = self._conn.execute(
+                f"SELECT MIN(lat), MAX(lat), MIN(lng), MAX(lng) FROM businesses {where}", params
+            ).fetchone()
+            if south is None:
+                return pd.DataFrame(columns=CLUSTER_COLUMNS), None
+            precision = cluster_precision(south, west, north, east, max_clusters)
+            rows = self._conn.execute(
+                f"SELECT AVG(lat), AVG(lng), COUNT(*) FROM businesses {where} "
+                f"GROUP BY substr(geohash, 1, ?)",
+                params + [precision],
+            ).fetchall()
+        return pd.DataFrame(rows, columns=CLUSTER_COLUMNS), precision
+
+    def facets(self):
+        """
+        ค่าที่มีในฐานข้อมูล สำหรับตัวเลือกในการกรอง
+
+        Returns:
+            dict: {"province": [...], "district": {จังหวัด: [...]}, "search_type": [...]}
+        """
+        with self._lock:
+            provinces = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT province FROM businesses WHERE province IS NOT NULL ORDER BY province"
+            )]
+            districts = {}
+            for province, district in self._conn.execute(
+                "SELECT DISTINCT province, district FROM businesses "
+                "WHERE district IS NOT NULL ORDER BY province, district"
+            ):
+                districts.setdefault(province, []).append(district)
+            search_types = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT search_type FROM businesses WHERE search_type IS NOT NULL ORDER BY search_type"
+            )]
+        return {"province": provinces, "district": districts, "search_type": search_types}
+
+    def _load(self, place_ids):
+        # อ่านข้อมูลที่บันทึกไว้ของ place_id ที่กำหนด (แบ่งชุดตามขีดจำกัดตัวแปรของ SQLite)
+        found = {}
+        columns = list(STORE_COLUMNS.values())
+        for start in range(0, len(place_ids), 500):
+            chunk = place_ids[start:start + 500]
+            cursor = self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM businesses "
+                f"WHERE place_id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            for row in cursor:
+                found[row[0]] = dict(zip(columns, row))
+        return found
+
+    @staticmethod
+    def _frame(records):
+        records = list(records)
+        return columns_to_frame(
+            {name: [record[STORE_COLUMNS[name]] for record in records] for name in COLUMN_DTYPES}
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
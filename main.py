@@ -1,337 +1,832 @@
 import os
+import time
 import pandas as pd
-from serpapi import GoogleSearch
 import streamlit as st
-import time
 from datetime import datetime
-from dotenv import load_dotenv
+from business_search import (
+    API_KEY, BREAKER_RESET, BREAKER_THRESHOLD, CACHE_MAX_ENTRIES, CACHE_PATH, CACHE_TTL, DEDUP_PATH,
+    LEAD_STORE_PATH, MAX_PAGES, REFRESH_MAX_AGE_DAYS, TILE_MAX_TILES,
+    BusinessSearcher, create_key_pool
+)
+from dedup import DedupIndex
+from enrichment import (
+    ENRICH_CACHE_MAX_ENTRIES, ENRICH_CACHE_PATH, ENRICH_CACHE_TTL, EXTRA_PHONES_COLUMN, FACEBOOK_COLUMN,
+    LINE_COLUMN, WebsiteEnricher
+)
+from exports import EXPORT_FORMATS, ExportCache, available_formats, frame_digest
+from jobs import (
+    CANCELLED, FAILED, JOB_STORE_PATH, JOB_WORKERS, KIND_REFRESH, KIND_SEARCH, KIND_SWEEP, KIND_TILE, QUEUED,
+    JobQueue, JobStore
+)
+from lead_store import SORT_COLUMNS, LeadStore
+from metrics import METRICS_FILE, METRICS_PORT, REGISTRY, start_metrics_server
+from normalization import NORMALIZED_COLUMNS, AddressIndex, normalize_frame
+from planner import SEARCH_CREDIT_BUDGET, CostPlanner
+from reference_data import load_reference_data
+from resilience import CircuitBreaker
+from search_cache import SearchCache, make_cache_key
+from spatial import cluster_points, marker_sizes
+from sweep import build_locations, expand_jobs
+from table_view import SORTABLE_COLUMNS, page_bounds, select_rows
+from transport import create_transport
+
+# ขนาดสูงสุดของแคชไฟล์ส่งออก (MB)
+EXPORT_CACHE_MB = int(os.getenv('EXPORT_CACHE_MB', '200'))
+
+# ระยะห่างระหว่างการอ่านสถานะงานเบื้องหลัง (วินาที)
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '1'))
+
+# หน่วยของความคืบหน้าตามประเภทงาน (ประเภทอื่นนับเป็นงานย่อย)
+JOB_UNITS = {KIND_SEARCH: "หน้า", KIND_TILE: "ช่อง"}
+
+# จำนวนผลลัพธ์การค้นหาที่เก็บไว้ในแต่ละ session
+SESSION_HISTORY_LIMIT = int(os.getenv('SESSION_HISTORY_LIMIT', '10'))
+
+# จำนวนรายการสูงสุดที่เปิดจากคลังรายชื่อเป็นผลลัพธ์การค้นหา (เพื่อดาวน์โหลด)
+LEAD_OPEN_LIMIT = int(os.getenv('LEAD_OPEN_LIMIT', '50000'))
+LEAD_STORE_LOCATION = "📚 คลังรายชื่อ"
+
+# จุดศูนย์กลางเริ่มต้นของตัวกรองรัศมี (กรุงเทพฯ เหมือน DEFAULT_LL) และรัศมีเริ่มต้น (กม.)
+DEFAULT_CENTER = (13.7563, 100.5018)
+DEFAULT_RADIUS_KM = 2.0
+
+# CSS ของหน้า (ไฟล์แยก อ่านครั้งเดียวต่อ process)
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "style.css")
+
+# สถานะของ circuit breaker ที่แสดงบน metric card
+BREAKER_STATUS = {
+    CircuitBreaker.CLOSED: "ปกติ",
+    CircuitBreaker.OPEN: "ขัดข้อง",
+    CircuitBreaker.HALF_OPEN: "กำลังทดสอบ",
+}
+
+# ขั้นตอนที่แสดงเวลาในแผงสถิติ
+LATENCY_LABELS = {
+    "serpapi_request_seconds": "เรียก SerpApi",
+    "search_page_seconds": "ดึงหนึ่งหน้า",
+    "extract_seconds": "แปลงข้อมูล",
+    "export_seconds": "ส่งออกไฟล์",
+}
+
+# ตัวเลือกจำนวนรายการต่อหน้าของตารางผลลัพธ์
+RESULT_PAGE_SIZES = [25, 50, 100, 200]
+
+@st.cache_resource
+def get_search_cache():
+    """สร้าง SearchCache เพียงครั้งเดียวและใช้ร่วมกันทุก session"""
+    return SearchCache(CACHE_PATH, ttl_seconds=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+
+@st.cache_resource
+def get_transport():
+    """ชั้นเชื่อมต่อ SerpApi (connection pool) ที่ใช้ร่วมกันทุก session"""
+    return create_transport()
+
+@st.cache_resource
+def get_export_cache():
+    """แคชไฟล์ส่งออกที่ใช้ร่วมกันทุก session (คีย์คือ hash ของผลลัพธ์)"""
+    return ExportCache(max_bytes=EXPORT_CACHE_MB * 1024 * 1024)
+
+@st.cache_resource
+def get_enrich_cache():
+    """แคชข้อมูลติดต่อที่ดึงจากเว็บไซต์ ที่ใช้ร่วมกันทุก session"""
+    return SearchCache(ENRICH_CACHE_PATH, ttl_seconds=ENRICH_CACHE_TTL, max_entries=ENRICH_CACHE_MAX_ENTRIES)
+
+@st.cache_resource
+def get_dedup_index():
+    """ดัชนีธุรกิจที่เคยพบ (บันทึกบนดิสก์) ที่ใช้ร่วมกันทุก session"""
+    return DedupIndex(DEDUP_PATH)
+
+@st.cache_resource
+def get_lead_store():
+    """ฐานข้อมูลธุรกิจที่เคยพบ (สำหรับโหมดรีเฟรช) ที่ใช้ร่วมกันทุก session"""
+    return LeadStore(LEAD_STORE_PATH)
+
+@st.cache_resource
+def get_key_pool():
+    """กลุ่ม API key (พร้อมตัวจำกัดอัตราของแต่ละ key) ที่ใช้ร่วมกันทุก session"""
+    return create_key_pool()
 
-# โหลดค่าจากไฟล์ .env
-load_dotenv()
+@st.cache_resource
+def get_reference_data():
+    """ข้อมูลจังหวัด/อำเภอ และประเภทธุรกิจ (โหลดจากไฟล์ครั้งเดียวต่อ process)"""
+    return load_reference_data()
 
-# API Key สำหรับ SerpApi (ควรเก็บใน .env file)
-API_KEY = os.getenv('SERPAPI_KEY', '42ed65c54ab568d1396bbb8f10f5c80376f5e05e801f1ed41697bca017d214f0')
+@st.cache_resource
+def get_address_index():
+    """ดัชนีที่อยู่สำหรับแยกจังหวัด/อำเภอ (สร้างครั้งเดียวต่อ process)"""
+    return AddressIndex(get_reference_data().provinces_districts)
 
-class BusinessSearcher:
-    def __init__(self, api_key):
-        self.api_key = api_key
+@st.cache_resource
+def get_stylesheet_tag():
+    """
+    แท็ก <style> จาก static/style.css
     
-    def search_businesses(self, query, location="Thailand", num_results=20):
-        """
-        ค้นหาธุรกิจใน Google Maps
-        
-        Args:
-            query (str): คำค้นหา เช่น "ร้านอาหาร", "โรงแรม", "ร้านกาแฟ"
-            location (str): สถานที่ค้นหา
-            num_results (int): จำนวนผลลัพธ์ที่ต้องการ
-        
-        Returns:
-            list: รายการข้อมูลธุรกิจ
-        """
-        businesses = []
-        
-        try:
-            params = {
-                "engine": "google_maps",
-                "q": query,
-                "ll": "@13.7563,100.5018,15z",  # พิกัดกรุงเทพฯ
-                "type": "search",
-                "api_key": self.api_key,
-                "num": num_results
-            }
-            
-            if location and location != "Thailand":
-                params["q"] = f"{query} {location}"
-            
-            search = GoogleSearch(params)
-            results = search.get_dict()
-            
-            if "local_results" in results:
-                for result in results["local_results"]:
-                    business_data = self.extract_business_info(result)
-                    if business_data:
-                        businesses.append(business_data)
-            
-            # หากมีหน้าถัดไป ให้ค้นหาต่อจนครบจำนวนที่ต้องการ
-            page_count = 1
-            max_pages = 3  # จำกัดจำนวนหน้าเพื่อป้องกัน infinite loop
-            
-            while ("serpapi_pagination" in results and "next" in results["serpapi_pagination"] 
-                   and len(businesses) < num_results and page_count < max_pages):
-                
-                time.sleep(1)  # หน่วงเวลาเพื่อไม่ให้เกิน rate limit
-                
-                # ดึง parameters สำหรับหน้าถัดไป
-                if "next" in results["serpapi_pagination"]:
-                    # สร้าง parameters ใหม่สำหรับหน้าถัดไป
-                    next_params = params.copy()
-                    if "start" in results["serpapi_pagination"]:
-                        next_params["start"] = results["serpapi_pagination"]["start"]
-                    next_search = GoogleSearch(next_params)
-                    results = next_search.get_dict()
-                else:
-                    break
-                
-                if "local_results" in results:
-                    for result in results["local_results"]:
-                        if len(businesses) >= num_results:
-                            break
-                        business_data = self.extract_business_info(result)
-                        if business_data:
-                            businesses.append(business_data)
-                
-                page_count += 1
-            
-        except Exception as e:
-            st.error(f"เกิดข้อผิดพลาดในการค้นหา: {str(e)}")
-        
-        return businesses
+    ฝังไว้ในหน้าแทน <link> เพราะ Streamlit ส่งไฟล์ใน /app/static ที่ไม่ใช่รูปภาพ/ฟอนต์เป็น text/plain
+    ซึ่งเบราว์เซอร์ไม่ยอมใช้เป็น stylesheet
+    """
+    with open(STYLESHEET_PATH, encoding="utf-8") as handle:
+        return f"<style>{handle.read()}</style>"
+
+@st.cache_resource
+def get_metrics_server():
+    """endpoint /metrics สำหรับ Prometheus (เปิดครั้งเดียวต่อ process เมื่อตั้งค่า METRICS_PORT)"""
+    return start_metrics_server(METRICS_PORT) if METRICS_PORT else None
+
+@st.cache_resource
+def get_job_queue():
+    """
+    คิวงานค้นหาเบื้องหลังที่ใช้ร่วมกันทุก session
     
-    def extract_business_info(self, result):
-        """
-        ดึงข้อมูลธุรกิจจากผลลัพธ์
-        
-        Args:
-            result (dict): ข้อมูลผลลัพธ์จาก SerpApi
-        
-        Returns:
-            dict: ข้อมูลธุรกิจที่จัดรูปแบบแล้ว
-        """
-        try:
-            business_info = {
-                "ชื่อธุรกิจ": result.get("title", "ไม่ระบุ"),
-                "ที่อยู่": result.get("address", "ไม่ระบุ"),
-                "เบอร์โทรศัพท์": result.get("phone", "ไม่ระบุ"),
-                "เว็บไซต์": result.get("website", "ไม่ระบุ"),
-                "ประเภทธุรกิจ": result.get("type", "ไม่ระบุ"),
-                "คะแนนรีวิว": result.get("rating", "ไม่ระบุ"),
-                "จำนวนรีวิว": result.get("reviews", "ไม่ระบุ"),
-                "สถานะ": result.get("hours", "ไม่ระบุ"),
-                "พิกัด_lat": result.get("gps_coordinates", {}).get("latitude", "ไม่ระบุ"),
-                "พิกัด_lng": result.get("gps_coordinates", {}).get("longitude", "ไม่ระบุ")
-            }
-            
-            # พยายามหา email จาก description หรือ snippet
-            email = "ไม่ระบุ"
-            if "snippet" in result:
-                import re
-                email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-                emails = re.findall(email_pattern, result["snippet"])
-                if emails:
-                    email = emails[0]
-            
-            business_info["อีเมล"] = email
-            
-            return business_info
-            
-        except Exception as e:
-            st.error(f"เกิดข้อผิดพลาดในการดึงข้อมูล: {str(e)}")
-            return None
+    งานที่ค้างจาก process ก่อนหน้าจะทำต่อจาก checkpoint เมื่อสร้างคิว
+    """
+    searcher = BusinessSearcher(
+        API_KEY,
+        cache=get_search_cache(),
+        key_pool=get_key_pool(),
+        transport=get_transport(),
+        circuit_breaker=get_circuit_breaker()
+    )
+    return JobQueue(JobStore(JOB_STORE_PATH), searcher, JOB_WORKERS, dedup_index=get_dedup_index(),
+                    lead_store=get_lead_store())
+
+@st.cache_resource
+def get_circuit_breaker():
+    """circuit breaker ของ SerpApi ที่ใช้ร่วมกันทุก session (SerpApi ล่มก็ล่มสำหรับทุกคน)"""
+    return CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET)
+
+def display_value(value):
+    """แปลงค่าสำหรับแสดงผล โดยแสดงค่าที่ไม่มีเป็น "ไม่ระบุ" """
+    return "ไม่ระบุ" if pd.isna(value) else value
+
+def get_search_store():
+    """
+    ที่เก็บผลลัพธ์การค้นหาใน session ปัจจุบัน (search ID -> ผลลัพธ์)
     
-    def save_to_csv(self, businesses, filename=None):
-        """
-        บันทึกข้อมูลเป็นไฟล์ CSV
-        
-        Args:
-            businesses (list): รายการข้อมูลธุรกิจ
-            filename (str): ชื่อไฟล์ (ถ้าไม่ระบุจะใช้วันที่ปัจจุบัน)
-        
-        Returns:
-            str: ชื่อไฟล์ที่บันทึก
-        """
-        if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"business_search_results_{timestamp}.csv"
-        
-        df = pd.DataFrame(businesses)
-        df.to_csv(filename, index=False, encoding='utf-8-sig')
-        return filename
+    Returns:
+        dict: ผลลัพธ์การค้นหาที่เก็บไว้ เรียงจากเก่าไปใหม่
+    """
+    return st.session_state.setdefault("searches", {})
 
-def main():
-    # โหลดค่า configuration จาก .env
-    app_title = os.getenv('APP_TITLE', 'ระบบค้นหาธุรกิจใน Google Maps')
+def make_search_id(**params):
+    """สร้าง search ID จากเงื่อนไขการค้นหา (เงื่อนไขเดียวกันได้ ID เดียวกัน)"""
+    return make_cache_key(params)[:16]
+
+def save_search(search_id, label, location, df, notes=None):
+    """
+    เก็บผลลัพธ์การค้นหาไว้ใน session และตั้งเป็นผลลัพธ์ที่กำลังแสดง
     
-    st.set_page_config(
-        page_title=app_title,
-        page_icon="🗺️",
-        layout="wide",
-        initial_sidebar_state="expanded"
-    )
+    Args:
+        search_id (str): search ID
+        label (str): ชื่อที่แสดงในประวัติการค้นหา
+        location (str): พื้นที่ที่ค้นหา
+        df (pd.DataFrame): ตารางข้อมูลธุรกิจ
+        notes (list): ข้อความสรุปการค้นหา
+    """
+    # เพิ่มเบอร์โทร E.164 และส่วนประกอบของที่อยู่ สำหรับตัดซ้ำและนำไปเทียบกับ CRM
+    df = normalize_frame(df, get_address_index())
     
-    # Custom CSS สำหรับ Modern Dashboard
-    st.markdown("""
-    <style>
-    /* Import Google Font Noto Sans Thai */
-    @import url('https://fonts.googleapis.com/css2?family=Noto+Sans+Thai:wght@300;400;500;600;700&display=swap');
-    
-    /* Apply font to all elements */
-    * {
-        font-family: 'Noto Sans Thai', sans-serif !important;
+    store = get_search_store()
+    store.pop(search_id, None)
+    store[search_id] = {
+        "id": search_id,
+        "label": label,
+        "location": location,
+        "df": df,
+        "notes": notes or [],
+        "created_at": datetime.now(),
+        "digest": frame_digest(df),
     }
     
-    /* Main dashboard styling */
-    .main-header {
-        background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-        padding: 2rem;
-        border-radius: 10px;
-        margin-bottom: 2rem;
-        color: white;
-        text-align: center;
-        font-family: 'Noto Sans Thai', sans-serif;
-    }
+    # เก็บประวัติไว้ไม่เกินจำนวนที่กำหนด โดยลบผลลัพธ์ที่เก่าที่สุดออก
+    while len(store) > SESSION_HISTORY_LIMIT:
+        store.pop(next(iter(store)))
     
-    .metric-card {
-        padding: 1.5rem;
-        border-radius: 15px;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-        margin-bottom: 1rem;
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-        text-align: center;
-        color: white;
-    }
+    st.session_state["active_search_id"] = search_id
+
+def open_search(search_id):
+    """ตั้งผลลัพธ์ที่เก็บไว้เป็นผลลัพธ์ที่กำลังแสดง (ไม่มีการเรียก API)"""
+    st.session_state["active_search_id"] = search_id
+
+def render_history():
+    """แสดงรายการผลลัพธ์การค้นหาก่อนหน้าใน session ให้เปิดดูซ้ำได้ทันที"""
+    store = get_search_store()
+    if not store:
+        return
     
-    .metric-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 8px 25px rgba(0,0,0,0.15);
-    }
+    active_id = st.session_state.get("active_search_id")
+    with st.expander(f"🕘 ประวัติการค้นหา ({len(store)})", expanded=False):
+        for entry in reversed(list(store.values())):
+            st.button(
+                f"{'▶ ' if entry['id'] == active_id else ''}{entry['label']} "
+                f"({len(entry['df'])}) · {entry['created_at'].strftime('%H:%M')}",
+                key=f"history_{entry['id']}",
+                on_click=open_search,
+                args=(entry["id"],),
+                use_container_width=True
+            )
+
+def record_leads(businesses, search_type=None, province=None, district=None):
+    """บันทึกผลลัพธ์การค้นหาลงคลังรายชื่อ (ธุรกิจเดิมจะถูกอัพเดท)"""
+    get_lead_store().add(businesses, search_type=search_type, province=province, district=district)
+
+def render_lead_filters(facets):
+    """
+    แสดงตัวกรองคลังรายชื่อที่แถบด้านข้าง
     
-    .metric-card.blue {
-        background: linear-gradient(135deg, #4e73df 0%, #224abe 100%);
-    }
+    Args:
+        facets (dict): ค่าที่มีในฐานข้อมูล (จาก LeadStore.facets)
     
-    .metric-card.green {
-        background: linear-gradient(135deg, #1cc88a 0%, #13855c 100%);
-    }
+    Returns:
+        tuple: (เงื่อนไขการกรอง, การเรียงลำดับ) สำหรับ LeadStore.query
+    """
+    all_option = "ทั้งหมด"
+    province = st.selectbox("🗺️ จังหวัด", options=[all_option] + facets["province"])
+    district = st.selectbox(
+        "📍 อำเภอ",
+        options=[all_option] + facets["district"].get(province, []),
+        disabled=province == all_option
+    )
+    search_type = st.selectbox("🏢 ประเภทธุรกิจ", options=[all_option] + facets["search_type"])
+    min_rating = st.slider("⭐ คะแนนรีวิวขั้นต่ำ", min_value=0.0, max_value=5.0, value=0.0, step=0.5)
+    has_phone = st.checkbox("📞 มีเบอร์โทรศัพท์", value=False)
+    has_website = st.checkbox("🌐 มีเว็บไซต์", value=False)
+    text = st.text_input("🔎 ชื่อหรือที่อยู่มีคำว่า")
+    near = render_radius_filter("lead", DEFAULT_CENTER)
+    order_by = st.selectbox("เรียงตาม", options=list(SORT_COLUMNS))
+    descending = st.checkbox("มากไปน้อย", value=True)
     
-    .metric-card.orange {
-        background: linear-gradient(135deg, #f6c23e 0%, #dda20a 100%);
-    }
+    return {
+        "province": None if province == all_option else province,
+        "district": None if district == all_option else district,
+        "search_type": None if search_type == all_option else search_type,
+        "min_rating": min_rating or None,
+        "has_phone": has_phone,
+        "has_website": has_website,
+        "text": text.strip() or None,
+        "near": near,
+    }, {"order_by": order_by, "descending": descending}
+
+def render_radius_filter(key, center):
+    """
+    ตัวกรองธุรกิจในรัศมีรอบจุดที่กำหนด
     
-    .metric-card.red {
-        background: linear-gradient(135deg, #e74a3b 0%, #c0392b 100%);
-    }
+    Args:
+        key (str): prefix ของ key ของ widget
+        center (tuple): จุดศูนย์กลางเริ่มต้น (lat, lng)
     
-    .metric-number {
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: white;
-        margin: 0;
-        font-family: 'Noto Sans Thai', sans-serif;
-        text-shadow: 0 2px 4px rgba(0,0,0,0.3);
-    }
+    Returns:
+        tuple: (lat, lng, กิโลเมตร) หรือ None หากไม่ได้เลือก
+    """
+    if not st.checkbox("📍 เฉพาะในรัศมีรอบพิกัด", key=f"{key}_near"):
+        return None
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        lat = st.number_input("ละติจูด", min_value=-90.0, max_value=90.0, value=float(center[0]),
+                              format="%.5f", key=f"{key}_near_lat")
+    with col2:
+        lng = st.number_input("ลองจิจูด", min_value=-180.0, max_value=180.0, value=float(center[1]),
+                              format="%.5f", key=f"{key}_near_lng")
+    with col3:
+        radius_km = st.number_input("รัศมี (กม.)", min_value=0.1, max_value=500.0, value=DEFAULT_RADIUS_KM,
+                                    step=0.5, key=f"{key}_near_km")
+    return (lat, lng, radius_km)
+
+def render_cluster_map(clusters, precision, total):
+    """
+    แสดงแผนที่ของกลุ่มธุรกิจ (ขนาดจุดตามจำนวนธุรกิจในกลุ่ม)
     
-    .metric-label {
-        color: rgba(255,255,255,0.9);
-        font-size: 1.1rem;
-        margin: 0;
-        font-weight: 500;
-        font-family: 'Noto Sans Thai', sans-serif;
-        text-shadow: 0 1px 2px rgba(0,0,0,0.2);
-    }
+    Args:
+        clusters (pd.DataFrame): ตารางกลุ่ม lat / lng / count (จาก cluster_points หรือ LeadStore.clusters)
+        precision (int): ความละเอียด geohash ของกลุ่ม
+        total (int): จำนวนธุรกิจทั้งหมดที่กรองแล้ว
+    """
+    if clusters.empty:
+        st.info("ไม่มีธุรกิจที่มีพิกัดให้แสดงบนแผนที่")
+        return
+    located = int(clusters["count"].sum())
+    st.caption(f"🗺️ {located:,} จาก {total:,} แห่งที่มีพิกัด รวมเป็น {len(clusters):,} กลุ่ม "
+               f"(ช่อง geohash {precision} ตัวอักษร)")
+    st.map(clusters.assign(size=marker_sizes(clusters["count"], precision)),
+           latitude="lat", longitude="lng", size="size", color="#667eea99")
+
+def render_lead_browser(lead_store, filters, sort):
+    """
+    แสดงธุรกิจในคลังรายชื่อตามตัวกรองทีละหน้า (กรอง เรียง และแบ่งหน้าในฐานข้อมูล)
     
-    .search-form {
-        background: white;
-        padding: 1.5rem;
-        border-radius: 10px;
-        box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        margin-bottom: 1rem;
-    }
+    Args:
+        lead_store (LeadStore): คลังรายชื่อ
+        filters (dict): เงื่อนไขการกรองจาก render_lead_filters
+        sort (dict): การเรียงลำดับจาก render_lead_filters
+    """
+    # เปลี่ยนตัวกรองแล้วกลับไปหน้าแรก
+    signature = make_cache_key({**filters, **sort})
+    if st.session_state.get("lead_filters") != signature:
+        st.session_state["lead_filters"] = signature
+        st.session_state["lead_page"] = 1
     
-    .results-table {
-        background: white;
-        border-radius: 10px;
-        box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        overflow: hidden;
-    }
+    col1, col2 = st.columns([1, 1])
+    with col2:
+        page_size = st.selectbox("รายการต่อหน้า", options=RESULT_PAGE_SIZES, index=1)
     
-    /* Sidebar styling */
-    .css-1d391kg {
-        background-color: #f8f9fa;
-    }
+    total = lead_store.count(**filters)
+    pages = max(1, -(-total // page_size))
+    with col1:
+        page = st.number_input("หน้า", min_value=1, max_value=pages, key="lead_page")
     
-    /* Button styling */
-    .stButton > button {
-        background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        border-radius: 8px;
-        padding: 0.5rem 1rem;
-        font-weight: 600;
-        transition: all 0.3s ease;
-    }
+    df = lead_store.query(**sort, **filters, limit=page_size, offset=(page - 1) * page_size)
+    first = (page - 1) * page_size + 1 if total else 0
+    st.caption(f"📚 แสดง {first:,}–{first + len(df) - 1 if total else 0:,} จาก {total:,} รายการ "
+               f"(หน้า {page}/{pages})")
+    st.dataframe(df, use_container_width=True, hide_index=True)
     
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);
-    }
+    # รวมกลุ่มในฐานข้อมูล ส่งไปเบราว์เซอร์เฉพาะกลุ่ม ไม่ใช่ทุกธุรกิจ
+    if total:
+        with st.expander("🗺️ แผนที่", expanded=False):
+            clusters, precision = lead_store.clusters(**filters)
+            render_cluster_map(clusters, precision, total)
     
-    /* Hide Streamlit branding */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
+    if total and st.button(
+        f"📂 เปิดผลลัพธ์ที่กรองทั้งหมด ({min(total, LEAD_OPEN_LIMIT):,} รายการ) เพื่อดาวน์โหลด",
+        use_container_width=True
+    ):
+        businesses = lead_store.query(**sort, **filters, limit=LEAD_OPEN_LIMIT)
+        notes = []
+        if total > LEAD_OPEN_LIMIT:
+            notes.append(f"⚠️ แสดง {LEAD_OPEN_LIMIT:,} รายการแรกจาก {total:,} รายการ (`LEAD_OPEN_LIMIT`)")
+        save_search(f"leads-{signature[:12]}", f"📚 คลังรายชื่อ ({total:,})", LEAD_STORE_LOCATION,
+                    businesses, notes)
+
+def render_key_usage(key_pool):
+    """แสดงการใช้งานและสถานะของแต่ละ API key"""
+    with st.expander(f"🔑 API key ({len(key_pool)})", expanded=False):
+        usage = pd.DataFrame(key_pool.usage()).rename(columns={
+            "requests": "คำขอ",
+            "errors": "ผิดพลาด",
+            "quota_left": "โควตาคงเหลือ",
+            "state": "สถานะ",
+        })
+        st.dataframe(usage, use_container_width=True, hide_index=True)
+        if st.button("🔄 รีเฟรชโควตา", key="refresh_key_quota", use_container_width=True):
+            key_pool.refresh_quota(get_transport())
+            st.rerun()
+
+def format_duration(seconds):
+    """ข้อความระยะเวลาโดยประมาณ"""
+    if seconds < 90:
+        return f"{seconds:.0f} วินาที"
+    if seconds < 5400:
+        return f"{seconds / 60:.0f} นาที"
+    return f"{seconds / 3600:.1f} ชั่วโมง"
+
+def render_plan(plan, budget):
+    """
+    แสดงประมาณการ credit เวลา และจำนวนธุรกิจก่อนเริ่มค้นหา พร้อมเตือนเมื่อเกินงบหรือโควตา
     
-    /* Fix expander text overlap */
-    .streamlit-expanderHeader {
-        font-family: 'Noto Sans Thai', sans-serif !important;
-        font-size: 1rem !important;
-        line-height: 1.5 !important;
-    }
+    Args:
+        plan (SearchPlan): ประมาณการจาก CostPlanner
+        budget (int): งบ credit ที่ผู้ใช้กำหนด (0 คือไม่จำกัด)
+    """
+    source = f"จากผลลัพธ์ครั้งก่อน {plan.known_yields}/{plan.searches} งาน" if plan.known_yields else "ยังไม่เคยค้นหา"
+    st.caption(
+        f"💳 ประมาณการ: **{plan.credits:,} credit** ({plan.pages:,} หน้า ในแคช {plan.cached_pages:,}) | "
+        f"⏱️ ~{format_duration(plan.seconds)} | 🏢 ~{plan.expected_results:,} ธุรกิจ ({source})"
+    )
+    if plan.exceeds(budget):
+        st.warning(f"⛔ ประมาณการเกินงบ {budget:,} credit การค้นหาจะหยุดเมื่อใช้ครบงบ (ได้ผลลัพธ์บางส่วน)")
+    if plan.quota_left is not None and plan.credits > plan.quota_left:
+        st.warning(f"⚠️ ประมาณการเกินโควตาที่เหลือของ API key ({plan.quota_left:,} credit)")
+
+def render_result_filters(entry):
+    """
+    แสดงตัวกรอง การเรียงลำดับ และการแบ่งหน้าของผลลัพธ์การค้นหา
     
-    .streamlit-expanderContent {
-        font-family: 'Noto Sans Thai', sans-serif !important;
-        line-height: 1.6 !important;
-    }
+    ตำแหน่งแถวที่กรองและเรียงแล้วเก็บไว้ใน entry และคำนวณใหม่เฉพาะเมื่อเงื่อนไขเปลี่ยน
+    การเปลี่ยนหน้าจึงดึงเพียงแถวของหน้านั้น ไม่ว่าผลลัพธ์จะมีกี่รายการ
     
-    /* Fix span element spacing */
-    span {
-        line-height: 1.5 !important;
-    }
+    Args:
+        entry (dict): ผลลัพธ์การค้นหาที่เก็บไว้ใน session (จาก save_search)
+    
+    Returns:
+        tuple: (ตารางเฉพาะหน้าปัจจุบัน, ข้อความสรุปจำนวนรายการ)
+    """
+    df = entry["df"]
+    search_id = entry["id"]
+    
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    with col1:
+        text = st.text_input("🔎 ชื่อหรือที่อยู่มีคำว่า", key=f"view_text_{search_id}")
+    with col2:
+        min_rating = st.slider("⭐ คะแนนขั้นต่ำ", min_value=0.0, max_value=5.0, value=0.0, step=0.5,
+                               key=f"view_rating_{search_id}")
+    with col3:
+        has_phone = st.checkbox("📞 มีเบอร์โทร", key=f"view_phone_{search_id}")
+        has_website = st.checkbox("🌐 มีเว็บไซต์", key=f"view_website_{search_id}")
+    with col4:
+        sort_by = st.selectbox("เรียงตาม", options=["ลำดับเดิม", *SORTABLE_COLUMNS],
+                               key=f"view_sort_{search_id}")
+        descending = st.checkbox("มากไปน้อย", value=True, key=f"view_desc_{search_id}")
+    near = render_radius_filter(f"view_{search_id}", result_center(df))
     
-    /* Fix markdown in expander */
-    .streamlit-expanderContent .stMarkdown {
-        line-height: 1.6 !important;
+    filters = {
+        "text": text.strip() or None,
+        "min_rating": min_rating or None,
+        "has_phone": has_phone,
+        "has_website": has_website,
+        "near": near,
+        "sort_by": None if sort_by == "ลำดับเดิม" else sort_by,
+        "descending": descending,
     }
     
-    /* Hide selectbox dropdown arrows */
-     [data-testid="stSelectbox"] svg {
-         display: none !important;
-     }
-     
-     /* Hide Material Icons */
-     span[data-testid="stIconMaterial"] {
-         display: none !important;
-     }
-    </style>
-    
-    <script>
-    // Remove keyboard_arrow_down text from DOM
-    function removeKeyboardArrowText() {
-        const walker = document.createTreeWalker(
-            document.body,
-            NodeFilter.SHOW_TEXT,
-            null,
-            false
-        );
-        
-        const textNodes = [];
-        let node;
-        
-        while (node = walker.nextNode()) {
-            if (node.textContent.includes('keyboard_arrow_down')) {
-                textNodes.push(node);
-            }
+    # เปลี่ยนเงื่อนไขแล้วคำนวณตำแหน่งใหม่และกลับไปหน้าแรก
+    page_key = f"view_page_{search_id}"
+    signature = make_cache_key(filters)
+    view = entry.get("view")
+    if view is None or view[0] != signature:
+        view = entry["view"] = (signature, select_rows(df, **filters))
+        st.session_state[page_key] = 1
+    positions = view[1]
+    
+    col1, col2 = st.columns([1, 1])
+    with col2:
+        page_size = st.selectbox("รายการต่อหน้า", options=RESULT_PAGE_SIZES, index=1,
+                                 key=f"view_size_{search_id}")
+    _, _, pages = page_bounds(1, page_size, len(positions))
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    with col1:
+        page = st.number_input("หน้า", min_value=1, max_value=pages, key=page_key)
+    
+    start, end, _ = page_bounds(page, page_size, len(positions))
+    summary = f"แสดง {start + 1 if end else 0:,}–{end:,} จาก {len(positions):,} รายการ (หน้า {page}/{pages})"
+    if len(positions) != len(df):
+        summary += f" · กรองจากทั้งหมด {len(df):,} รายการ"
+    return df.iloc[positions[start:end]], summary
+
+def result_center(df):
+    """จุดกึ่งกลางของผลลัพธ์ (ค่ามัธยฐานของพิกัด) หรือ DEFAULT_CENTER หากไม่มีพิกัด"""
+    lat = df["พิกัด_lat"].median()
+    lng = df["พิกัด_lng"].median()
+    if pd.isna(lat) or pd.isna(lng):
+        return DEFAULT_CENTER
+    return (lat, lng)
+
+def render_result_map(entry):
+    """แสดงแผนที่ของผลลัพธ์ที่กรองแล้ว (คำนวณกลุ่มใหม่เฉพาะเมื่อเงื่อนไขเปลี่ยน)"""
+    signature, positions = entry["view"]
+    cached = entry.get("map")
+    if cached is None or cached[0] != signature:
+        rows = entry["df"].iloc[positions]
+        clusters, precision = cluster_points(
+            rows["พิกัด_lat"].to_numpy(dtype=float, na_value=float("nan")),
+            rows["พิกัด_lng"].to_numpy(dtype=float, na_value=float("nan")),
+        )
+        cached = entry["map"] = (signature, clusters, precision)
+    render_cluster_map(cached[1], cached[2], len(positions))
+
+def render_result_page(page_df):
+    """แสดงตารางผลลัพธ์เฉพาะหน้าปัจจุบัน"""
+    st.dataframe(
+        page_df,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "ชื่อธุรกิจ": st.column_config.TextColumn(
+                "🏢 ชื่อธุรกิจ",
+                width="large"
+            ),
+            "ที่อยู่": st.column_config.TextColumn(
+                "📍 ที่อยู่",
+                width="large"
+            ),
+            "เบอร์โทรศัพท์": st.column_config.TextColumn(
+                "📞 เบอร์โทร",
+                width="medium"
+            ),
+            "คะแนนรีวิว": st.column_config.NumberColumn(
+                "⭐ เรตติ้ง",
+                width="small",
+                format="%.1f"
+            ),
+            "จำนวนรีวิว": st.column_config.NumberColumn(
+                "💬 รีวิว",
+                width="small"
+            )
         }
+    )
+
+def render_business_detail(entry, page_df):
+    """
+    แสดงรายละเอียดของธุรกิจที่เลือกจากหน้าปัจจุบันเพียงรายการเดียว
+    
+    Args:
+        entry (dict): ผลลัพธ์การค้นหาที่เก็บไว้ใน session
+        page_df (pd.DataFrame): ตารางเฉพาะหน้าปัจจุบัน
+    """
+    if page_df.empty:
+        st.info("ไม่มีธุรกิจที่ตรงกับตัวกรอง")
+        return
+    
+    labels = [f"{i}. {display_value(name)}" for i, name in enumerate(page_df["ชื่อธุรกิจ"], 1)]
+    selected = st.selectbox("เลือกธุรกิจ", options=labels, key=f"view_detail_{entry['id']}")
+    business = page_df.iloc[labels.index(selected) if selected in labels else 0]
+    
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.write(f"**ที่อยู่:** {display_value(business['ที่อยู่'])}")
+        st.write(f"**เบอร์โทรศัพท์:** {display_value(business['เบอร์โทรศัพท์'])}")
+        st.write(f"**อีเมล:** {display_value(business['อีเมล'])}")
+        st.write(f"**เว็บไซต์:** {display_value(business['เว็บไซต์'])}")
+
+    with col2:
+        st.write(f"**ประเภทธุรกิจ:** {display_value(business['ประเภทธุรกิจ'])}")
+        st.write(f"**คะแนนรีวิว:** {display_value(business['คะแนนรีวิว'])}")
+        st.write(f"**จำนวนรีวิว:** {display_value(business['จำนวนรีวิว'])}")
+        st.write(f"**สถานะ:** {display_value(business['สถานะ'])}")
+    
+    # ข้อมูลที่ปรับรูปแบบแล้ว และข้อมูลที่ได้จากเว็บไซต์ (มีเมื่อกดดึงข้อมูลติดต่อแล้ว)
+    for column in NORMALIZED_COLUMNS + (LINE_COLUMN, FACEBOOK_COLUMN, EXTRA_PHONES_COLUMN):
+        if column in business.index:
+            st.write(f"**{column}:** {display_value(business[column])}")
+
+def render_enrichment(entry):
+    """
+    ปุ่มดึงอีเมล ลิงก์ LINE / Facebook และเบอร์โทรเพิ่มเติมจากเว็บไซต์ของธุรกิจในผลลัพธ์
+    
+    เปิดเว็บไซต์เฉพาะเมื่อผู้ใช้กด แล้วแทนที่ผลลัพธ์เดิมด้วยตารางที่เพิ่มข้อมูลแล้ว
+    """
+    df = entry["df"]
+    websites = int(df["เว็บไซต์"].notna().sum())
+    if LINE_COLUMN in df.columns or not websites:
+        return
+    
+    st.subheader("🌐 ข้อมูลติดต่อเพิ่มเติม")
+    if not st.button(
+        f"🌐 ดึงอีเมล / LINE / Facebook จากเว็บไซต์ ({websites:,})",
+        key=f"enrich_{entry['id']}",
+        use_container_width=True
+    ):
+        return
+    
+    enricher = WebsiteEnricher(cache=get_enrich_cache())
+    with st.spinner(f"กำลังเปิดเว็บไซต์ {websites:,} แห่ง..."):
+        enriched, added = enricher.enrich_frame(df)
+    enricher.close()
+    
+    note = f"🌐 เปิดเว็บไซต์ {enricher.pages_fetched:,} หน้า ได้อีเมลเพิ่ม {added:,} รายการ"
+    if enricher.blocked:
+        note += f" · ข้าม {enricher.blocked:,} เว็บไซต์ตาม robots.txt"
+    if enricher.failed:
+        note += f" · เปิดไม่ได้ {enricher.failed:,} เว็บไซต์"
+    record_leads(enriched)
+    save_search(entry["id"], entry["label"], entry["location"], enriched, entry["notes"] + [note])
+    st.rerun()
+
+def metric_card(color, number, label):
+    """HTML ของ metric card บนหน้าหลัก"""
+    return f"""
+    <div class="metric-card {color}">
+        <p class="metric-number">{number}</p>
+        <p class="metric-label">{label}</p>
+    </div>
+    """
+
+def render_metric_cards(cards, provinces, business_types, results, breaker_state):
+    """
+    เติมค่าใน metric card ทั้ง 4 ใบบนหน้าหลัก
+    
+    Args:
+        cards (list): placeholder ของแต่ละ card (st.empty)
+        provinces (int): จำนวนจังหวัดที่ค้นหาได้
+        business_types (int): จำนวนประเภทธุรกิจที่เลือกได้
+        results (int): จำนวนธุรกิจในผลลัพธ์ที่กำลังแสดง
+        breaker_state (str): สถานะ circuit breaker ของ SerpApi
+    """
+    summary = REGISTRY.summary()
+    status = BREAKER_STATUS.get(breaker_state, breaker_state)
+    if breaker_state == CircuitBreaker.CLOSED and summary["api_requests"]:
+        status = f"{status} · ผิดพลาด {summary['error_rate']:.0%}"
+    
+    for card, html in zip(cards, [
+        metric_card("blue", provinces, "จังหวัดทั้งหมด"),
+        metric_card("green", business_types, "ประเภทธุรกิจ"),
+        metric_card("orange", f"{results:,}", "ผลลัพธ์ล่าสุด"),
+        metric_card("red", status, "สถานะ API"),
+    ]):
+        card.markdown(html, unsafe_allow_html=True)
+
+def render_metrics_panel():
+    """แสดงสถิติการทำงานของ process นี้ (คำขอ API, credit, แคช และเวลาของแต่ละขั้นตอน)"""
+    summary = REGISTRY.summary()
+    with st.expander("📈 สถิติการทำงาน", expanded=False):
+        col1, col2 = st.columns(2)
+        col1.metric("คำขอ API", f"{summary['api_requests']:,}")
+        col2.metric("credit ที่ใช้", f"{summary['credits_used']:,}")
+        col1.metric("อัตราผิดพลาด", f"{summary['error_rate']:.1%}")
+        col2.metric("แคช hit", f"{summary['cache_hit_rate']:.0%}")
+        col1.metric("ลองใหม่", f"{summary['retries']:,}")
+        col2.metric("ธุรกิจที่พบ", f"{summary['results']:,}")
         
-        textNodes.forEach(textNode => {
-            textNode.textContent = textNode.textContent.replace(/keyboard_arrow_down/g, '');
-        });
-    }
+        latency = pd.DataFrame(
+            [
+                {
+                    "ขั้นตอน": label,
+                    "p50 (ms)": None if p50 is None else round(p50 * 1000, 1),
+                    "p95 (ms)": None if p95 is None else round(p95 * 1000, 1),
+                }
+                for name, label in LATENCY_LABELS.items()
+                for p50, p95 in [summary["latency"][name]]
+            ]
+        )
+        st.dataframe(latency, use_container_width=True, hide_index=True)
+        
+        server = get_metrics_server()
+        if server is not None:
+            st.caption(f"Prometheus: {server.url}")
+        if METRICS_FILE:
+            st.caption(f"ไฟล์ metrics: `{METRICS_FILE}`")
+        if st.button("🔄 รีเฟรชสถิติ", key="refresh_metrics", use_container_width=True):
+            st.rerun()
+
+def render_results(entry):
+    """
+    แสดงผลลัพธ์การค้นหา ตาราง ปุ่มดาวน์โหลด และรายละเอียดธุรกิจ
     
-    // Run on page load and periodically
-    document.addEventListener('DOMContentLoaded', removeKeyboardArrowText);
-    setInterval(removeKeyboardArrowText, 1000);
-    </script>
+    Args:
+        entry (dict): ผลลัพธ์การค้นหาที่เก็บไว้ใน session (จาก save_search)
+    """
+    df = entry["df"]
+    location = entry["location"]
+    
+    for note in entry["notes"]:
+        st.caption(note)
+    st.markdown(f"""
+    <div class="success-message" style="background: linear-gradient(90deg, #28a745 0%, #20c997 100%); color: white; padding: 1rem; border-radius: 10px; margin: 1rem 0; text-align: center;">
+        ✅ พบธุรกิจ <strong>{len(df)}</strong> แห่ง ในพื้นที่ <strong>{location}</strong>
+    </div>
     """, unsafe_allow_html=True)
+
+    # ตัวกรองและการเรียงทำใน pandas แล้วแสดงเฉพาะแถวของหน้าปัจจุบัน
+    page_df, summary = render_result_filters(entry)
+
+    col1, col2 = st.columns([3, 1])
+
+    with col1:
+        st.subheader("📋 ผลลัพธ์การค้นหา")
+        st.caption(summary)
+        render_result_page(page_df)
+        with st.expander("🗺️ แผนที่ผลลัพธ์", expanded=False):
+            render_result_map(entry)
+
+    with col2:
+        st.subheader("💾 ดาวน์โหลดข้อมูล")
+
+        # สร้างไฟล์เฉพาะเมื่อผู้ใช้ขอ และแคชไว้ตาม hash ของผลลัพธ์
+        export_cache = get_export_cache()
+        timestamp = entry["created_at"].strftime('%Y%m%d_%H%M%S')
+        
+        for fmt in available_formats():
+            label, extension, mime = EXPORT_FORMATS[fmt]
+            data = export_cache.get(entry["digest"], fmt)
+            
+            if data is None and st.button(
+                f"⚙️ เตรียมไฟล์ {label}",
+                key=f"prepare_{fmt}_{entry['id']}",
+                use_container_width=True
+            ):
+                with st.spinner(f"กำลังสร้างไฟล์ {label}..."):
+                    data = export_cache.build(df, fmt, entry["digest"])
+            
+            if data is not None:
+                st.download_button(
+                    label=f"📥 ดาวน์โหลด {label}",
+                    data=data,
+                    file_name=f"business_search_{timestamp}.{extension}",
+                    mime=mime,
+                    key=f"download_{fmt}_{entry['id']}",
+                    use_container_width=True
+                )
+
+        render_enrichment(entry)
+        
+    # แสดงรายละเอียดเฉพาะธุรกิจที่เลือก
+    st.subheader("🏢 รายละเอียดธุรกิจ")
+    render_business_detail(entry, page_df)
+
+def submit_job(kind, params, context):
+    """
+    ส่งงานค้นหาเข้าคิวเบื้องหลัง และจำไว้ใน session เพื่อติดตามสถานะ
+    
+    Args:
+        kind (str): KIND_SEARCH, KIND_SWEEP, KIND_TILE หรือ KIND_REFRESH
+        params (dict): เงื่อนไขของงาน (ดู JobQueue.submit)
+        context (dict): ข้อมูลสำหรับเก็บผลลัพธ์เมื่องานเสร็จ
+            (search_id, label, location และ search_type / province / district สำหรับคลังรายชื่อ)
+    """
+    job = get_job_queue().submit(kind, params)
+    st.session_state.setdefault("jobs", {})[job.id] = context
+
+def job_unit(job):
+    """หน่วยของความคืบหน้าของงาน"""
+    return JOB_UNITS.get(job.kind, "งาน")
+
+def job_notes(job):
+    """ข้อความสรุปของงานที่เสร็จแล้ว (รวมงานย่อยที่ล้มเหลวของการค้นหาแบบกลุ่ม)"""
+    notes = job.message.splitlines() if job.message else []
+    if job.kind == KIND_SWEEP:
+        for failure in get_job_queue().failures(job.id):
+            kept = f" (เก็บผลลัพธ์บางส่วน {failure['results']} รายการ)" if failure["partial"] else ""
+            notes.append(f"⚠️ {failure['business_type']} ใน {failure['location']}: {failure['error']}{kept}")
+    
+    unit = job_unit(job)
+    if job.status == FAILED:
+        notes.append(f"⚠️ ได้ผลลัพธ์บางส่วน ({job.steps_done} {unit}) เพราะเกิดข้อผิดพลาด: {job.error}")
+    elif job.status == CANCELLED:
+        notes.append(f"⏹️ ยกเลิกแล้ว ได้ผลลัพธ์บางส่วน ({job.steps_done}/{job.steps_total} {unit})")
+    return notes
+
+def finish_job(job, context):
+    """เก็บผลลัพธ์ของงานที่เสร็จแล้วลงคลังรายชื่อและ session แล้วตั้งเป็นผลลัพธ์ที่กำลังแสดง"""
+    businesses = get_job_queue().result(job.id)
+    if businesses.empty:
+        if job.kind == KIND_REFRESH and job.status not in (FAILED, CANCELLED):
+            for note in job_notes(job):
+                st.info(note)
+            st.success("ไม่มีการเปลี่ยนแปลงตั้งแต่การค้นหาครั้งก่อน")
+        elif job.status == FAILED:
+            st.error(f"เกิดข้อผิดพลาดในการค้นหา: {job.error}")
+        elif job.status == CANCELLED:
+            st.info(f"ยกเลิก {context['label']} แล้ว")
+        else:
+            st.warning("ไม่พบผลลัพธ์การค้นหา กรุณาลองใช้คำค้นหาอื่น")
+        return
+    
+    # งานรีเฟรชบันทึกลงคลังรายชื่อระหว่างทำงานแล้ว (ผลลัพธ์เป็นเพียงส่วนที่เปลี่ยน)
+    if job.kind != KIND_REFRESH:
+        record_leads(businesses, context.get("search_type"), context.get("province"), context.get("district"))
+    save_search(context["search_id"], context["label"], context["location"], businesses, job_notes(job))
+
+def render_jobs():
+    """
+    แสดงความคืบหน้าของงานเบื้องหลังใน session นี้ และเก็บผลลัพธ์ของงานที่เสร็จแล้ว
+    
+    ระหว่างทำงาน ตารางผลลัพธ์บางส่วนจาก checkpoint จะยาวขึ้นทุกครั้งที่อ่านสถานะใหม่
+    (อ่าน checkpoint ใหม่เฉพาะเมื่อมีหน้า/งานย่อยเสร็จเพิ่ม)
+    
+    Returns:
+        bool: ยังมีงานที่ทำงานอยู่ (ต้อง rerun เพื่ออ่านสถานะใหม่)
+    """
+    session_jobs = st.session_state.get("jobs", {})
+    queue = get_job_queue()
+    running = False
+    
+    for job_id, context in list(session_jobs.items()):
+        job = queue.get(job_id)
+        if job is None:
+            session_jobs.pop(job_id)
+            continue
+        
+        if not job.active:
+            session_jobs.pop(job_id)
+            finish_job(job, context)
+            continue
+        
+        running = True
+        unit = job_unit(job)
+        status = "รอคิว" if job.status == QUEUED else f"{job.steps_done}/{job.steps_total} {unit}"
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            st.progress(job.progress, text=f"⏳ {context['label']}: {status} | พบธุรกิจ {job.results:,} แห่ง")
+            if job.kind in (KIND_SWEEP, KIND_REFRESH) and job.message:
+                st.caption(job.message)
+        with col2:
+            st.button("⏹️ ยกเลิก", key=f"cancel_{job_id}", on_click=queue.cancel, args=(job_id,),
+                      use_container_width=True)
+        
+        preview = context.get("preview")
+        if preview is None or preview[0] != job.steps_done:
+            preview = context["preview"] = (job.steps_done, queue.result(job_id))
+        if not preview[1].empty:
+            st.dataframe(preview[1], use_container_width=True, hide_index=True)
+    
+    return running
+
+def main():
+    # โหลดค่า configuration จาก .env
+    app_title = os.getenv('APP_TITLE', 'ระบบค้นหาธุรกิจใน Google Maps')
+    
+    st.set_page_config(
+        page_title=app_title,
+        page_icon="🗺️",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    
+    # เปิด endpoint /metrics ครั้งแรกที่มีผู้ใช้เปิดหน้า (ถ้าตั้งค่า METRICS_PORT)
+    get_metrics_server()
+    
+    # Custom CSS สำหรับ Modern Dashboard
+    st.markdown(get_stylesheet_tag(), unsafe_allow_html=True)
     
     # Header Dashboard
     st.markdown(f"""
@@ -342,135 +837,23 @@ def main():
     """, unsafe_allow_html=True)
     
     # สร้าง BusinessSearcher instance
-    searcher = BusinessSearcher(API_KEY)
-    
-    # Metric Cards Dashboard
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown("""
-        <div class="metric-card blue">
-            <p class="metric-number">77</p>
-            <p class="metric-label">จังหวัดทั้งหมด</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("""
-        <div class="metric-card green">
-            <p class="metric-number">50+</p>
-            <p class="metric-label">ประเภทธุรกิจ</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown("""
-        <div class="metric-card orange">
-            <p class="metric-number" id="search-count">0</p>
-            <p class="metric-label">ผลลัพธ์ล่าสุด</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col4:
-        st.markdown("""
-        <div class="metric-card red">
-            <p class="metric-number">API</p>
-            <p class="metric-label">สถานะเชื่อมต่อ</p>
-        </div>
-        """, unsafe_allow_html=True)
+    search_cache = get_search_cache()
+    searcher = BusinessSearcher(
+        API_KEY,
+        cache=search_cache,
+        key_pool=get_key_pool(),
+        transport=get_transport(),
+        circuit_breaker=get_circuit_breaker()
+    )
     
-    # ข้อมูลจังหวัดและอำเภอ
-    provinces_districts = {
-        "กรุงเทพมหานคร": ["พระนคร", "ดุสิต", "หนองจอก", "บางรัก", "บางเขน", "บางกะปิ", "ปทุมวัน", "ป้อมปราบศัตรูพ่าย", "พระโขนง", "มีนบุรี", "ลาดกระบัง", "ยานนาวา", "สัมพันธวงศ์", "พญาไท", "ธนบุรี", "บางกอกใหญ่", "ห้วยขวาง", "คลองสาน", "ตลิ่งชัน", "บางกอกน้อย", "บางขุนเทียน", "ภาษีเจริญ", "หนองแขม", "ราษฎร์บูรณะ", "บางพลัด", "ดินแดง", "บึงกุ่ม", "สาทร", "บางซื่อ", "จตุจักร", "บางคอแหลม", "ประเวศ", "คลองเตย", "สวนหลวง", "จอมทอง", "ดอนเมือง", "ราชเทวี", "ลาดพร้าว", "วัฒนา", "บางแค", "หลักสี่", "สายไหม", "คันนายาว", "สะพานพุทธ", "วังทองหลาง", "คลองสามวา", "บางนา", "ทวีวัฒนา", "ทุ่งครุ", "บางบอน"],
-        "กระบี่": ["เมืองกระบี่", "เขาพนม", "เกาะลันตา", "คลองท่อม", "อ่าวลึก", "ปลายพระยา", "ลำทับ", "เหนือคลอง"],
-        "กาญจนบุรี": ["เมืองกาญจนบุรี", "ไทรโยค", "บ่อพลอย", "ศรีสวัสดิ์", "ท่าม่วง", "ท่ามะกา", "พนมทวน", "เลาขวัญ", "ด่านมะขามเตี้ย", "หนองปรือ", "ห้วยกระเจา", "ทองผาภูมิ", "สังขละบุรี"],
-        "กาฬสินธุ์": ["เมืองกาฬสินธุ์", "นามน", "กมลาไสย", "ร่องคำ", "กุฉินารายณ์", "เขื่องใน", "ดอนจาน", "ห้วยเม็ก", "สมเด็จ", "ห้วยผึ้ง", "ฆ้องชัย", "ยางตลาด", "เฟื่องนคร", "ท่าคันโท", "หนองกุงศรี", "สหัสขันธ์", "คำม่วง", "ทุ่งศรีอุดม"],
-        "กำแพงเพชร": ["เมืองกำแพงเพชร", "ไทรงาม", "คลองลาน", "ขาณุวรลักษบุรี", "บึงสามัคคี", "ทรายทองวัฒนา", "พรานกระต่าย", "ลานกระบือ", "ปางศิลาทอง", "เมืองทราย", "โกสัมพีนคร"],
-        "ขอนแก่น": ["เมืองขอนแก่น", "บ้านไผ่", "พล", "เวียงเก่า", "เวียงเยี่ยม", "กระนวน", "หนองเรือ", "บ้านฝาง", "อุบลรัตน์", "น้ำพอง", "เปือยน้อย", "โคกโพธิ์ไชย", "หนองนาคำ", "บ้านแฮด", "โนนศิลา", "ชุมแพ", "สีชมพู", "หนองสองห้อง", "ภูเวียง", "มัญจาคีรี", "ผักปัง", "ภูผาม่าน", "สามสูง", "โครงการ", "หนองกุงศรี"],
-        "จันทบุรี": ["เมืองจันทบุรี", "ขลุง", "ท่าใหม่", "โป่งน้ำร้อน", "มะขาม", "แก่งหางแมว", "นายายอาม", "สอยดาว", "แหลมสิงห์", "เขาคิชฌกูฏ"],
-        "ฉะเชิงเทรา": ["เมืองฉะเชิงเทรา", "บางคล้า", "บางน้ำเปรี้ยว", "บางปะกง", "พนมสารคาม", "ราชสาส์น", "สนามชัยเขต", "แปลงยาว", "ท่าตะเกียบ", "คลองเขื่อน", "บ้านโพธิ์"],
-        "ชลบุรี": ["เมืองชลบุรี", "บ้านบึง", "หนองใหญ่", "บางละมุง", "พานทอง", "พนัสนิคม", "ศรีราชา", "เกาะสีชัง", "สัตหีบ", "บ่อทอง", "เกาะจันทร์"],
-        "ชัยนาท": ["เมืองชัยนาท", "มโนรมย์", "วัดสิงห์", "สรรพยา", "สรรคบุรี", "หันคา", "หนองมะโมง", "เนินขาม"],
-        "ชัยภูมิ": ["เมืองชัยภูมิ", "เกษตรสมบูรณ์", "กงไกรลาศ", "จัตุรัส", "บำเหน็จณรงค์", "หนองบัวระเหว", "คอนสวรรค์", "คอนสาร", "ภูเขียว", "เทพสถิต", "ภักดีชุมพล", "หนองบัวแดง", "แก้งคร้อ", "บ้านเขว้า", "โนนแดง", "จัตุรัส", "ซับใหญ่"],
-        "ชุมพร": ["เมืองชุมพร", "ท่าแซะ", "ปะทิว", "หลังสวน", "ละแม", "ทุ่งตะโก", "สวี", "ทุ่งใหญ่"],
-        "เชียงราย": ["เมืองเชียงราย", "เวียงชัย", "เชียงของ", "เทิง", "พาน", "ป่าแดด", "แม่จัน", "เชียงแสน", "แม่สาย", "แม่สรวย", "วียงป่าเป้า", "พญาเม็งราย", "เวียงแก่น", "ขุนตาล", "แม่ฟ้าหลวง", "แม่ลาว", "เวียงเชียงรุ้ง", "ดอยหลวง"],
-        "เชียงใหม่": ["เมืองเชียงใหม่", "ดอยสะเก็ด", "แม่ริม", "สะเมิง", "แม่แตง", "แม่อ่อน", "ฝาง", "ไชยปราการ", "เมืองแปด", "สันทราย", "สันกำแพง", "สันป่าตอง", "หางดง", "ฮอด", "ดอยเต่า", "อมก๋อย", "เสาไห้", "แม่วาง", "พร้าว", "แม่ออน", "ดอยหลวง", "เวียงแหง", "ไชยปราการ", "แม่แจ่ม"],
-        "ตรัง": ["เมืองตรัง", "กันตัง", "ย่านตาขาว", "ปะเลียน", "รัษฎา", "หาดสำราญ", "วังวิเศษ", "นาโยง", "ห้วยยอด", "สิเกา"],
-        "ตราด": ["เมืองตราด", "คลองใหญ่", "เขาสมิง", "บ่อไร่", "แหลมงอบ", "เกาะกูด", "เกาะช้าง"],
-        "ตาก": ["เมืองตาก", "บ้านตาก", "สามเงา", "แม่ระมาด", "ท่าสองยาง", "แม่สอด", "พบพระ", "อุ้มผาง", "วังเจ้า"],
-        "นครนายก": ["เมืองนครนายก", "ปากพลี", "บ้านนา", "องครักษ์"],
-        "นครปฐม": ["เมืองนครปฐม", "กำแพงแสน", "นครชัยศรี", "ดอนตูม", "บางเลน", "สามพราน", "พุทธมณฑล"],
-        "นครพนม": ["เมืองนครพนม", "ปลาปาก", "ท่าอุเทน", "บ้านแพง", "ศรีสงคราม", "นาแก", "โพนสวรรค์", "นาทม", "เรณูนคร", "นาหว้า", "ธาตุพนม", "วังยาง"],
-        "นครราชสีมา": ["เมืองนครราชสีมา", "ครบุรี", "เสิงสาง", "โคกกรวด", "ชุมพวง", "โนนแดง", "โนนสูง", "ขามสะแกแสง", "บัวใหญ่", "ประทาย", "ปักธงชัย", "พิมาย", "ห้วยแถลง", "ชัยภูมิ", "คง", "บ้านเลื่อม", "จักราช", "ครบุรี", "เฉลิมพระเกียรติ", "สูงเนิน", "สีดา", "เทพารักษ์", "เมืองยาง", "ลำทะเมนชัย", "วังน้ำเขียว", "พระทองคำ", "บัวลาย", "แก้งสนามนาง", "โนนไทย", "โชคชัย", "ด่านขุนทด"],
-        "นครศรีธรรมราช": ["เมืองนครศรีธรรมราช", "พรหมคีรี", "ลานสกา", "ฉวาง", "พิปูน", "เชียรใหญ่", "ท่าศาลา", "ทุ่งสง", "ปากพนัง", "ร่อนพิบูลย์", "สิชล", "ขนอม", "หัวไทร", "บางขัน", "ทุ่งใหญ่", "นบพิตำ", "นาบอน", "ช้างกลาง", "ท่าตะเกียบ", "เฉลิมพระเกียรติ", "จุฬาภรณ์", "พระพรหม", "นพพิตำ"],
-        "นครสวรรค์": ["เมืองนครสวรรค์", "โกรกพระ", "ชุมแสง", "โกรกพระ", "ไผ่สีทอง", "บรรพตพิสัย", "เก้าเลี้ยว", "ตาคลี", "ลาดยาว", "ตากฟ้า", "แม่วงก์", "แม่พิงค์", "ชุมตาบง", "หนองบัว", "ท่าตะโก"],
-        "นนทบุรี": ["เมืองนนทบุรี", "บางกรวย", "บางใหญ่", "บางบัวทอง", "ไทรน้อย", "ปากเกร็ด"],
-        "นราธิวาส": ["เมืองนราธิวาส", "ตากใบ", "บาเจาะ", "ยี่งอ", "ระแงะ", "รือเสาะ", "ศรีสาคร", "แว้ง", "สุคิริน", "สุไหงโก-ลก", "สุไหงปาดี", "จะแนะ", "เจาะไอร้อง"],
-        "น่าน": ["เมืองน่าน", "แม่จริม", "บ้านหลวง", "นาน้อย", "ปัว", "ท่าวังผา", "เวียงสา", "ทุ่งช้าง", "เฉลิมพระเกียรติ", "นาหมื่น", "สันติสุข", "บ้านหลวง", "เชียงกลาง", "ภูเพียง", "ทุ่งช้าง"],
-        "บึงกาฬ": ["เมืองบึงกาฬ", "โซ่พิสัย", "เซกา", "บุ่งคล้า", "ศรีวิไล", "บึงโขงหลง", "ปากคาด", "โพนเจริญ"],
-        "บุรีรัมย์": ["เมืองบุรีรัมย์", "กระสัง", "นางรอง", "หนองกี่", "หนองหงส์", "แคนดง", "ประโคนชัย", "ลำปลายมาศ", "สตึก", "ปะคำ", "นาโพธิ์", "เฉลิมพระเกียรติ", "โนนสุวรรณ", "ชำนิ", "บ้านกรวด", "หูทะเล", "โนนดินแดง", "เมืองยาง", "แคนดง", "พลับพลาชัย", "หนองแสง", "บ้านใหม่ไชยพจน์", "คูเมือง"],
-        "ปทุมธานี": ["เมืองปทุมธานี", "คลองหลวง", "ธัญบุรี", "รังสิต", "หนองเสือ", "ลาดหลุมแก้ว", "สามโคก"],
-        "ประจวบคีรีขันธ์": ["เมืองประจวบคีรีขันธ์", "กุยบุรี", "ทับสะแก", "บางสะพาน", "บางสะพานน้อย", "ปราณบุรี", "หัวหิน", "สามร้อยยอด"],
-        "ปราจีนบุรี": ["เมืองปราจีนบุรี", "กบินทร์บุรี", "นาดี", "บ้านสร้าง", "ประจันตคาม", "ศรีมหาโพธิ", "ศรีมโหสถ", "เกาะรูปช้าง"],
-        "ปัตตานี": ["เมืองปัตตานี", "โคกโพธิ์", "หนองจิก", "ปะนาเระ", "มายอ", "ทุ่งยางแดง", "สายบุรี", "ไม้แก่น", "โนนจิก", "ยะรัง", "ยะหริ่ง", "กะพ้อ"],
-        "พระนครศรีอยุธยา": ["พระนครศรีอยุธยา", "ท่าเรือ", "นครหลวง", "บางไทร", "บางปะอิน", "บางปะหัน", "ผักไห่", "ลาดบัวหลวง", "วังน้อย", "เสนา", "บางซ้าย", "อุทัย", "มหาราช", "บ้านแพรก", "ภาชี", "ลาติวงศ์"],
-        "พังงา": ["เมืองพังงา", "เกาะยาว", "กะปง", "ตะกั่วทุ่ง", "ตะกั่วป่า", "คุระบุรี", "ทับปุด", "ท้ายเหมือง"],
-        "พัทลุง": ["เมืองพัทลุง", "กงหรา", "เขาชัยสน", "ตำบลใหญ่", "ป่าบอน", "ป่าพะยอม", "ศรีนครินทร์", "ศรีบรรพต", "ตรัง", "บางแก้ว", "ปากพะยูน"],
-        "พิจิตร": ["เมืองพิจิตร", "วังทรายพูน", "โพธิ์ประทับช้าง", "ตะพานหิน", "บางมูลนาก", "โพทะเล", "สามง่าม", "ทับคล้อ", "สากเหล็ก", "บึงนาราง", "ดงเจริญ", "วชิรบารมี"],
-        "พิษณุโลก": ["เมืองพิษณุโลก", "นครไทย", "ชาติตระการ", "บางระกำ", "บางกระทุ่ม", "นิคมพัฒนา", "วัดโบสถ์", "พรหมพิราม", "เนินมะปราง"],
-        "เพชรบุรี": ["เมืองเพชรบุรี", "เขาย้อย", "หนองหญ้าปล้อง", "ชะอำ", "ท่ายาง", "บ้านลาด", "บ้านแหลม", "แก่งกระจาน"],
-        "เพชรบูรณ์": ["เมืองเพชรบูรณ์", "ชนแดน", "หล่มสัก", "หล่มเก่า", "วิเชียรบุรี", "ศรีเทพ", "เขาค้อ", "น้ำหนาว", "บึงสามพัน", "วังโป่ง", "หนองไผ่"],
-        "แพร่": ["เมืองแพร่", "ร้องกวาง", "ลอง", "สอง", "เด่นชัย", "สูงเม่น", "วังชิ้น", "หนองม่วงไข่"],
-        "ภูเก็ต": ["เมืองภูเก็ต", "กะทู้", "ถลาง"],
-        "มหาสารคาม": ["เมืองมหาสารคาม", "กันทรวิชัย", "เชิงดอย", "บรบือ", "เกษตรวิสัย", "กุดรัง", "โกสุมพิสัย", "กันทรลักษ์", "ศรีรัตนะ", "พยัคฆภูมิพิสัย", "วาปีปทุม", "นาดูน", "ยางสีสุราช"],
-        "มุกดาหาร": ["เมืองมุกดาหาร", "นิคมคำสร้อย", "ดอนตาล", "ดงหลวง", "คำชะอี", "หว้านใหญ่", "เดิมบางนางบวช"],
-        "แม่ฮ่องสอน": ["เมืองแม่ฮ่องสอน", "ขุนยวม", "ปาย", "แม่สะเรียง", "แม่ลาน้อย", "สบเมย", "ปางมะผ้า"],
-        "ยโสธร": ["เมืองยโสธร", "กุดชุม", "ไทยเจริญ", "กันทรารมย์", "ป่าติ้ว", "มหาชนะชัย", "ค้อวัง", "เลิงนกทา", "ไผ่ใส"],
-        "ยะลา": ["เมืองยะลา", "เบตง", "บันนังสตา", "ธารโต", "ยะหา", "กาบัง", "กรงปินัง", "รามัน"],
-        "ร้อยเอ็ด": ["เมืองร้อยเอ็ด", "เกษตรวิสัย", "ปทุมรัตต์", "จตุรพักตรพิมาน", "ทุ่งเขาหลวง", "ปธานนิคม", "โพนทอง", "โพธิ์ชัย", "เมืองสรวง", "จังหาร", "เชียงขวัญ", "เสลภูมิ", "สุวรรณภูมิ", "โพนทราย", "หนองพอก", "เอื้อมใส", "โพธิ์ชัย", "อาจสามารถ", "ศรีสมเด็จ"],
-        "ระนอง": ["เมืองระนอง", "ละอุ่น", "กะปง", "สุขสำราญ"],
-        "ระยอง": ["เมืองระยอง", "บ้านฉาง", "แกลง", "วังจันทร์", "บ้านค่าย", "ปลวกแดง", "เขาชะเมา", "นิคมพัฒนา"],
-        "ราชบุรี": ["เมืองราชบุรี", "จอมบึง", "สวนผึ้ง", "ดำเนินสะดวก", "บ้านโป่ง", "บางแพ", "โพธาราม", "ปากท่อ", "วัดเพลง", "บ้านคา"],
-        "ลพบุรี": ["เมืองลพบุรี", "พัฒนานิคม", "โคกเจริญ", "ชัยบาดาล", "ท่าวุ้ง", "บ้านหมี่", "ท่าหลวง", "ลำสนธิ", "โคกสำโรง", "ซับสมบูรณ์", "หนองม่วง"],
-        "ลำปาง": ["เมืองลำปาง", "แม่เมาะ", "เกาะคา", "แม่ทะ", "แม่พริก", "วังเหนือ", "เถิน", "แจ้ห่ม", "งาว", "เสริมงาม", "แม่ทา", "สบปราบ", "ห้างฉัตร"],
-        "ลำพูน": ["เมืองลำพูน", "ป่าซาง", "ลี้", "ทุ่งหัวช้าง", "บ้านโฮ่ง", "บ้านธิ", "เวียงหนองล่อง", "ทุ่งหัวช้าง"],
-        "เลย": ["เมืองเลย", "ท่าลี่", "นาด้วง", "ภูเรือ", "ภูกระดึง", "ภูหลวง", "วังสะพุง", "เอราวัณ", "ปากชม", "ชุมแพ", "นาแห้ว", "ด่านซ้าย"],
-        "ศรีสะเกษ": ["เมืองศรีสะเกษ", "ยางชุมน้อย", "กันทรารมย์", "กันทรลักษ์", "ราษีไศล", "อุทุมพรพิสัย", "บึงบูรพ์", "ห้วยทับทัน", "โนนคูณ", "ศิลาลาด", "มูลนาคร", "ภูสิงห์", "เมืองจันทร์", "เบญจลักษ์", "พรรณนานิคม", "โพธิ์ศรีสุวรรณ", "ศรีรัตนะ", "วังหิน", "ปรางค์กู่", "ขุขันธ์", "ไพรบึง", "โพนทอง"],
-        "สกลนคร": ["เมืองสกลนคร", "กุสุมาลย์", "กุดบาก", "พรรณานิคม", "พังโคน", "อากาศอำนวย", "สว่างแดนดิน", "วาริชภูมิ", "นิคมน้ำอูน", "วานรนิวาส", "ท่าแร่", "เจริญศิลป์", "โคกศรีสุพรรณ", "ภูพาน", "ส่องดาว", "ตาลสุม", "โพนนาแก้ว", "อำนาจเจริญ"],
-        "สงขลา": ["เมืองสงขลา", "สทิงพระ", "จะนะ", "นาทวี", "เทพา", "สะบ้าย้อย", "ระโนด", "กระแสสินธุ์", "รัตภูมิ", "สะเดา", "หาดใหญ่", "นาหม่อม", "ควนเนียง", "บางกล่ำ", "สิงหนคร", "คลองหอยโข่ง"],
-        "สตูล": ["เมืองสตูล", "ละงู", "ทุ่งหว้า", "มะนัง", "ท่าแพ", "ควนโดน", "ควนกาหลง"],
-        "สมุทรปราการ": ["เมืองสมุทรปราการ", "บางบ่อ", "บางพลี", "พระประแดง", "พระสมุทรเจดีย์", "บางเสาธง"],
-        "สมุทรสงคราม": ["เมืองสมุทรสงคราม", "บางคนที", "อัมพวา"],
-        "สมุทรสาคร": ["เมืองสมุทรสาคร", "กระทุ่มแบน", "บ้านแพ้ว"],
-        "สระแก้ว": ["เมืองสระแก้ว", "คลองหาด", "ตาพระยา", "วังน้ำเย็น", "อรัญประเทศ", "วัฒนานคร", "โคกสูง", "วังสมบูรณ์", "เขาฉกรรจ์"],
-        "สระบุรี": ["เมืองสระบุรี", "แก่งคอย", "หนองแค", "วิหารแดง", "หนองแซง", "บ้านหมอ", "ดอนพุด", "หนองโดน", "พระพุทธบาท", "เสาไห้", "มวกเหล็ก", "วังม่วง", "เฉลิมพระเกียรติ"],
-        "สิงห์บุรี": ["เมืองสิงห์บุรี", "บางระจัน", "ค่ายบางระจัน", "อินทร์บุรี", "ท่าช้าง", "พรหมบุรี"],
-        "สุโขทัย": ["เมืองสุโขทัย", "บ้านด่านลานหอย", "คีรีมาศ", "กงไกรลาศ", "ศรีสำโรง", "ศรีนคร", "ทุ่งเสลี่ยม", "ศรีสัชนาลัย", "สวรรคโลก"],
-        "สุพรรณบุรี": ["เมืองสุพรรณบุรี", "เดิมบางนางบวช", "ด่านช้าง", "บางปลาม้า", "ศรีประจันต์", "ดอนเจดีย์", "สองพี่น้อง", "สามชุก", "อู่ทอง", "หนองหญ้าไซ"],
-        "สุราษฎร์ธานี": ["เมืองสุราษฎร์ธานี", "กาญจนดิษฐ์", "ดอนสัก", "เกาะสมุย", "เกาะพะงัน", "ไชยา", "ท่าชนะ", "คีรีรัฐนิคม", "บ้านตาขุน", "พนม", "ท่าช้าง", "บ้านนาสาร", "บ้านนาเดิม", "เคียนซา", "เวียงสระ", "พระแสง", "วิภาวดี", "ชัยบุรี", "ไพบูลย์"],
-        "สุรินทร์": ["เมืองสุรินทร์", "ชุมพลบุรี", "ท่าตูม", "จอมพระ", "ปราสาท", "กาบเชิง", "รัตนบุรี", "สนม", "ศีขรภูมิ", "สังขะ", "ลำดวน", "สำโรงทาบ", "บัวเชด", "พนมดงรัก", "ศรีณรงค์", "เมืองจันทร์", "โนนนารายณ์"],
-        "หนองคาย": ["เมืองหนองคาย", "ท่าบ่อ", "โพนพิสัย", "โซ่พิสัย", "เฝ้าไร่", "รัตนวาปี", "สังคม", "ศรีเชียงใหม่"],
-        "หนองบัวลำภู": ["เมืองหนองบัวลำภู", "นาคลาง", "เสียว", "นาวัง", "โนนสัง", "สุวรรณคูหา"],
-        "อ่างทอง": ["เมืองอ่างทอง", "ไชโย", "ป่าโมก", "โพธิ์ทอง", "แสวงหา", "วิเศษชัยชาญ", "สามโก้"],
-        "อำนาจเจริญ": ["เมืองอำนาจเจริญ", "ชานุมาน", "ปทุมราชวงศา", "พนา", "หัวตะพาน", "เสนางคนิคม", "ลืออำนาจ"],
-        "อุดรธานี": ["เมืองอุดรธานี", "กุมภวาปี", "โนนสะอาด", "นาโยง", "หนองวัวซอ", "กุดจับ", "บ้านผือ", "เพ็ญ", "สร้างคอม", "วังสามหมอ", "ไชยวาน", "ศรีธาตุ", "น้ำโสม", "หนองแสง", "บ้านดุง", "ทุ่งฝน", "ประจักษ์ศิลปาคม", "กุมภวาปี", "โนนสะอาด", "หนองหาน"],
-        "อุตรดิตถ์": ["เมืองอุตรดิตถ์", "ตรอน", "ลับแล", "ท่าปลา", "น้ำปาด", "ฟากท่า", "บ้านโคก", "ทองแสนขัน", "น้ำปาด"],
-        "อุทัยธานี": ["เมืองอุทัยธานี", "ทัพทัน", "สว่างอารมณ์", "หนองขาหย่าง", "หนองฉาง", "บ้านไร่", "ลานสัก", "ห้วยคต"],
-        "อุบลราชธานี": ["เมืองอุบลราชธานี", "ศรีเมืองใหม่", "โขงเจียม", "เดชอุดม", "น้ำยืน", "บุณฑริก", "ตระการพืชผล", "กุดข้าวปุ้น", "ม่วงสามสิบ", "วารินชำราบ", "พิบูลมังสาหาร", "ตาลสุม", "โพธิ์ไทร", "สำโรง", "ดอนมดแดง", "สิรินธร", "ทุ่งศรีอุดม", "นาจะหลวย", "เขื่องใน", "เขมราฐ", "โดมใหญ่", "อำนาจเจริญ", "ลือใส", "สว่างวีระวงศ์", "น้ำขุ่น"]
-    }
+    # Metric Cards Dashboard (เติมค่าหลังการค้นหาเสร็จ เพื่อให้แสดงผลลัพธ์และสถานะล่าสุด)
+    metric_cards = [column.empty() for column in st.columns(4)]
     
-    provinces = list(provinces_districts.keys())
     
-    # รายการประเภทธุรกิจ
-    business_types = [
-        "ร้านอาหาร", "โรงแรม", "ร้านกาแฟ", "คลินิก", "โรงพยาบาล", "ร้านเสื้อผ้า", "ร้านขายยา", "ธนาคาร",
-        "ปั๊มน้ำมัน", "ร้านสะดวกซื้อ", "ซุปเปอร์มาร์เก็ต", "ร้านทำผม", "สปา", "ฟิตเนส", "โรงเรียน", "มหาวิทยาลัย",
-        "ร้านหนังสือ", "ร้านดนตรี", "ร้านขายรถ", "อู่ซ่อมรถ", "ร้านซ่อมมือถือ", "ร้านคอมพิวเตอร์", "ร้านเบเกอรี่",
-        "ร้านไอศกรีม", "ร้านดอกไม้", "ร้านของขวัญ", "ร้านเครื่องประดับ", "ร้านแว่นตา", "ร้านรองเท้า", "ร้านกระเป๋า",
-        "ร้านเฟอร์นิเจอร์", "ร้านวัสดุก่อสร้าง", "ร้านจักรยาน", "ร้านกีฬา", "ร้านของเล่น", "ร้านสัตว์เลี้ยง",
-        "คลีนิกสัตว์", "ร้านซักรีด", "ร้านถ่ายเอกสาร", "ไปรษณีย์", "สำนักงานขนส่ง", "ตลาด", "ห้างสรรพสินค้า",
-        "โรงภาพยนตร์", "สวนสนุก", "พิพิธภัณฑ์", "วัด", "โบสถ์", "มัสยิด", "สถานีตำรวจ", "ที่ว่าการ"
-    ]
+    # ข้อมูลจังหวัด/อำเภอ และประเภทธุรกิจ (แคชไว้ ไม่สร้างใหม่ทุก rerun)
+    reference = get_reference_data()
+    provinces = reference.provinces
+    business_types = reference.business_types
     
     # Sidebar สำหรับการตั้งค่า
     with st.sidebar:
@@ -485,172 +868,370 @@ def main():
         default_province = os.getenv('DEFAULT_PROVINCE', 'ทั้งหมด')
         default_district = os.getenv('DEFAULT_DISTRICT', 'ทั้งหมด')
         
-        # ฟอร์มการค้นหา
-        with st.form("search_form"):
-            # แถวแรก: ประเภทธุรกิจ
+        # เลือกโหมดการค้นหา
+        search_mode = st.radio(
+            "โหมดการค้นหา",
+            options=["ค้นหาเดี่ยว", "ค้นหาแบบกลุ่ม", "คลังรายชื่อ"],
+            horizontal=True
+        )
+        
+        search_button = False
+        sweep_button = False
+        refresh_mode = False
+        use_tiling = False
+        
+        if search_mode == "ค้นหาเดี่ยว":
+            with st.form("search_form"):
+                # แถวแรก: ประเภทธุรกิจ
+                st.markdown("**🏢 ประเภทธุรกิจ**")
+                query = st.selectbox(
+                    "เลือกประเภทธุรกิจที่ต้องการค้นหา",
+                    options=business_types,
+                    index=0,
+                    label_visibility="collapsed"
+                )
+                
+                st.markdown("---")
+                
+                # แถวที่สอง: จังหวัด
+                st.markdown("**🗺️ จังหวัด**")
+                selected_province = st.selectbox(
+                    "เลือกจังหวัดที่ต้องการค้นหา",
+                    options=provinces,
+                    index=0,
+                    label_visibility="collapsed"
+                )
+                
+                # แถวที่สาม: อำเภอ (อยู่ใต้จังหวัด)
+                st.markdown("**📍 อำเภอ**")
+                districts = reference.districts(selected_province)
+                selected_district = st.selectbox(
+                    "เลือกอำเภอที่ต้องการค้นหา",
+                    options=["ทุกอำเภอ"] + districts,
+                    index=0,
+                    label_visibility="collapsed"
+                )
+                
+                # สร้าง location string สำหรับการค้นหา
+                if selected_district == "ทุกอำเภอ":
+                    location = selected_province
+                else:
+                    location = f"{selected_district}, {selected_province}"
+                
+                st.markdown("---")
+                
+                # แถวที่สี่: จำนวนผลลัพธ์
+                st.markdown("**📊 จำนวนผลลัพธ์**")
+                num_results = st.slider(
+                    "เลือกจำนวนผลลัพธ์ที่ต้องการ",
+                    min_value=5,
+                    max_value=50,
+                    value=20,
+                    step=5,
+                    label_visibility="collapsed"
+                )
+                
+                # ค้นหาแบบแบ่งพื้นที่เป็นตาราง เพื่อให้ได้ผลลัพธ์เกินเพดานต่อคำค้นหา
+                use_tiling = st.checkbox(
+                    "🧩 ค้นหาแบบแบ่งพื้นที่ (ครอบคลุมทั้งพื้นที่)",
+                    value=False,
+                    help="แบ่งจังหวัด/อำเภอเป็นช่องย่อยแล้วค้นหาทุกช่อง ไม่จำกัดตามจำนวนผลลัพธ์ที่เลือก"
+                )
+                
+                # ข้ามแคชเพื่อดึงข้อมูลล่าสุดจาก SerpApi
+                bypass_cache = st.checkbox("🔄 ไม่ใช้ข้อมูลจากแคช (ดึงข้อมูลใหม่)", value=False)
+                
+                credit_budget = st.number_input(
+                    "💳 งบ credit สูงสุด (0 = ไม่จำกัด)",
+                    min_value=0,
+                    value=SEARCH_CREDIT_BUDGET,
+                    step=1,
+                    help="หยุดค้นหาเมื่อเรียก SerpApi ครบจำนวนนี้ (ผลลัพธ์จากแคชไม่ใช้ credit)"
+                )
+                
+                st.markdown("<br>", unsafe_allow_html=True)
+                
+                # ปุ่มค้นหา
+                search_button = st.form_submit_button(
+                    "🔍 เริ่มค้นหาธุรกิจ",
+                    use_container_width=True
+                )
+                # ค่าในฟอร์มส่งเมื่อกดปุ่มเท่านั้น จึงมีปุ่มสำหรับอัพเดทประมาณการโดยไม่ค้นหา
+                st.form_submit_button("💳 ประมาณการ credit", use_container_width=True)
+            
+            if use_tiling:
+                st.caption(
+                    f"🧩 ค้นหาแบบแบ่งพื้นที่ใช้สูงสุดประมาณ {TILE_MAX_TILES * MAX_PAGES + 1:,} credit "
+                    "(ขึ้นกับความหนาแน่นของพื้นที่)"
+                )
+            else:
+                district = None if selected_district == "ทุกอำเภอ" else selected_district
+                render_plan(
+                    CostPlanner(searcher, get_lead_store()).plan_search(
+                        query, location, num_results, not bypass_cache, selected_province, district
+                    ),
+                    credit_budget
+                )
+        elif search_mode == "ค้นหาแบบกลุ่ม":
+            # โหมดค้นหาแบบกลุ่ม: ประเภทธุรกิจ × จังหวัด × อำเภอ
             st.markdown("**🏢 ประเภทธุรกิจ**")
-            query = st.selectbox(
-                "เลือกประเภทธุรกิจที่ต้องการค้นหา",
+            sweep_types = st.multiselect(
+                "เลือกประเภทธุรกิจ",
                 options=business_types,
-                index=0,
                 label_visibility="collapsed"
             )
             
-            st.markdown("---")
-            
-            # แถวที่สอง: จังหวัด
             st.markdown("**🗺️ จังหวัด**")
-            selected_province = st.selectbox(
-                "เลือกจังหวัดที่ต้องการค้นหา",
+            sweep_provinces = st.multiselect(
+                "เลือกจังหวัด",
                 options=provinces,
-                index=0,
                 label_visibility="collapsed"
             )
             
-            # แถวที่สาม: อำเภอ (อยู่ใต้จังหวัด)
             st.markdown("**📍 อำเภอ**")
-            districts = provinces_districts.get(selected_province, [])
-            selected_district = st.selectbox(
-                "เลือกอำเภอที่ต้องการค้นหา",
-                options=["ทุกอำเภอ"] + districts,
-                index=0,
+            district_options = [
+                district
+                for province in sweep_provinces
+                for district in dict.fromkeys(reference.districts(province))
+            ]
+            sweep_districts = st.multiselect(
+                "เลือกอำเภอ (เว้นว่างเพื่อค้นหาทั้งจังหวัด)",
+                options=district_options,
                 label_visibility="collapsed"
             )
-            
-            # สร้าง location string สำหรับการค้นหา
-            if selected_district == "ทุกอำเภอ":
-                location = selected_province
-            else:
-                location = f"{selected_district}, {selected_province}"
+            split_districts = st.checkbox(
+                "แยกค้นหาทุกอำเภอของจังหวัดที่ไม่ได้เลือกอำเภอ",
+                value=False
+            )
             
             st.markdown("---")
             
-            # แถวที่สี่: จำนวนผลลัพธ์
-            st.markdown("**📊 จำนวนผลลัพธ์**")
+            st.markdown("**📊 จำนวนผลลัพธ์ต่องาน**")
             num_results = st.slider(
-                "เลือกจำนวนผลลัพธ์ที่ต้องการ",
+                "เลือกจำนวนผลลัพธ์ต่องาน",
                 min_value=5,
                 max_value=50,
                 value=20,
                 step=5,
                 label_visibility="collapsed"
             )
+            sweep_workers = st.slider("จำนวนงานที่รันพร้อมกัน", min_value=1, max_value=8, value=4)
+            refresh_mode = st.checkbox(
+                "♻️ โหมดรีเฟรช (ค้นหาเฉพาะงานที่ข้อมูลเก่า แสดงเฉพาะธุรกิจใหม่/เปลี่ยนแปลง/หายไป)",
+                value=False
+            )
+            if refresh_mode:
+                refresh_days = st.number_input(
+                    "รีเฟรชงานที่ค้นหาล่าสุดนานกว่า (วัน)",
+                    min_value=0.0,
+                    value=REFRESH_MAX_AGE_DAYS,
+                    step=1.0
+                )
+                only_new = False
+                bypass_cache = True
+            else:
+                only_new = st.checkbox(
+                    "🆕 เก็บเฉพาะธุรกิจใหม่ (ข้ามธุรกิจที่เคยพบในการค้นหาก่อนหน้า)",
+                    value=False
+                )
+                bypass_cache = st.checkbox("🔄 ไม่ใช้ข้อมูลจากแคช (ดึงข้อมูลใหม่)", value=False)
+            
+            sweep_locations = build_locations(
+                sweep_provinces, reference.provinces_districts, sweep_districts, split_districts
+            )
+            sweep_jobs = expand_jobs(sweep_types, sweep_locations)
+            st.caption(f"จำนวนงานทั้งหมด: {len(sweep_jobs)} งาน")
             
-            st.markdown("<br>", unsafe_allow_html=True)
+            credit_budget = st.number_input(
+                "💳 งบ credit สูงสุด (0 = ไม่จำกัด)",
+                min_value=0,
+                value=SEARCH_CREDIT_BUDGET,
+                step=10,
+                help="หยุดค้นหาเมื่อเรียก SerpApi ครบจำนวนนี้ (ผลลัพธ์จากแคชไม่ใช้ credit)"
+            )
+            if sweep_jobs:
+                planner = CostPlanner(searcher, get_lead_store())
+                if refresh_mode:
+                    # รีเฟรชเฉพาะงานที่ข้อมูลเก่า และไม่ใช้แคช
+                    planned_jobs = get_lead_store().stale_jobs(sweep_jobs, refresh_days * 86400)
+                else:
+                    planned_jobs = sweep_jobs
+                render_plan(
+                    planner.plan_sweep(planned_jobs, num_results, not bypass_cache, sweep_workers),
+                    credit_budget
+                )
             
-            # ปุ่มค้นหา
-            search_button = st.form_submit_button(
-                "🔍 เริ่มค้นหาธุรกิจ",
-                use_container_width=True
+            sweep_button = st.button(
+                "🚀 เริ่มค้นหาแบบกลุ่ม",
+                use_container_width=True,
+                disabled=not sweep_jobs
             )
+        else:
+            # โหมดคลังรายชื่อ: ค้นหาธุรกิจที่เคยพบจากฐานข้อมูลในเครื่อง โดยไม่เรียก API
+            lead_filters, lead_sort = render_lead_filters(get_lead_store().facets())
+        
+        # ประวัติการค้นหาใน session นี้ (เติมหลังการค้นหาเสร็จ เพื่อให้รวมผลลัพธ์ล่าสุด)
+        history_container = st.container()
+        
+        # สถิติการใช้งานแคช
+        cache_stats = search_cache.stats()
+        st.caption(
+            f"💾 แคช: {cache_stats['entries']} รายการ | "
+            f"hit {cache_stats['hits']} / miss {cache_stats['misses']} "
+            f"({cache_stats['hit_rate']:.0%})"
+        )
+        
+        # การใช้งาน API key และสถิติการทำงาน (เติมหลังการค้นหาเสร็จ)
+        key_usage_container = st.container()
+        metrics_container = st.container()
     
     # หน้าหลัก
-    if search_button and query:
-        with st.spinner(f"กำลังค้นหา '{query}' ใน {location}..."):
-            businesses = searcher.search_businesses(query, location, num_results)
+    store = get_search_store()
+    
+    if search_button and query and use_tiling:
+        district = None if selected_district == "ทุกอำเภอ" else selected_district
+        search_id = make_search_id(mode="tile", query=query, province=selected_province, district=district)
         
-        if businesses:
-            # อัพเดท metric card สำหรับจำนวนผลลัพธ์
-            st.markdown(f"""
-            <script>
-                document.getElementById('search-count').innerText = '{len(businesses)}';
-            </script>
-            """, unsafe_allow_html=True)
-            
-            st.markdown(f"""
-            <div class="success-message" style="background: linear-gradient(90deg, #28a745 0%, #20c997 100%); color: white; padding: 1rem; border-radius: 10px; margin: 1rem 0; text-align: center;">
-                ✅ พบธุรกิจ <strong>{len(businesses)}</strong> แห่ง ในพื้นที่ <strong>{location}</strong>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # แสดงผลลัพธ์
-            col1, col2 = st.columns([3, 1])
-            
-            with col1:
-                st.subheader("📋 ผลลัพธ์การค้นหา")
-                
-                # แสดงข้อมูลในรูปแบบตาราง modern
-                df = pd.DataFrame(businesses)
-                st.dataframe(
-                    df,
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config={
-                        "ชื่อธุรกิจ": st.column_config.TextColumn(
-                            "🏢 ชื่อธุรกิจ",
-                            width="large"
-                        ),
-                        "ที่อยู่": st.column_config.TextColumn(
-                            "📍 ที่อยู่",
-                            width="large"
-                        ),
-                        "เบอร์โทรศัพท์": st.column_config.TextColumn(
-                            "📞 เบอร์โทร",
-                            width="medium"
-                        ),
-                        "คะแนนรีวิว": st.column_config.NumberColumn(
-                            "⭐ เรตติ้ง",
-                            width="small",
-                            format="%.1f"
-                        ),
-                        "จำนวนรีวิว": st.column_config.NumberColumn(
-                            "💬 รีวิว",
-                            width="small"
-                        )
-                    }
-                )
-            
-            with col2:
-                st.subheader("💾 ดาวน์โหลดข้อมูล")
-                
-                # ปุ่มดาวน์โหลด CSV
-                csv_data = df.to_csv(index=False, encoding='utf-8-sig')
-                st.download_button(
-                    label="📥 ดาวน์โหลด CSV",
-                    data=csv_data,
-                    file_name=f"business_search_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
-                
-                # ปุ่มดาวน์โหลด Excel
-                from io import BytesIO
-                excel_buffer = BytesIO()
-                df.to_excel(excel_buffer, index=False, engine='openpyxl')
-                excel_data = excel_buffer.getvalue()
-                st.download_button(
-                    label="📊 ดาวน์โหลด Excel",
-                    data=excel_data,
-                    file_name=f"business_search_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    use_container_width=True
-                )
-            
-            # แสดงรายละเอียดแต่ละธุรกิจ
-            st.subheader("🏢 รายละเอียดธุรกิจ")
-            
-            for i, business in enumerate(businesses, 1):
-                with st.expander(f"{i}. {business['ชื่อธุรกิจ']}"):
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.write(f"**ที่อยู่:** {business['ที่อยู่']}")
-                        st.write(f"**เบอร์โทรศัพท์:** {business['เบอร์โทรศัพท์']}")
-                        st.write(f"**อีเมล:** {business['อีเมล']}")
-                        st.write(f"**เว็บไซต์:** {business['เว็บไซต์']}")
-                    
-                    with col2:
-                        st.write(f"**ประเภทธุรกิจ:** {business['ประเภทธุรกิจ']}")
-                        st.write(f"**คะแนนรีวิว:** {business['คะแนนรีวิว']}")
-                        st.write(f"**จำนวนรีวิว:** {business['จำนวนรีวิว']}")
-                        st.write(f"**สถานะ:** {business['สถานะ']}")
+        # ผลลัพธ์เดิมใน session เปิดได้ทันทีโดยไม่เรียก API (ยกเว้นเลือกไม่ใช้แคช)
+        if search_id in store and not bypass_cache:
+            open_search(search_id)
+        else:
+            # ค้นหาในคิวเบื้องหลังทีละช่อง ช่องที่ค้นหาแล้วถูกบันทึกเป็น checkpoint
+            submit_job(
+                KIND_TILE,
+                {
+                    "query": query,
+                    "province": selected_province,
+                    "district": district,
+                    "use_cache": not bypass_cache,
+                    "budget": credit_budget,
+                },
+                {
+                    "search_id": search_id,
+                    "label": f"🧩 {query} · {location}",
+                    "location": location,
+                    "search_type": query,
+                    "province": selected_province,
+                    "district": district,
+                },
+            )
+    
+    elif search_button and query:
+        search_id = make_search_id(mode="single", query=query, location=location, num_results=num_results)
         
+        if search_id in store and not bypass_cache:
+            open_search(search_id)
         else:
-            st.warning("ไม่พบผลลัพธ์การค้นหา กรุณาลองใช้คำค้นหาอื่น")
+            # ค้นหาในคิวเบื้องหลัง การ rerun ระหว่างรอไม่ทำให้งานหาย
+            submit_job(
+                KIND_SEARCH,
+                {
+                    "query": query,
+                    "location": location,
+                    "num_results": num_results,
+                    "use_cache": not bypass_cache,
+                    "budget": credit_budget,
+                },
+                {
+                    "search_id": search_id,
+                    "label": f"{query} · {location}",
+                    "location": location,
+                    "search_type": query,
+                    "province": selected_province,
+                    "district": None if selected_district == "ทุกอำเภอ" else selected_district,
+                },
+            )
+    
+    elif sweep_button and refresh_mode:
+        # ผลลัพธ์ขึ้นกับข้อมูลที่เคยพบ จึงรีเฟรชใหม่ทุกครั้งที่กด
+        search_id = make_search_id(mode="refresh", jobs=sorted(str(job.key) for job in sweep_jobs),
+                                   created_at=datetime.now().isoformat())
+        submit_job(
+            KIND_REFRESH,
+            {
+                "jobs": [list(job.key) for job in sweep_jobs],
+                "num_results": num_results,
+                "max_workers": sweep_workers,
+                "max_age_days": refresh_days,
+                "budget": credit_budget,
+            },
+            {
+                "search_id": search_id,
+                "label": f"♻️ รีเฟรช {len(sweep_jobs)} งาน · {', '.join(sweep_provinces[:2])}",
+                "location": f"{len(sweep_jobs)} พื้นที่/ประเภท",
+            },
+        )
+    
+    elif sweep_button:
+        search_id = make_search_id(
+            mode="sweep",
+            jobs=sorted(str(job.key) for job in sweep_jobs),
+            num_results=num_results,
+            only_new=only_new
+        )
+        
+        # โหมดเฉพาะธุรกิจใหม่ต้องค้นหาใหม่ทุกครั้ง เพราะผลลัพธ์ขึ้นกับประวัติที่เคยพบ
+        if search_id in store and not bypass_cache and not only_new:
+            open_search(search_id)
+        else:
+            submit_job(
+                KIND_SWEEP,
+                {
+                    "jobs": [list(job.key) for job in sweep_jobs],
+                    "num_results": num_results,
+                    "use_cache": not bypass_cache,
+                    "only_new": only_new,
+                    "max_workers": sweep_workers,
+                    "budget": credit_budget,
+                },
+                {
+                    "search_id": search_id,
+                    "label": f"🚀 กลุ่ม {len(sweep_jobs)} งาน · {', '.join(sweep_provinces[:2])}",
+                    "location": f"{len(sweep_jobs)} พื้นที่/ประเภท",
+                },
+            )
     
     elif search_button and not query:
         st.error("กรุณาระบุประเภทธุรกิจที่ต้องการค้นหา")
     
+    # งานเบื้องหลังของ session นี้ (งานที่เสร็จแล้วจะถูกเปิดเป็นผลลัพธ์ที่กำลังแสดง)
+    jobs_running = render_jobs()
+    
+    if search_mode == "คลังรายชื่อ":
+        render_lead_browser(get_lead_store(), lead_filters, lead_sort)
+    
+    # แสดงผลลัพธ์ที่เลือกไว้ (คงอยู่ข้ามการ rerun เช่น กดดาวน์โหลดหรือเปิด expander)
+    # ในโหมดคลังรายชื่อแสดงเฉพาะผลลัพธ์ที่เปิดจากคลังรายชื่อ
+    active_entry = store.get(st.session_state.get("active_search_id"))
+    if active_entry is not None and (
+            search_mode != "คลังรายชื่อ" or active_entry["location"] == LEAD_STORE_LOCATION):
+        render_results(active_entry)
+    
+    with history_container:
+        render_history()
+    
+    with key_usage_container:
+        render_key_usage(get_key_pool())
+    
+    with metrics_container:
+        render_metrics_panel()
+    
+    render_metric_cards(
+        metric_cards,
+        provinces=len(provinces),
+        business_types=len(business_types),
+        results=len(active_entry["df"]) if active_entry is not None else 0,
+        breaker_state=get_circuit_breaker().state,
+    )
+    
+    # เขียนไฟล์ metrics สำหรับ Prometheus textfile collector (ถ้าตั้งค่าไว้)
+    if METRICS_FILE:
+        REGISTRY.write_file(METRICS_FILE)
+    
+    # อ่านสถานะงานใหม่เป็นระยะ (งานทำต่อใน worker ไม่ได้รอ script นี้)
+    if jobs_running:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,287 @@
+"""
+ตัววัดการทำงานของระบบ (counter / histogram) ที่ใช้ร่วมกันทั้ง process
+
+ส่วนที่ทำงานบ่อย (เรียก SerpApi, ดึงแต่ละหน้า, แปลงข้อมูล, ส่งออกไฟล์) บันทึกค่าลง REGISTRY
+แล้วแสดงได้ 3 ทาง:
+    - แผงสถิติใน Streamlit (MetricsRegistry.summary)
+    - endpoint รูปแบบ Prometheus (METRICS_PORT, เช่น http://host:9108/metrics)
+    - ไฟล์รูปแบบ Prometheus สำหรับ node_exporter textfile collector (METRICS_FILE)
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+logger = logging.getLogger(__name__)
+
+# port ของ endpoint /metrics (0 คือไม่เปิด) และไฟล์ metrics (ว่างคือไม่เขียน)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_FILE = os.getenv('METRICS_FILE', '')
+
+METRICS_PREFIX = "gg_lead_"
+
+# ขอบบนของ bucket ใน histogram (วินาที)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# จำนวนค่าล่าสุดที่เก็บไว้คำนวณ p50/p95 ในแผงสถิติ
+RECENT_SAMPLES = 1000
+
+# คำอธิบายของแต่ละ metric (แสดงเป็น # HELP)
+METRIC_HELP = {
+    "serpapi_requests_total": "คำขอ SerpApi ที่ส่งจริง แยกตามผลลัพธ์ (ok / error)",
+    "serpapi_errors_total": "คำขอ SerpApi ที่ผิดพลาด แยกตาม HTTP status (network คือเชื่อมต่อไม่ได้)",
+    "serpapi_credits_used_total": "credit ของ SerpApi ที่ใช้ (คำขอที่สำเร็จ)",
+    "serpapi_request_seconds": "เวลาของคำขอ SerpApi หนึ่งครั้ง",
+    "serpapi_retries_total": "จำนวนครั้งที่ลองเรียก SerpApi ใหม่",
+    "circuit_breaker_rejections_total": "คำขอที่ถูกปฏิเสธเพราะ circuit breaker เปิดอยู่",
+    "search_cache_requests_total": "การอ่านแคชผลลัพธ์ แยกตาม hit / miss",
+    "search_pages_total": "หน้าผลลัพธ์ที่ดึง (ทั้งจากแคชและ SerpApi)",
+    "search_page_seconds": "เวลาดึงผลลัพธ์หนึ่งหน้า (รวมแคช การรอ และการลองใหม่)",
+    "search_results_total": "จำนวนธุรกิจที่ได้จากการค้นหา",
+    "extract_records_total": "จำนวนรายการที่แปลงเป็นตาราง",
+    "extract_seconds": "เวลาแปลงผลลัพธ์หนึ่งหน้าเป็นตาราง",
+    "export_bytes_total": "ขนาดไฟล์ที่ส่งออก แยกตามรูปแบบ",
+    "export_seconds": "เวลาสร้างไฟล์ส่งออก แยกตามรูปแบบ",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Histogram:
+    """
+    การกระจายของค่าที่วัดได้ (นับแยกตาม bucket) พร้อมค่าล่าสุดสำหรับคำนวณ percentile
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+
+class MetricsRegistry:
+    """
+    ที่เก็บ counter และ histogram ทั้งหมด (ใช้งานร่วมกันหลาย thread ได้)
+
+    ชื่อ metric และ label เหมือน Prometheus เช่น inc("serpapi_requests_total", outcome="ok")
+    """
+
+    def __init__(self, prefix=METRICS_PREFIX):
+        self.prefix = prefix
+        self.started_at = time.time()
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        """เพิ่มค่า counter"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """บันทึกค่าลง histogram"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """จับเวลาช่วงของโค้ด แล้วบันทึกลง histogram (วินาที)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def total(self, name, **labels):
+        """ผลรวมของ counter ที่มี label ตรงกับที่ระบุ (label ที่ไม่ระบุรวมทุกค่า)"""
+        wanted = set(_label_key(labels))
+        with self._lock:
+            return sum(
+                value for (metric, key), value in self._counters.items()
+                if metric == name and wanted <= set(key)
+            )
+
+    def percentile(self, name, fraction, **labels):
+        """percentile ของค่าล่าสุดใน histogram (รวมทุก label ที่ไม่ระบุ)"""
+        wanted = set(_label_key(labels))
+        with self._lock:
+            samples = [
+                value
+                for (metric, key), histogram in self._histograms.items()
+                if metric == name and wanted <= set(key)
+                for value in histogram.recent
+            ]
+        if not samples:
+            return None
+        samples.sort()
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    def summary(self):
+        """
+        ตัวเลขหลักสำหรับแผงสถิติ
+
+        Returns:
+            dict: คำขอ API, credit, อัตราผิดพลาด, อัตรา hit ของแคช และ p50/p95 ของแต่ละขั้นตอน (วินาที)
+        """
+        requests_ok = self.total("serpapi_requests_total", outcome="ok")
+        requests_failed = self.total("serpapi_requests_total", outcome="error")
+        cache_hits = self.total("search_cache_requests_total", result="hit")
+        cache_lookups = self.total("search_cache_requests_total")
+        requests_total = requests_ok + requests_failed
+        return {
+            "api_requests": requests_total,
+            "api_errors": requests_failed,
+            "error_rate": requests_failed / requests_total if requests_total else 0.0,
+            "credits_used": self.total("serpapi_credits_used_total"),
+            "retries": self.total("serpapi_retries_total"),
+            "cache_hit_rate": cache_hits / cache_lookups if cache_lookups else 0.0,
+            "pages": self.total("search_pages_total"),
+            "results": self.total("search_results_total"),
+            "latency": {
+                name: (self.percentile(name, 0.50), self.percentile(name, 0.95))
+                for name in ("serpapi_request_seconds", "search_page_seconds", "extract_seconds", "export_seconds")
+            },
+        }
+
+    def render_prometheus(self):
+        """
+        metric ทั้งหมดในรูปแบบข้อความของ Prometheus (text exposition format 0.0.4)
+
+        Returns:
+            str: ข้อความสำหรับ endpoint /metrics หรือไฟล์ .prom
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                ((key, (h.buckets, list(h.bucket_counts), h.count, h.sum)) for key, h in self._histograms.items()),
+                key=lambda item: item[0],
+            )
+
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {self.prefix}{name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {self.prefix}{name} {kind}")
+
+        for (name, key), value in counters:
+            describe(name, "counter")
+            lines.append(f"{self.prefix}{name}{_format_labels(key)} {value}")
+
+        for (name, key), (buckets, bucket_counts, count, total) in histograms:
+            describe(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.prefix}{name}_bucket{_format_labels(key, [('le', f'{bound:g}')])} {cumulative}")
+            lines.append(f"{self.prefix}{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.prefix}{name}_sum{_format_labels(key)} {total:.6f}")
+            lines.append(f"{self.prefix}{name}_count{_format_labels(key)} {count}")
+
+        lines.append(f"# TYPE {self.prefix}process_start_time_seconds gauge")
+        lines.append(f"{self.prefix}process_start_time_seconds {self.started_at:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        """
+        เขียน metric ลงไฟล์แบบ atomic (เขียนไฟล์ชั่วคราวแล้วเปลี่ยนชื่อ) สำหรับ textfile collector
+
+        Args:
+            path (str): path ของไฟล์ (.prom)
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            handle.write(self.render_prometheus())
+        os.replace(temporary, path)
+
+    def reset(self):
+        """ล้างค่าทั้งหมด"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+
+REGISTRY = MetricsRegistry()
+
+# ฟังก์ชันลัดสำหรับ registry หลักของ process
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    server_version = "gg-lead-metrics/1.0"
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.server.registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0", registry=REGISTRY):
+    """
+    เปิด endpoint /metrics สำหรับ Prometheus ใน background thread
+
+    Args:
+        port (int): port (0 คือให้ระบบเลือกให้)
+        host (str): host ที่ bind
+        registry (MetricsRegistry): ที่เก็บ metric
+
+    Returns:
+        ThreadingHTTPServer: เซิร์ฟเวอร์ (ดู URL ได้จาก server.url)
+    """
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    server.url = f"http://{host}:{server.server_address[1]}/metrics"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info("เปิด endpoint metrics ที่ %s", server.url)
+    return server
@@ -0,0 +1,276 @@
+"""
+ปรับเบอร์โทรและที่อยู่ของธุรกิจไทยให้อยู่ในรูปแบบมาตรฐาน
+
+- เบอร์โทร: แปลงเป็น E.164 (เช่น "02-123-4567" และ "+66 2 123 4567" -> "+6621234567")
+  ทำทั้งคอลัมน์ด้วย pandas string method ครั้งเดียว
+- ที่อยู่: แยกเป็นตำบล/แขวง อำเภอ/เขต จังหวัด และรหัสไปรษณีย์ โดยเทียบกับตารางจังหวัด/อำเภอ
+  ผ่านดัชนีที่สร้างไว้ล่วงหน้า (AddressIndex) และแยกแต่ละที่อยู่ที่ไม่ซ้ำกันเพียงครั้งเดียว
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# คอลัมน์ที่เพิ่มในตารางผลลัพธ์
+PHONE_E164_COLUMN = "เบอร์โทร E.164"
+SUBDISTRICT_COLUMN = "ตำบล/แขวง"
+DISTRICT_COLUMN = "อำเภอ/เขต"
+PROVINCE_COLUMN = "จังหวัดตามที่อยู่"
+POSTCODE_COLUMN = "รหัสไปรษณีย์"
+NORMALIZED_COLUMNS = (PHONE_E164_COLUMN, SUBDISTRICT_COLUMN, DISTRICT_COLUMN, PROVINCE_COLUMN, POSTCODE_COLUMN)
+
+COUNTRY_CODE = "66"
+
+# เลขไทย -> เลขอารบิก
+THAI_DIGITS = str.maketrans("๐๑๒๓๔๕๖๗๘๙", "0123456789")
+
+# ตัวคั่นระหว่างเบอร์หลายเบอร์หรือเบอร์ต่อ (ใช้เฉพาะเบอร์แรก)
+PHONE_SEPARATOR = r"\s*(?:,|;|/|\bor\b|หรือ|ต่อ|ext\.?|\bx(?=\s*\d)|#)"
+_PHONE_SEPARATOR = re.compile(PHONE_SEPARATOR, re.IGNORECASE)
+_NON_DIGIT = re.compile(r"\D+")
+
+# รหัสประเทศ (+66 / 0066 / 66) และเลข 0 นำหน้า (รวม "+66 (0)2...")
+COUNTRY_PREFIX = r"^(?:00)?66"
+TRUNK_PREFIX = r"^0"
+_COUNTRY_PREFIX = re.compile(COUNTRY_PREFIX)
+_TRUNK_PREFIX = re.compile(TRUNK_PREFIX)
+
+# หมายเลขในประเทศที่ไม่รวม 0 นำหน้า: โทรศัพท์พื้นฐาน 8 หลัก (02-05, 07) และมือถือ 9 หลัก (06, 08, 09)
+NATIONAL_NUMBER = r"^(?:[2-57]\d{7}|[689]\d{8})$"
+_NATIONAL_NUMBER = re.compile(NATIONAL_NUMBER)
+
+# คำนำหน้าของแต่ละส่วนในที่อยู่ (เรียงจากยาวไปสั้นเพื่อให้ "จังหวัด" ถูกตัดก่อน "จ.")
+SUBDISTRICT_PREFIXES = ("ตำบล", "แขวง", "ต.")
+DISTRICT_PREFIXES = ("อำเภอ", "เขต", "อ.")
+PROVINCE_PREFIXES = ("จังหวัด", "จ.")
+
+_TOKEN_SEPARATOR = re.compile(r"[\s,]+")
+_POSTCODE = re.compile(r"^[1-9]\d{4}$")
+
+# ชื่อเรียกอื่นของจังหวัด
+PROVINCE_ALIASES = {
+    "กรุงเทพ": "กรุงเทพมหานคร",
+    "กรุงเทพฯ": "กรุงเทพมหานคร",
+    "กทม": "กรุงเทพมหานคร",
+    "กทม.": "กรุงเทพมหานคร",
+    "อยุธยา": "พระนครศรีอยุธยา",
+    "โคราช": "นครราชสีมา",
+}
+
+# เลขสองหลักแรกของรหัสไปรษณีย์ -> จังหวัด (ใช้เมื่อที่อยู่ไม่ได้ระบุชื่อจังหวัด เช่น ที่อยู่ภาษาอังกฤษ)
+POSTCODE_PROVINCES = {
+    "11": "นนทบุรี", "12": "ปทุมธานี", "13": "พระนครศรีอยุธยา", "14": "อ่างทอง",
+    "15": "ลพบุรี", "16": "สิงห์บุรี", "17": "ชัยนาท", "18": "สระบุรี",
+    "20": "ชลบุรี", "21": "ระยอง", "22": "จันทบุรี", "23": "ตราด", "24": "ฉะเชิงเทรา",
+    "25": "ปราจีนบุรี", "26": "นครนายก", "27": "สระแก้ว",
+    "30": "นครราชสีมา", "31": "บุรีรัมย์", "32": "สุรินทร์", "33": "ศรีสะเกษ", "34": "อุบลราชธานี",
+    "35": "ยโสธร", "36": "ชัยภูมิ", "37": "อำนาจเจริญ", "38": "บึงกาฬ", "39": "หนองบัวลำภู",
+    "40": "ขอนแก่น", "41": "อุดรธานี", "42": "เลย", "43": "หนองคาย", "44": "มหาสารคาม",
+    "45": "ร้อยเอ็ด", "46": "กาฬสินธุ์", "47": "สกลนคร", "48": "นครพนม", "49": "มุกดาหาร",
+    "50": "เชียงใหม่", "51": "ลำพูน", "52": "ลำปาง", "53": "อุตรดิตถ์", "54": "แพร่",
+    "55": "น่าน", "56": "พะเยา", "57": "เชียงราย", "58": "แม่ฮ่องสอน",
+    "60": "นครสวรรค์", "61": "อุทัยธานี", "62": "กำแพงเพชร", "63": "ตาก", "64": "สุโขทัย",
+    "65": "พิษณุโลก", "66": "พิจิตร", "67": "เพชรบูรณ์",
+    "70": "ราชบุรี", "71": "กาญจนบุรี", "72": "สุพรรณบุรี", "73": "นครปฐม", "74": "สมุทรสาคร",
+    "75": "สมุทรสงคราม", "76": "เพชรบุรี", "77": "ประจวบคีรีขันธ์",
+    "80": "นครศรีธรรมราช", "81": "กระบี่", "82": "พังงา", "83": "ภูเก็ต", "84": "สุราษฎร์ธานี",
+    "85": "ระนอง", "86": "ชุมพร",
+    "90": "สงขลา", "91": "สตูล", "92": "ตรัง", "93": "พัทลุง", "94": "ปัตตานี",
+    "95": "ยะลา", "96": "นราธิวาส",
+}
+
+# รหัสไปรษณีย์ 10xxx ส่วนใหญ่เป็นกรุงเทพฯ ยกเว้นของสมุทรปราการเหล่านี้
+SAMUT_PRAKAN_POSTCODES = frozenset({"10130", "10270", "10280", "10290", "10540", "10550", "10560", "10570"})
+
+
+def to_e164(phone):
+    """
+    แปลงเบอร์โทรหนึ่งเบอร์เป็น E.164
+
+    Args:
+        phone (str): เบอร์โทรตามที่ได้รับ (ถ้ามีหลายเบอร์หรือเบอร์ต่อ ใช้เฉพาะเบอร์แรก)
+
+    Returns:
+        str: เบอร์โทรแบบ E.164 เช่น "+6621234567" หรือ None หากไม่ใช่เบอร์ไทยที่ถูกต้อง
+    """
+    if phone is None or phone is pd.NA or phone != phone:
+        return None
+    text = _PHONE_SEPARATOR.split(str(phone).translate(THAI_DIGITS), maxsplit=1)[0]
+    digits = _TRUNK_PREFIX.sub("", _COUNTRY_PREFIX.sub("", _NON_DIGIT.sub("", text)))
+    return f"+{COUNTRY_CODE}{digits}" if _NATIONAL_NUMBER.match(digits) else None
+
+
+def phones_to_e164(phones):
+    """
+    แปลงเบอร์โทรทั้งคอลัมน์เป็น E.164 ด้วย string method ของ pandas (ไม่วนลูปใน Python)
+
+    Args:
+        phones (pd.Series): คอลัมน์เบอร์โทร
+
+    Returns:
+        pd.Series: เบอร์โทรแบบ E.164 (dtype string, ค่าที่แปลงไม่ได้เป็น <NA>)
+    """
+    text = phones.astype("string").str.translate(THAI_DIGITS)
+    digits = (
+        text.str.replace(PHONE_SEPARATOR + r".*$", "", regex=True, flags=re.IGNORECASE)
+        .str.replace(r"\D+", "", regex=True)
+        .str.replace(COUNTRY_PREFIX, "", regex=True)
+        .str.replace(TRUNK_PREFIX, "", regex=True)
+    )
+    valid = digits.str.match(NATIONAL_NUMBER).fillna(False).astype(bool)
+    return ("+" + COUNTRY_CODE + digits).where(valid, pd.NA).astype("string")
+
+
+def _strip_prefix(token, prefixes):
+    for prefix in prefixes:
+        if token.startswith(prefix) and len(token) > len(prefix):
+            return token[len(prefix):]
+    return None
+
+
+class AddressIndex:
+    """
+    ดัชนีสำหรับแยกที่อยู่ไทย สร้างครั้งเดียวจากตารางจังหวัด/อำเภอ
+
+    ค้นชื่อจังหวัด ชื่อเรียกอื่น และชื่ออำเภอด้วย dict (O(1) ต่อคำ)
+    และจำผลของที่อยู่ที่เคยแยกแล้ว
+    """
+
+    def __init__(self, provinces_districts=None, cache_size=100000):
+        self.provinces = {}
+        self.districts = {}
+        self.district_provinces = {}
+        self.cache_size = cache_size
+        self._cache = {}
+
+        for province, districts in (provinces_districts or {}).items():
+            self.provinces[province] = province
+            names = self.districts.setdefault(province, {})
+            for district in districts:
+                names[district] = district
+                self.district_provinces.setdefault(district, set()).add(province)
+        for province in POSTCODE_PROVINCES.values():
+            self.provinces.setdefault(province, province)
+        for alias, province in PROVINCE_ALIASES.items():
+            self.provinces[alias] = province
+
+    def province_for_postcode(self, postcode):
+        """จังหวัดจากรหัสไปรษณีย์ (None หากไม่รู้จัก)"""
+        if postcode is None:
+            return None
+        if postcode.startswith("10"):
+            return "สมุทรปราการ" if postcode in SAMUT_PRAKAN_POSTCODES else "กรุงเทพมหานคร"
+        return POSTCODE_PROVINCES.get(postcode[:2])
+
+    def _district(self, province, name):
+        names = self.districts.get(province, {})
+        if name in names:
+            return names[name]
+        # "อ.เมือง จ.เชียงใหม่" -> "เมืองเชียงใหม่"
+        if name == "เมือง" and f"เมือง{province}" in names:
+            return names[f"เมือง{province}"]
+        return None
+
+    def parse(self, address):
+        """
+        แยกที่อยู่หนึ่งรายการ
+
+        Args:
+            address (str): ที่อยู่ตามที่ได้รับจาก SerpApi
+
+        Returns:
+            tuple: (ตำบล/แขวง, อำเภอ/เขต, จังหวัด, รหัสไปรษณีย์) ส่วนที่หาไม่พบเป็น None
+        """
+        if address is None or address is pd.NA or address != address:
+            return (None, None, None, None)
+        cached = self._cache.get(address)
+        if cached is not None:
+            return cached
+
+        subdistrict = district = marked_province = named_province = postcode = None
+        bare_districts = []
+        for token in _TOKEN_SEPARATOR.split(str(address).translate(THAI_DIGITS)):
+            if not token:
+                continue
+            if _POSTCODE.match(token):
+                postcode = token
+                continue
+            value = _strip_prefix(token, PROVINCE_PREFIXES)
+            if value is not None:
+                marked_province = self.provinces.get(value, value)
+                continue
+            value = _strip_prefix(token, DISTRICT_PREFIXES)
+            if value is not None:
+                district = value
+                continue
+            value = _strip_prefix(token, SUBDISTRICT_PREFIXES)
+            if value is not None:
+                subdistrict = value
+                continue
+            if token in self.provinces:
+                named_province = self.provinces[token]
+            elif token in self.district_provinces:
+                bare_districts.append(token)
+
+        province = marked_province or named_province
+        if province is None and district is not None:
+            candidates = self.district_provinces.get(district, ())
+            if len(candidates) == 1:
+                province = next(iter(candidates))
+        if province is None:
+            province = self.province_for_postcode(postcode)
+
+        if province is not None:
+            if district is not None:
+                district = self._district(province, district) or district
+            else:
+                matches = (self._district(province, name) for name in bare_districts)
+                district = next((name for name in matches if name), None)
+
+        parsed = (subdistrict, district, province, postcode)
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[address] = parsed
+        return parsed
+
+    def parse_series(self, addresses):
+        """
+        แยกที่อยู่ทั้งคอลัมน์ โดยแยกเฉพาะค่าที่ไม่ซ้ำกัน (pd.factorize) แล้วกระจายผลกลับตามรหัส
+
+        Args:
+            addresses (pd.Series): คอลัมน์ที่อยู่
+
+        Returns:
+            pd.DataFrame: คอลัมน์ตำบล/แขวง อำเภอ/เขต จังหวัด และรหัสไปรษณีย์ (dtype string)
+        """
+        codes, uniques = pd.factorize(addresses)
+        # แถวสุดท้ายสำหรับที่อยู่ว่าง (รหัส -1)
+        parsed = np.array([self.parse(address) for address in uniques] + [(None,) * 4], dtype=object)
+        rows = parsed[codes]
+        columns = (SUBDISTRICT_COLUMN, DISTRICT_COLUMN, PROVINCE_COLUMN, POSTCODE_COLUMN)
+        return pd.DataFrame(
+            {column: pd.array(rows[:, i], dtype="string") for i, column in enumerate(columns)},
+            index=addresses.index,
+        )
+
+
+def normalize_frame(df, address_index):
+    """
+    เพิ่มคอลัมน์เบอร์โทร E.164 และส่วนประกอบของที่อยู่ให้ตารางผลลัพธ์
+
+    Args:
+        df (pd.DataFrame): ตารางข้อมูลธุรกิจ
+        address_index (AddressIndex): ดัชนีที่อยู่
+
+    Returns:
+        pd.DataFrame: ตารางใหม่ที่มีคอลัมน์ตาม NORMALIZED_COLUMNS (ค่าเดิมถูกคำนวณใหม่)
+    """
+    # สำเนาแบบตื้น: ใช้ข้อมูลคอลัมน์เดิมร่วมกัน และเพิ่ม/แทนที่เฉพาะคอลัมน์ที่คำนวณใหม่
+    normalized = df.copy(deep=False)
+    if "เบอร์โทรศัพท์" in df.columns:
+        normalized[PHONE_E164_COLUMN] = phones_to_e164(df["เบอร์โทรศัพท์"])
+    if "ที่อยู่" in df.columns:
+        for column, values in address_index.parse_series(df["ที่อยู่"]).items():
+            normalized[column] = values
+    return normalized
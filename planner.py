@@ -0,0 +1,212 @@
+"""
+ประมาณการ credit ของ SerpApi และเวลาที่ใช้ก่อนเริ่มค้นหา และงบ credit ที่บังคับใช้ระหว่างค้นหา
+
+การประมาณการใช้รูปแบบการแบ่งหน้าเดียวกับ BusinessSearcher (ดึงหน้าแรกก่อน แล้วดึงหน้าที่เหลือพร้อมกัน ไม่เกิน MAX_PAGES)
+ตรวจหน้าที่อยู่ในแคชแล้ว (ไม่ใช้ credit) จำนวนธุรกิจที่พบจากการค้นหาครั้งก่อนในคลังรายชื่อ
+และเวลาต่อคำขอจริงจาก metrics ของ process นี้
+"""
+import math
+import os
+import threading
+
+from business_search import PAGE_SIZE, RATE_LIMIT_BURST, RATE_LIMIT_PER_SECOND
+from metrics import REGISTRY
+from sweep import SweepJob
+from transport import SerpApiError
+
+
+# งบ credit ต่อการค้นหาหนึ่งครั้ง (0 คือไม่จำกัด)
+SEARCH_CREDIT_BUDGET = int(os.getenv('SEARCH_CREDIT_BUDGET', '0'))
+
+# เวลาต่อคำขอ SerpApi ที่ใช้ประมาณการเมื่อยังไม่มีสถิติ (วินาที)
+DEFAULT_REQUEST_SECONDS = float(os.getenv('PLANNER_REQUEST_SECONDS', '3'))
+
+
+class BudgetExceeded(SerpApiError):
+    """ใช้ credit ครบงบของการค้นหาแล้ว (ลองใหม่ไม่ได้)"""
+
+    def __init__(self, limit):
+        super().__init__(f"ใช้ credit ครบงบ {limit} credit แล้ว", retryable=False)
+        self.limit = limit
+
+
+class CreditBudget:
+    """
+    งบ credit ของการค้นหาหนึ่งครั้ง ใช้ร่วมกันทุก thread ของการค้นหานั้น
+
+    จองหนึ่ง credit ก่อนเรียก SerpApi จริงแต่ละครั้ง (ผลลัพธ์จากแคชไม่ใช้ credit)
+    และคืนเมื่อเรียกไม่สำเร็จ หน้าที่ดึงพร้อมกันจึงใช้รวมกันไม่เกินงบ
+    """
+
+    def __init__(self, limit=SEARCH_CREDIT_BUDGET, spent=0):
+        self.limit = max(0, int(limit or 0))
+        self.spent = spent
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        จองหนึ่ง credit
+
+        Raises:
+            BudgetExceeded: เมื่อใช้ครบงบแล้ว
+        """
+        with self._lock:
+            if self.limit and self.spent >= self.limit:
+                raise BudgetExceeded(self.limit)
+            self.spent += 1
+
+    def refund(self):
+        """คืน credit ที่จองไว้ (คำขอไม่สำเร็จ)"""
+        with self._lock:
+            self.spent = max(0, self.spent - 1)
+
+    @property
+    def remaining(self):
+        """credit ที่เหลือ (None คือไม่จำกัด)"""
+        return max(0, self.limit - self.spent) if self.limit else None
+
+    @property
+    def exhausted(self):
+        return bool(self.limit) and self.spent >= self.limit
+
+
+class SearchPlan:
+    """
+    ประมาณการของการค้นหาหนึ่งครั้ง (หรือทุกงานในการค้นหาแบบกลุ่ม)
+    """
+
+    def __init__(self, searches=0, pages=0, cached_pages=0, expected_results=0, known_yields=0,
+                 seconds=0.0, quota_left=None):
+        self.searches = searches
+        self.pages = pages
+        self.cached_pages = cached_pages
+        self.expected_results = expected_results
+        # จำนวนการค้นหาที่ประมาณจำนวนธุรกิจจากผลลัพธ์ครั้งก่อน
+        self.known_yields = known_yields
+        self.seconds = seconds
+        # โควตาที่เหลือรวมทุก key (None คือยังไม่ทราบ)
+        self.quota_left = quota_left
+
+    @property
+    def credits(self):
+        """credit ที่จะใช้ (หน้าที่ไม่อยู่ในแคช)"""
+        return self.pages - self.cached_pages
+
+    def exceeds(self, budget):
+        """ประมาณการเกินงบ credit หรือไม่ (0 / None คือไม่จำกัด)"""
+        return bool(budget) and self.credits > budget
+
+    def __repr__(self):
+        return (f"SearchPlan(searches={self.searches}, pages={self.pages}, cached={self.cached_pages}, "
+                f"credits={self.credits}, seconds={self.seconds:.1f})")
+
+
+class CostPlanner:
+    """
+    ประมาณการจำนวนหน้า credit และเวลาของการค้นหาก่อนเริ่ม โดยไม่เรียก SerpApi
+    """
+
+    def __init__(self, searcher, lead_store=None, registry=REGISTRY):
+        self.searcher = searcher
+        self.lead_store = lead_store
+        self.registry = registry
+
+    def request_seconds(self):
+        """เวลาต่อคำขอ SerpApi (ค่ามัธยฐานจากคำขอล่าสุด หรือ DEFAULT_REQUEST_SECONDS)"""
+        return self.registry.percentile("serpapi_request_seconds", 0.50) or DEFAULT_REQUEST_SECONDS
+
+    def quota_left(self):
+        """โควตาที่เหลือรวมทุก key ที่ใช้งานได้ (None หากยังไม่ทราบโควตาของบาง key)"""
+        quotas = [row["quota_left"] for row in self.searcher.key_pool.usage()]
+        if any(quota is None for quota in quotas):
+            return None
+        return sum(quotas)
+
+    def _plan_pages(self, query, location, num_results, use_cache):
+        # หน้าที่จะดึง และจำนวนหน้า/ผลลัพธ์ที่อยู่ในแคชแล้ว
+        params = self.searcher.build_params(query, location, num_results)
+        offsets = self.searcher.plan_offsets(params, num_results, use_cache)
+        cached_pages = 0
+        cached_results = 0
+        cache = self.searcher.cache
+        if cache is not None and use_cache:
+            for start in offsets:
+                payload = cache.peek(self.searcher.page_params(params, start))
+                if payload is not None:
+                    cached_pages += 1
+                    cached_results += len(payload.get("local_results", []))
+        return len(offsets), cached_pages, cached_results
+
+    def _expected_results(self, job, num_results, pages, cached_pages, cached_results):
+        if pages and cached_pages == pages:
+            return min(num_results, cached_results), True
+        history = self.lead_store.last_result_count(job) if self.lead_store is not None else None
+        if history is not None:
+            return min(num_results, history), True
+        return min(num_results, pages * PAGE_SIZE), False
+
+    def _wall_seconds(self, credits, concurrency):
+        # คำขอพร้อมกันได้ไม่เกิน concurrency และอัตรารวมทุก key ไม่เกิน RATE_LIMIT_PER_SECOND ต่อ key
+        if not credits:
+            return 0.0
+        keys = len(self.searcher.key_pool)
+        latency = self.request_seconds()
+        waves = math.ceil(credits / max(1, concurrency)) * latency
+        throttled = max(0, credits - RATE_LIMIT_BURST * keys) / (RATE_LIMIT_PER_SECOND * keys) + latency
+        return max(waves, throttled)
+
+    def plan_search(self, query, location, num_results, use_cache=True, province=None, district=None):
+        """
+        ประมาณการการค้นหาครั้งเดียว
+
+        Args:
+            query (str): คำค้นหา
+            location (str): สถานที่ค้นหา
+            num_results (int): จำนวนผลลัพธ์ที่ต้องการ
+            use_cache (bool): ใช้ผลลัพธ์จากแคชหากมี
+            province, district (str): พื้นที่สำหรับอ่านจำนวนธุรกิจที่พบครั้งก่อนจากคลังรายชื่อ
+
+        Returns:
+            SearchPlan: ประมาณการ
+        """
+        pages, cached_pages, cached_results = self._plan_pages(query, location, num_results, use_cache)
+        job = SweepJob(query, province, district)
+        expected, known = self._expected_results(job, num_results, pages, cached_pages, cached_results)
+        credits = pages - cached_pages
+        return SearchPlan(
+            searches=1,
+            pages=pages,
+            cached_pages=cached_pages,
+            expected_results=expected,
+            known_yields=int(known),
+            # หน้าแรกดึงก่อนหนึ่งรอบ หน้าที่เหลือดึงพร้อมกันอีกรอบ
+            seconds=self._wall_seconds(credits, max(1, pages - 1)),
+            quota_left=self.quota_left(),
+        )
+
+    def plan_sweep(self, jobs, num_results, use_cache=True, max_workers=4):
+        """
+        ประมาณการการค้นหาแบบกลุ่ม (รวมทุกงาน)
+
+        Args:
+            jobs (list): รายการ SweepJob
+            num_results (int): จำนวนผลลัพธ์ต่องาน
+            use_cache (bool): ใช้ผลลัพธ์จากแคชหากมี
+            max_workers (int): จำนวนงานที่รันพร้อมกัน
+
+        Returns:
+            SearchPlan: ประมาณการ
+        """
+        plan = SearchPlan(searches=len(jobs), quota_left=self.quota_left())
+        for job in jobs:
+            pages, cached_pages, cached_results = self._plan_pages(
+                job.business_type, job.location, num_results, use_cache
+            )
+            expected, known = self._expected_results(job, num_results, pages, cached_pages, cached_results)
+            plan.pages += pages
+            plan.cached_pages += cached_pages
+            plan.expected_results += expected
+            plan.known_yields += known
+        concurrency = max(1, int(max_workers)) * max(1, self.searcher.page_count(num_results) - 1)
+        plan.seconds = self._wall_seconds(plan.credits, concurrency)
+        return plan
@@ -0,0 +1,64 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    ตัวจำกัดอัตราการเรียก API แบบ token bucket (ใช้งานร่วมกันหลาย thread ได้)
+
+    เติม token ด้วยอัตรา rate ต่อวินาที และเก็บสะสมได้สูงสุด capacity token
+    ทำให้ยิงคำขอพร้อมกันได้เป็นช่วงสั้น ๆ โดยไม่เกินอัตราเฉลี่ยที่กำหนด
+    """
+
+    def __init__(self, rate=5.0, capacity=5):
+        if rate <= 0:
+            raise ValueError("rate ต้องมากกว่า 0")
+        self.rate = float(rate)
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """
+        ขอ token โดยไม่รอ
+
+        Args:
+            tokens (int): จำนวน token ที่ต้องการ
+
+        Returns:
+            bool: True หากได้รับ token
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """
+        ขอ token และรอจนกว่าจะมี token เพียงพอ
+
+        Args:
+            tokens (int): จำนวน token ที่ต้องการ
+
+        Returns:
+            float: เวลาที่ต้องรอทั้งหมด (วินาที)
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait)
+            waited += wait
@@ -0,0 +1,41 @@
+import json
+import os
+
+
+# ไฟล์ข้อมูลอ้างอิง (จังหวัด/อำเภอ และประเภทธุรกิจ) ที่มากับโปรเจกต์
+REFERENCE_DATA_PATH = os.getenv(
+    'REFERENCE_DATA_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "reference.json"),
+)
+
+
+class ReferenceData:
+    """
+    ข้อมูลอ้างอิงที่ไม่เปลี่ยนระหว่างการทำงาน โหลดครั้งเดียวแล้วใช้ร่วมกันทุก session
+
+    ผู้ใช้ต้องไม่แก้ไข list/dict ที่ได้จาก object นี้
+    """
+
+    def __init__(self, provinces_districts, business_types):
+        self.provinces_districts = provinces_districts
+        self.business_types = business_types
+        self.provinces = list(provinces_districts)
+
+    def districts(self, province):
+        """อำเภอของจังหวัด (list ว่างหากไม่รู้จักจังหวัด)"""
+        return self.provinces_districts.get(province, [])
+
+
+def load_reference_data(path=REFERENCE_DATA_PATH):
+    """
+    โหลดข้อมูลอ้างอิงจากไฟล์ JSON
+
+    Args:
+        path (str): path ของไฟล์ข้อมูล
+
+    Returns:
+        ReferenceData: ข้อมูลจังหวัด/อำเภอ และประเภทธุรกิจ
+    """
+    with open(path, encoding="utf-8") as handle:
+        data = json.load(handle)
+    return ReferenceData(data["provinces_districts"], data["business_types"])
@@ -0,0 +1,200 @@
+import logging
+import random
+import threading
+import time
+
+import metrics
+from transport import SerpApiError
+
+
+logger = logging.getLogger(__name__)
+
+# HTTP status ที่เกิดจากปลายทางชั่วคราว ลองใหม่แล้วมีโอกาสสำเร็จ
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(SerpApiError):
+    """ปฏิเสธคำขอทันทีเพราะ SerpApi ล้มเหลวต่อเนื่อง (circuit breaker เปิดอยู่)"""
+
+    def __init__(self, retry_in):
+        super().__init__(f"SerpApi ไม่พร้อมใช้งานชั่วคราว ลองใหม่ได้ในอีก {retry_in:.0f} วินาที")
+        self.retry_in = retry_in
+
+
+def is_retryable(error):
+    """
+    ข้อผิดพลาดนี้ควรลองใหม่หรือไม่
+
+    ข้อผิดพลาดจากการเชื่อมต่อ (ไม่มี status), 429 และ 5xx ลองใหม่ได้
+    ส่วน 4xx อื่น ๆ เช่น API key ไม่ถูกต้อง ลองใหม่ก็ไม่สำเร็จ
+
+    Args:
+        error (Exception): ข้อผิดพลาดที่เกิดขึ้น
+
+    Returns:
+        bool: True หากควรลองใหม่
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, SerpApiError):
+        if error.retryable is not None:
+            return error.retryable
+        return error.status is None or error.status in RETRYABLE_STATUSES
+    return False
+
+
+class RetryPolicy:
+    """
+    นโยบายลองใหม่แบบ exponential backoff พร้อม full jitter
+
+    เวลารอครั้งที่ n สุ่มระหว่าง 0 ถึง min(max_delay, base_delay * 2^n)
+    เพื่อไม่ให้หลาย worker ลองใหม่พร้อมกันเป็นระลอก
+    และไม่รอน้อยกว่าค่า Retry-After ที่ SerpApi แจ้งมา
+    """
+
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=8.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt, error=None):
+        """
+        เวลาที่ต้องรอก่อนลองครั้งถัดไป
+
+        Args:
+            attempt (int): ลำดับครั้งที่เพิ่งล้มเหลว (เริ่มที่ 1)
+            error (Exception): ข้อผิดพลาดที่เกิดขึ้น
+
+        Returns:
+            float: เวลารอ (วินาที)
+        """
+        if getattr(error, "rotate_key", False):
+            # เปลี่ยนไปใช้ key อื่นได้ทันที
+            return 0.0
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def call(self, func, *args, **kwargs):
+        """
+        เรียกฟังก์ชันและลองใหม่เมื่อเกิดข้อผิดพลาดที่ลองใหม่ได้
+
+        Returns:
+            ผลลัพธ์ของ func
+
+        Raises:
+            Exception: ข้อผิดพลาดล่าสุด เมื่อลองครบแล้วหรือข้อผิดพลาดลองใหม่ไม่ได้
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_attempts or not is_retryable(e):
+                    raise
+                delay = self.backoff(attempt, e)
+                metrics.inc("serpapi_retries_total")
+                logger.info("เรียก SerpApi ไม่สำเร็จ (ครั้งที่ %d): %s ลองใหม่ใน %.2f วินาที",
+                            attempt, e, delay)
+                time.sleep(delay)
+
+
+class CircuitBreaker:
+    """
+    ตัดวงจรเมื่อ SerpApi ล้มเหลวต่อเนื่อง (ใช้งานร่วมกันหลาย thread ได้)
+
+    - closed: ส่งคำขอตามปกติ นับความล้มเหลวที่เกิดติดกัน
+    - open: ล้มเหลวติดกันครบ failure_threshold ครั้ง ปฏิเสธทุกคำขอทันทีเป็นเวลา reset_timeout วินาที
+    - half-open: ครบเวลาแล้ว ยอมให้คำขอทดลองผ่านไปหนึ่งคำขอ
+      หากสำเร็จจะกลับเป็น closed หากล้มเหลวจะเปิดวงจรอีกครั้ง
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return self.CLOSED
+        if now - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self):
+        """
+        ตรวจสอบก่อนส่งคำขอ
+
+        Raises:
+            CircuitOpenError: เมื่อวงจรเปิดอยู่ หรือมีคำขอทดลองกำลังทำงานอยู่แล้ว
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(now)
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            retry_in = max(0.0, self.reset_timeout - (now - self._opened_at))
+            metrics.inc("circuit_breaker_rejections_total")
+            raise CircuitOpenError(retry_in)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("SerpApi ล้มเหลวติดกัน %d ครั้ง หยุดเรียกชั่วคราว %.0f วินาที",
+                                   self._failures, self.reset_timeout)
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def record_neutral(self):
+        """คำขอจบโดยไม่บอกสถานะของ SerpApi (ไม่นับความล้มเหลว และปล่อยสิทธิ์คำขอทดลอง)"""
+        with self._lock:
+            self._probing = False
+
+    def call(self, func, *args, **kwargs):
+        """
+        เรียกฟังก์ชันผ่าน circuit breaker
+
+        นับเฉพาะความล้มเหลวที่ลองใหม่ได้ (ปลายทางมีปัญหา)
+        ข้อผิดพลาดจากคำขอเอง เช่น API key ไม่ถูกต้อง ไม่ทำให้วงจรเปิด
+        และข้อผิดพลาดที่ไม่ได้มาจาก SerpApi (upstream เป็น False) เช่น key หนึ่งโดนจำกัดขณะที่ยังมี
+        key อื่นใช้ได้ หรือทุก key กำลังพักโดยไม่ได้ส่งคำขอ ไม่นับเป็นความล้มเหลว
+        """
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if not getattr(e, "upstream", True):
+                self.record_neutral()
+            elif is_retryable(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
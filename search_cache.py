@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# พารามิเตอร์ที่ไม่มีผลต่อผลลัพธ์ จึงไม่นำมาคิดเป็น cache key
+IGNORED_PARAMS = ("api_key",)
+
+
+def make_cache_key(params):
+    """
+    สร้าง cache key จากพารามิเตอร์ของคำขอ (content-addressed)
+
+    Args:
+        params (dict): พารามิเตอร์ที่ส่งไปยัง SerpApi
+
+    Returns:
+        str: ค่า SHA-256 ของพารามิเตอร์ที่ normalize แล้ว
+    """
+    normalized = {
+        str(key): str(value).strip()
+        for key, value in params.items()
+        if key not in IGNORED_PARAMS and value is not None
+    }
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """
+    แคชผลลัพธ์ SerpApi บนดิสก์ (SQLite) พร้อม TTL และการลบแบบ LRU
+    """
+
+    def __init__(self, path="search_cache.sqlite3", ttl_seconds=86400, max_entries=1000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                params TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, params):
+        """
+        อ่านผลลัพธ์จากแคช
+
+        Args:
+            params (dict): พารามิเตอร์ของคำขอ
+
+        Returns:
+            dict: ผลลัพธ์ที่เคยบันทึกไว้ หรือ None หากไม่มี/หมดอายุ
+        """
+        key = make_cache_key(params)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            payload, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(payload)
+
+    def peek(self, params):
+        """
+        อ่านผลลัพธ์จากแคชโดยไม่นับเป็น hit/miss และไม่เปลี่ยนลำดับ LRU (ใช้ประมาณการก่อนค้นหา)
+
+        Returns:
+            dict: ผลลัพธ์ที่ยังไม่หมดอายุ หรือ None หากไม่มี
+        """
+        key = make_cache_key(params)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (self.ttl_seconds and time.time() - row[1] > self.ttl_seconds):
+            return None
+        return json.loads(row[0])
+
+    def set(self, params, payload):
+        """
+        บันทึกผลลัพธ์ลงแคช และลบรายการที่ใช้งานน้อยที่สุดเมื่อเกินขนาดที่กำหนด
+
+        Args:
+            params (dict): พารามิเตอร์ของคำขอ
+            payload (dict): ผลลัพธ์จาก SerpApi
+        """
+        key = make_cache_key(params)
+        now = time.time()
+        stored_params = {k: v for k, v in params.items() if k not in IGNORED_PARAMS}
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, params, payload, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    key,
+                    json.dumps(stored_params, ensure_ascii=False),
+                    json.dumps(payload, ensure_ascii=False),
+                    now,
+                    now,
+                ),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # ลบรายการที่หมดอายุก่อน แล้วจึงตัดรายการที่ไม่ได้ใช้นานที่สุดออก
+        if self.ttl_seconds:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+
+        if self.max_entries:
+            self._conn.execute(
+                """
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses
+                    ORDER BY accessed_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        """ลบข้อมูลทั้งหมดในแคช"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        """
+        สถิติการใช้งานแคช
+
+        Returns:
+            dict: จำนวน hit, miss, อัตรา hit และจำนวนรายการในแคช
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+        }
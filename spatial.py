@@ -0,0 +1,110 @@
+"""
+ค้นหาตามพื้นที่ (รัศมี / กรอบสี่เหลี่ยม) และรวมจุดเป็นกลุ่มสำหรับแสดงบนแผนที่
+
+พิกัดของธุรกิจถูกเก็บเป็นตัวเลขพร้อม geohash ที่มี index (ดู lead_store.py)
+การค้นหาจึงคัดพื้นที่ด้วย prefix ของ geohash ก่อน แล้วตรวจกรอบและระยะทางจริงเฉพาะจุดที่เหลือ
+แผนที่รวมจุดในช่อง geohash เดียวกันเป็นกลุ่มเดียวฝั่งเซิร์ฟเวอร์ เบราว์เซอร์จึงได้รับเพียงไม่กี่พันกลุ่ม
+ไม่ว่าจะมีธุรกิจกี่หมื่นแห่ง
+"""
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from geohash import DEFAULT_PRECISION, cell_size, encode_many
+
+
+# จำนวนกลุ่มสูงสุดที่ส่งไปแสดงบนแผนที่
+MAP_MAX_CLUSTERS = int(os.getenv('MAP_MAX_CLUSTERS', '2000'))
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+CLUSTER_COLUMNS = ["lat", "lng", "count"]
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    ระยะทางบนผิวโลกระหว่างสองพิกัด (ใช้กับตัวเลขเดี่ยวหรือ numpy array ก็ได้)
+
+    Returns:
+        float หรือ np.ndarray: ระยะทาง (กิโลเมตร)
+    """
+    lat1, lng1, lat2, lng2 = (np.radians(value) for value in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    กรอบสี่เหลี่ยมที่ครอบวงกลมรัศมีที่กำหนด
+
+    Returns:
+        tuple: (south, west, north, east)
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    # ใกล้ขั้วโลกหนึ่งองศาลองจิจูดสั้นลงจนเป็นศูนย์ จึงใช้ทั้งช่วง
+    cos_lat = math.cos(math.radians(lat))
+    lng_delta = 180.0 if cos_lat < 1e-6 else min(180.0, lat_delta / cos_lat)
+    return (max(-90.0, lat - lat_delta), max(-180.0, lng - lng_delta),
+            min(90.0, lat + lat_delta), min(180.0, lng + lng_delta))
+
+
+def cluster_precision(south, west, north, east, max_clusters=MAP_MAX_CLUSTERS):
+    """
+    ความละเอียด geohash สูงสุดที่จำนวนช่องในกรอบพื้นที่ไม่เกิน max_clusters
+
+    Returns:
+        int: จำนวนตัวอักษรของ geohash (1 ถึง DEFAULT_PRECISION)
+    """
+    for precision in range(DEFAULT_PRECISION, 1, -1):
+        height, width = cell_size(precision)
+        cells = (math.floor(north / height) - math.floor(south / height) + 1) * \
+                (math.floor(east / width) - math.floor(west / width) + 1)
+        if cells <= max_clusters:
+            return precision
+    return 1
+
+
+def cluster_points(lats, lngs, max_clusters=MAP_MAX_CLUSTERS):
+    """
+    รวมจุดที่อยู่ในช่อง geohash เดียวกันเป็นกลุ่มเดียว (ตำแหน่งกลุ่มคือค่าเฉลี่ยของจุดในกลุ่ม)
+
+    Args:
+        lats, lngs (array-like): ละติจูดและลองจิจูด (จุดที่ไม่มีพิกัดถูกข้าม)
+        max_clusters (int): จำนวนกลุ่มสูงสุดโดยประมาณ (ใช้เลือกความละเอียด)
+
+    Returns:
+        tuple: (ตารางกลุ่ม lat / lng / count, ความละเอียด geohash ที่ใช้)
+    """
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    valid = ~(np.isnan(lats) | np.isnan(lngs))
+    lats, lngs = lats[valid], lngs[valid]
+    if not len(lats):
+        return pd.DataFrame(columns=CLUSTER_COLUMNS), None
+
+    precision = cluster_precision(lats.min(), lngs.min(), lats.max(), lngs.max(), max_clusters)
+    points = pd.DataFrame({"cell": encode_many(lats, lngs, precision), "lat": lats, "lng": lngs})
+    clusters = points.groupby("cell", sort=False).agg(
+        lat=("lat", "mean"), lng=("lng", "mean"), count=("lat", "size")
+    )
+    return clusters.reset_index(drop=True)[CLUSTER_COLUMNS], precision
+
+
+def marker_sizes(counts, precision):
+    """
+    รัศมีของจุดบนแผนที่ (เมตร) ตามจำนวนธุรกิจในกลุ่ม
+
+    กลุ่มที่ใหญ่ที่สุดกว้างประมาณครึ่งช่อง geohash และพื้นที่ของจุดแปรตามจำนวน
+
+    Returns:
+        np.ndarray: รัศมีของแต่ละกลุ่ม (เมตร)
+    """
+    counts = np.asarray(counts, dtype=float)
+    if not len(counts):
+        return counts
+    height, _ = cell_size(precision)
+    largest = height * KM_PER_DEGREE * 1000 / 2
+    return np.maximum(largest * np.sqrt(counts / counts.max()), largest / 10)
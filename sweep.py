@@ -0,0 +1,242 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dedup import DedupIndex
+from extraction import FrameBuffer
+from resilience import is_retryable
+
+
+logger = logging.getLogger(__name__)
+
+
+class SweepJob:
+    """
+    งานค้นหาหนึ่งรายการในโหมดค้นหาแบบกลุ่ม (ประเภทธุรกิจ × พื้นที่)
+    """
+
+    def __init__(self, business_type, province, district=None):
+        self.business_type = business_type
+        self.province = province
+        self.district = district
+
+    @property
+    def location(self):
+        """ข้อความสถานที่สำหรับใช้ค้นหา"""
+        if self.district:
+            return f"{self.district}, {self.province}"
+        return self.province
+
+    @property
+    def key(self):
+        """คีย์ที่ไม่ซ้ำกันของงาน"""
+        return (self.business_type, self.province, self.district)
+
+    def __repr__(self):
+        return f"SweepJob({self.business_type!r}, {self.location!r})"
+
+
+def expand_jobs(business_types, locations):
+    """
+    แตกทุกชุดของประเภทธุรกิจ × พื้นที่ ออกเป็นคิวงาน (ตัดงานที่ซ้ำออก)
+
+    Args:
+        business_types (list): รายการประเภทธุรกิจ
+        locations (list): รายการ (จังหวัด, อำเภอ) โดยอำเภอเป็น None หมายถึงทั้งจังหวัด
+
+    Returns:
+        list: รายการ SweepJob
+    """
+    jobs = []
+    seen = set()
+
+    for business_type in business_types:
+        for province, district in locations:
+            job = SweepJob(business_type, province, district)
+            if job.key in seen:
+                continue
+            seen.add(job.key)
+            jobs.append(job)
+
+    return jobs
+
+
+def build_locations(provinces, provinces_districts, districts=None, split_districts=False):
+    """
+    สร้างรายการพื้นที่จากจังหวัดและอำเภอที่เลือก
+
+    Args:
+        provinces (list): จังหวัดที่เลือก
+        provinces_districts (dict): ข้อมูลอำเภอของแต่ละจังหวัด
+        districts (list): อำเภอที่เลือก (ใช้เฉพาะอำเภอที่อยู่ในจังหวัดที่เลือก)
+        split_districts (bool): แยกค้นหาทุกอำเภอของจังหวัดที่ไม่ได้เลือกอำเภอไว้
+
+    Returns:
+        list: รายการ (จังหวัด, อำเภอ)
+    """
+    selected = set(districts or [])
+    locations = []
+
+    for province in provinces:
+        province_districts = provinces_districts.get(province, [])
+        chosen = [d for d in province_districts if d in selected]
+
+        if chosen:
+            locations.extend((province, district) for district in dict.fromkeys(chosen))
+        elif split_districts and province_districts:
+            locations.extend((province, district) for district in dict.fromkeys(province_districts))
+        else:
+            locations.append((province, None))
+
+    return locations
+
+
+class SweepResult:
+    """
+    ผลลัพธ์ของงานค้นหาหนึ่งรายการ
+    """
+
+    def __init__(self, job, businesses, error=None, attempts=1):
+        self.job = job
+        # ตารางข้อมูลธุรกิจ (pd.DataFrame)
+        self.businesses = businesses
+        self.error = error
+        self.attempts = attempts
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def partial(self):
+        """งานล้มเหลวระหว่างทาง แต่ได้ผลลัพธ์บางส่วนแล้ว"""
+        return self.error is not None and not self.businesses.empty
+
+
+class SweepRunner:
+    """
+    รันคิวงานค้นหาผ่าน worker pool ที่จำกัดจำนวน พร้อมลองใหม่เมื่อเกิดข้อผิดพลาด
+
+    อัตราการเรียก API ต่อ key ถูกควบคุมโดย rate limiter ของ BusinessSearcher
+    ธุรกิจที่พบซ้ำระหว่างงานจะถูกตัดออกด้วย DedupIndex ที่ใช้ร่วมกันทุกงาน
+    งานที่ล้มเหลวระหว่างทางยังคืนผลลัพธ์เท่าที่ได้ (SweepResult.partial)
+    """
+
+    def __init__(self, searcher, max_workers=4, max_retries=2, retry_delay=2.0, dedup_index=None,
+                 budget=None):
+        self.searcher = searcher
+        self.max_workers = max(1, int(max_workers))
+        self.max_retries = max(0, int(max_retries))
+        self.retry_delay = retry_delay
+        self.dedup_index = dedup_index
+        # งบ credit รวมทุกงาน (None คือไม่จำกัด)
+        self.budget = budget
+
+    def _run_job(self, job, num_results, use_cache, dedup_index):
+        if self.budget is not None and self.budget.exhausted:
+            # ใช้ credit ครบงบแล้ว ไม่เริ่มงานใหม่
+            return None
+        if dedup_index is None:
+            # ตัดรายการซ้ำเฉพาะภายในงานนี้
+            dedup_index = DedupIndex()
+
+        # เก็บหน้าที่ได้รับแล้วข้ามการลองใหม่ เพราะธุรกิจในหน้าเหล่านั้นถูกบันทึกใน dedup_index แล้ว
+        # หากทิ้งไป การลองใหม่จะตัดธุรกิจกลุ่มนั้นออกเป็นรายการซ้ำ
+        buffer = FrameBuffer()
+        attempts = 0
+        error = None
+        while True:
+            attempts += 1
+            try:
+                for page_results in self.searcher.iter_search_results(
+                    job.business_type,
+                    job.location,
+                    num_results,
+                    use_cache=use_cache,
+                    raise_errors=True,
+                    dedup_index=dedup_index,
+                    budget=self.budget,
+                ):
+                    buffer.append(page_results)
+                error = None
+            except Exception as e:
+                error = e
+                # ไม่ลองใหม่เมื่อข้อผิดพลาดลองใหม่ไม่ได้ หรือ circuit breaker เปิดอยู่ (SerpApi ล่ม)
+                if attempts <= self.max_retries and is_retryable(e):
+                    time.sleep(self.retry_delay * attempts)
+                    continue
+            break
+
+        businesses = buffer.to_frame({
+            "ประเภทที่ค้นหา": job.business_type,
+            "จังหวัด": job.province,
+            "อำเภอ": job.district or "ทุกอำเภอ",
+        })
+
+        if error is not None:
+            logger.warning("งาน %r ล้มเหลวหลังลอง %d ครั้ง (ได้ผลลัพธ์บางส่วน %d รายการ): %s",
+                           job, attempts, len(businesses), error)
+            return SweepResult(job, businesses, error=str(error), attempts=attempts)
+
+        return SweepResult(job, businesses, attempts=attempts)
+
+    def run(self, jobs, num_results=20, use_cache=True, per_job_dedup=False):
+        """
+        รันงานทั้งหมดและส่งผลลัพธ์ออกมาทีละงานเมื่อเสร็จ
+
+        ผลลัพธ์ถูก yield ใน thread ของผู้เรียก จึงอัพเดท UI ได้โดยตรง
+
+        Args:
+            jobs (list): รายการ SweepJob
+            num_results (int): จำนวนผลลัพธ์ต่องาน
+            use_cache (bool): ใช้ผลลัพธ์จากแคชหากมี
+            per_job_dedup (bool): ตัดรายการซ้ำเฉพาะภายในแต่ละงาน
+                (ธุรกิจที่อยู่ในหลายงานจะปรากฏในทุกงานที่พบ)
+
+        Yields:
+            SweepResult: ผลลัพธ์ของแต่ละงาน ตามลำดับที่เสร็จ
+                (งานที่ไม่ได้เริ่มเพราะใช้ credit ครบงบจะไม่ถูกส่งออก)
+        """
+        dedup_index = None
+        if not per_job_dedup:
+            dedup_index = self.dedup_index if self.dedup_index is not None else DedupIndex()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._run_job, job, num_results, use_cache, dedup_index)
+                for job in jobs
+            ]
+            try:
+                for future in as_completed(futures):
+                    result = future.result()
+                    if result is not None:
+                        yield result
+            finally:
+                # ผู้เรียกหยุดกลางคัน ให้ยกเลิกงานที่ยังไม่เริ่ม
+                for future in futures:
+                    future.cancel()
+                if dedup_index is not None:
+                    dedup_index.flush()
+
+    def refresh(self, jobs, lead_store, max_age_seconds, num_results=20):
+        """
+        รีเฟรชเฉพาะงานที่ข้อมูลเก่ากว่า max_age_seconds และส่งออกเฉพาะส่วนที่เปลี่ยน
+
+        งานที่ข้อมูลยังใหม่จะถูกข้ามโดยไม่เรียก API ส่วนงานที่ต้องรีเฟรชจะดึงข้อมูลใหม่
+        โดยไม่ใช้แคช และตัดรายการซ้ำเฉพาะภายในงาน เพื่อให้ตรวจธุรกิจที่หายไปของแต่ละงานได้ถูกต้อง
+
+        Args:
+            jobs (list): รายการ SweepJob
+            lead_store (LeadStore): ฐานข้อมูลธุรกิจที่เคยพบ
+            max_age_seconds (float): อายุข้อมูลสูงสุดที่ไม่ต้องรีเฟรช
+            num_results (int): จำนวนผลลัพธ์ต่องาน
+
+        Yields:
+            tuple: (SweepResult, ตารางธุรกิจที่ใหม่/เปลี่ยนแปลง/หายไปของงานนั้น)
+        """
+        stale = lead_store.stale_jobs(jobs, max_age_seconds)
+        logger.info("รีเฟรช %d จาก %d งาน", len(stale), len(jobs))
+
+        for result in self.run(stale, num_results, use_cache=False, per_job_dedup=True):
+            diff = lead_store.apply(result.job, result.businesses, complete=result.ok)
+            yield result, diff
@@ -0,0 +1,85 @@
+import numpy as np
+
+from spatial import haversine_km
+
+
+# คอลัมน์ที่ใช้ค้นหาด้วยข้อความ
+SEARCH_COLUMNS = ("ชื่อธุรกิจ", "ที่อยู่")
+
+# คอลัมน์ที่เรียงลำดับได้ในตารางผลลัพธ์
+SORTABLE_COLUMNS = ("คะแนนรีวิว", "จำนวนรีวิว", "ชื่อธุรกิจ", "ประเภทธุรกิจ")
+
+
+def _mask(series):
+    return series.fillna(False).to_numpy(dtype=bool)
+
+
+def select_rows(df, text=None, min_rating=None, has_phone=False, has_website=False, category=None,
+                near=None, sort_by=None, descending=True):
+    """
+    กรองและเรียงตารางผลลัพธ์ โดยคืนเฉพาะตำแหน่งแถว (ไม่คัดลอกข้อมูลทั้งตาราง)
+
+    ผู้เรียกเก็บตำแหน่งไว้ แล้วดึงเฉพาะแถวของหน้าที่แสดงด้วย df.iloc
+
+    Args:
+        df (pd.DataFrame): ตารางข้อมูลธุรกิจ
+        text (str): คำที่อยู่ในชื่อหรือที่อยู่ (ไม่สนตัวพิมพ์เล็ก/ใหญ่)
+        min_rating (float): คะแนนรีวิวขั้นต่ำ
+        has_phone (bool): เฉพาะธุรกิจที่มีเบอร์โทร
+        has_website (bool): เฉพาะธุรกิจที่มีเว็บไซต์
+        category (str): ประเภทธุรกิจจาก Google Maps
+        near (tuple): เฉพาะธุรกิจในรัศมี (lat, lng, กิโลเมตร)
+        sort_by (str): คอลัมน์ที่ใช้เรียง (None คือลำดับเดิม)
+        descending (bool): เรียงจากมากไปน้อย
+
+    Returns:
+        np.ndarray: ตำแหน่งแถวที่ตรงเงื่อนไข ตามลำดับที่เรียงแล้ว
+    """
+    mask = np.ones(len(df), dtype=bool)
+
+    if text:
+        needle = text.lower()
+        found = np.zeros(len(df), dtype=bool)
+        for column in SEARCH_COLUMNS:
+            if column in df.columns:
+                found |= _mask(df[column].str.lower().str.contains(needle, regex=False))
+        mask &= found
+    if min_rating is not None:
+        mask &= _mask(df["คะแนนรีวิว"] >= min_rating)
+    if has_phone:
+        mask &= df["เบอร์โทรศัพท์"].notna().to_numpy()
+    if has_website:
+        mask &= df["เว็บไซต์"].notna().to_numpy()
+    if category:
+        mask &= _mask(df["ประเภทธุรกิจ"] == category)
+    if near:
+        lat, lng, radius_km = near
+        distances = haversine_km(df["พิกัด_lat"].to_numpy(dtype=float, na_value=np.nan),
+                                 df["พิกัด_lng"].to_numpy(dtype=float, na_value=np.nan), lat, lng)
+        # ธุรกิจที่ไม่มีพิกัดได้ระยะทาง NaN จึงไม่ผ่านเงื่อนไข
+        mask &= distances <= radius_km
+
+    positions = np.flatnonzero(mask)
+    if sort_by and len(positions):
+        values = df[sort_by].iloc[positions].reset_index(drop=True)
+        order = values.sort_values(ascending=not descending, na_position="last", kind="stable").index
+        positions = positions[order.to_numpy()]
+    return positions
+
+
+def page_bounds(page, page_size, total):
+    """
+    ช่วงตำแหน่งของหน้าที่กำหนด
+
+    Args:
+        page (int): หน้าที่ต้องการ (เริ่มที่ 1)
+        page_size (int): จำนวนรายการต่อหน้า
+        total (int): จำนวนรายการทั้งหมด
+
+    Returns:
+        tuple: (ตำแหน่งเริ่มต้น, ตำแหน่งสิ้นสุดแบบไม่รวม, จำนวนหน้าทั้งหมด)
+    """
+    pages = max(1, -(-total // page_size))
+    page = min(max(1, page), pages)
+    start = (page - 1) * page_size
+    return start, min(start + page_size, total), pages
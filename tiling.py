@@ -0,0 +1,456 @@
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from dedup import DedupIndex
+
+
+logger = logging.getLogger(__name__)
+
+# ขอบเขตโดยประมาณของแต่ละจังหวัด (ใต้, ตะวันตก, เหนือ, ตะวันออก)
+PROVINCE_BOUNDS = {
+    "กรุงเทพมหานคร": (13.49, 100.33, 13.96, 100.94),
+    "กระบี่": (7.45, 98.60, 8.65, 99.35),
+    "กาญจนบุรี": (13.70, 98.20, 15.65, 99.90),
+    "กาฬสินธุ์": (16.10, 103.20, 17.25, 104.10),
+    "กำแพงเพชร": (15.75, 99.00, 16.95, 100.10),
+    "ขอนแก่น": (15.65, 101.70, 17.10, 103.10),
+    "จันทบุรี": (12.20, 101.70, 13.45, 102.60),
+    "ฉะเชิงเทรา": (13.10, 100.90, 14.00, 102.05),
+    "ชลบุรี": (12.50, 100.70, 13.60, 101.75),
+    "ชัยนาท": (14.90, 99.70, 15.40, 100.40),
+    "ชัยภูมิ": (15.30, 101.10, 16.75, 102.40),
+    "ชุมพร": (9.55, 98.75, 11.10, 99.50),
+    "เชียงราย": (19.10, 99.25, 20.47, 100.60),
+    "เชียงใหม่": (17.25, 98.05, 20.15, 99.60),
+    "ตรัง": (6.95, 99.20, 7.95, 99.95),
+    "ตราด": (11.60, 102.25, 12.70, 102.95),
+    "ตาก": (15.15, 97.35, 17.65, 99.20),
+    "นครนายก": (14.00, 100.90, 14.45, 101.50),
+    "นครปฐม": (13.60, 99.85, 14.15, 100.35),
+    "นครพนม": (16.90, 103.95, 18.15, 104.85),
+    "นครราชสีมา": (14.10, 101.20, 15.80, 102.95),
+    "นครศรีธรรมราช": (7.75, 99.25, 9.35, 100.40),
+    "นครสวรรค์": (15.05, 99.35, 16.10, 100.85),
+    "นนทบุรี": (13.78, 100.25, 14.15, 100.56),
+    "นราธิวาส": (5.60, 101.30, 6.55, 102.10),
+    "น่าน": (17.95, 100.35, 19.65, 101.40),
+    "บึงกาฬ": (17.75, 103.25, 18.50, 104.25),
+    "บุรีรัมย์": (14.10, 102.45, 15.75, 103.50),
+    "ปทุมธานี": (13.90, 100.30, 14.30, 101.00),
+    "ประจวบคีรีขันธ์": (10.95, 99.10, 12.65, 100.05),
+    "ปราจีนบุรี": (13.55, 101.20, 14.45, 102.15),
+    "ปัตตานี": (6.45, 100.95, 7.00, 101.75),
+    "พระนครศรีอยุธยา": (14.05, 100.30, 14.70, 100.85),
+    "พะเยา": (18.75, 99.60, 19.75, 100.60),
+    "พังงา": (8.10, 97.60, 9.35, 98.75),
+    "พัทลุง": (7.15, 99.75, 7.95, 100.40),
+    "พิจิตร": (15.85, 99.90, 16.70, 100.75),
+    "พิษณุโลก": (16.30, 99.85, 17.75, 101.10),
+    "เพชรบุรี": (12.55, 99.15, 13.40, 100.10),
+    "เพชรบูรณ์": (15.40, 100.70, 17.20, 101.75),
+    "แพร่": (17.65, 99.60, 18.70, 100.65),
+    "ภูเก็ต": (7.75, 98.25, 8.20, 98.50),
+    "มหาสารคาม": (15.45, 102.85, 16.45, 103.55),
+    "มุกดาหาร": (16.05, 104.05, 16.95, 104.85),
+    "แม่ฮ่องสอน": (17.60, 97.35, 19.80, 98.65),
+    "ยโสธร": (15.40, 104.00, 16.35, 104.70),
+    "ยะลา": (5.60, 100.90, 6.65, 101.75),
+    "ร้อยเอ็ด": (15.45, 103.25, 16.55, 104.35),
+    "ระนอง": (9.35, 98.35, 10.85, 98.95),
+    "ระยอง": (12.55, 100.90, 13.15, 101.90),
+    "ราชบุรี": (13.15, 99.15, 13.95, 100.05),
+    "ลพบุรี": (14.60, 100.40, 15.55, 101.45),
+    "ลำปาง": (17.20, 98.95, 19.55, 100.20),
+    "ลำพูน": (17.25, 98.50, 18.75, 99.40),
+    "เลย": (16.85, 100.80, 18.00, 102.30),
+    "ศรีสะเกษ": (14.20, 103.90, 15.50, 105.00),
+    "สกลนคร": (16.85, 103.05, 17.95, 104.40),
+    "สงขลา": (6.30, 100.05, 7.95, 101.10),
+    "สตูล": (6.40, 99.20, 7.20, 100.25),
+    "สมุทรปราการ": (13.45, 100.45, 13.75, 100.95),
+    "สมุทรสงคราม": (13.25, 99.85, 13.50, 100.10),
+    "สมุทรสาคร": (13.40, 100.05, 13.75, 100.45),
+    "สระแก้ว": (13.20, 101.85, 14.25, 103.00),
+    "สระบุรี": (14.25, 100.70, 15.05, 101.40),
+    "สิงห์บุรี": (14.75, 100.15, 15.10, 100.45),
+    "สุโขทัย": (16.70, 99.30, 17.85, 100.15),
+    "สุพรรณบุรี": (14.10, 99.30, 15.10, 100.30),
+    "สุราษฎร์ธานี": (8.35, 98.45, 10.15, 100.15),
+    "สุรินทร์": (14.30, 103.00, 15.55, 104.10),
+    "หนองคาย": (17.45, 102.05, 18.25, 103.45),
+    "หนองบัวลำภู": (16.90, 101.95, 17.70, 102.75),
+    "อ่างทอง": (14.45, 100.20, 14.85, 100.55),
+    "อำนาจเจริญ": (15.60, 104.35, 16.20, 105.20),
+    "อุดรธานี": (16.75, 102.05, 18.10, 103.60),
+    "อุตรดิตถ์": (17.15, 99.90, 18.25, 101.15),
+    "อุทัยธานี": (14.95, 98.90, 15.75, 100.10),
+    "อุบลราชธานี": (14.20, 104.35, 16.10, 105.65),
+}
+
+# ความกว้าง viewport (องศา) ที่ zoom 0 สำหรับหน้าจอกว้างประมาณ 1024px
+VIEWPORT_DEGREES_AT_ZOOM_0 = 360.0 * 1024 / 256
+MIN_ZOOM = 8
+MAX_ZOOM = 18
+
+
+class BoundingBox:
+    """
+    กรอบพื้นที่สี่เหลี่ยมในพิกัดละติจูด/ลองจิจูด
+    """
+
+    def __init__(self, south, west, north, east):
+        self.south = south
+        self.west = west
+        self.north = north
+        self.east = east
+
+    @classmethod
+    def from_points(cls, points, padding=0.02):
+        """
+        สร้างกรอบที่ครอบทุกจุด พร้อมเผื่อขอบ
+
+        Args:
+            points (list): รายการ (lat, lng)
+            padding (float): ระยะเผื่อขอบ (องศา)
+
+        Returns:
+            BoundingBox: กรอบพื้นที่ หรือ None หากไม่มีจุด
+        """
+        points = list(points)
+        if not points:
+            return None
+        lats = [lat for lat, _ in points]
+        lngs = [lng for _, lng in points]
+        return cls(min(lats) - padding, min(lngs) - padding, max(lats) + padding, max(lngs) + padding)
+
+    @property
+    def center(self):
+        return ((self.south + self.north) / 2, (self.west + self.east) / 2)
+
+    @property
+    def lat_span(self):
+        return self.north - self.south
+
+    @property
+    def lng_span(self):
+        return self.east - self.west
+
+    def contains(self, lat, lng):
+        return self.south <= lat <= self.north and self.west <= lng <= self.east
+
+    def intersect(self, other):
+        """ส่วนที่ซ้อนทับกับกรอบอื่น (None หากไม่ซ้อนทับ)"""
+        south, west = max(self.south, other.south), max(self.west, other.west)
+        north, east = min(self.north, other.north), min(self.east, other.east)
+        if south >= north or west >= east:
+            return None
+        return BoundingBox(south, west, north, east)
+
+    def split(self, rows, cols):
+        """
+        แบ่งกรอบออกเป็นตาราง rows × cols
+
+        Returns:
+            list: รายการ BoundingBox ย่อย
+        """
+        lat_step = self.lat_span / rows
+        lng_step = self.lng_span / cols
+        return [
+            BoundingBox(
+                self.south + row * lat_step,
+                self.west + col * lng_step,
+                self.south + (row + 1) * lat_step,
+                self.west + (col + 1) * lng_step,
+            )
+            for row in range(rows)
+            for col in range(cols)
+        ]
+
+    def quadrants(self):
+        """แบ่งกรอบออกเป็น 4 ส่วนเท่ากัน"""
+        return self.split(2, 2)
+
+    def zoom(self):
+        """ระดับ zoom ที่ทำให้ viewport ครอบกรอบนี้พอดี"""
+        span = max(self.lat_span, self.lng_span, 1e-6)
+        zoom = int(math.floor(math.log2(VIEWPORT_DEGREES_AT_ZOOM_0 / span)))
+        return max(MIN_ZOOM, min(MAX_ZOOM, zoom))
+
+    @property
+    def key(self):
+        """ค่าระบุช่อง (แปลงเป็น JSON ได้) สำหรับจับคู่ช่องกับ checkpoint"""
+        return [round(self.south, 6), round(self.west, 6), round(self.north, 6), round(self.east, 6)]
+
+    def to_ll(self):
+        """แปลงเป็นพารามิเตอร์ ll ของ SerpApi ในรูปแบบ "@lat,lng,zoomz" """
+        lat, lng = self.center
+        return f"@{lat:.6f},{lng:.6f},{self.zoom()}z"
+
+    def __repr__(self):
+        return f"BoundingBox({self.south:.4f}, {self.west:.4f}, {self.north:.4f}, {self.east:.4f})"
+
+
+def province_bounds(province):
+    """
+    กรอบพื้นที่โดยประมาณของจังหวัด
+
+    Args:
+        province (str): ชื่อจังหวัด
+
+    Returns:
+        BoundingBox: กรอบพื้นที่ หรือ None หากไม่มีข้อมูล
+    """
+    bounds = PROVINCE_BOUNDS.get(province)
+    return BoundingBox(*bounds) if bounds else None
+
+
+def initial_grid(bbox, tile_km=25.0, max_tiles=16):
+    """
+    แบ่งกรอบพื้นที่เป็นตารางเริ่มต้นที่แต่ละช่องกว้างประมาณ tile_km กิโลเมตร
+
+    จำนวนช่องเริ่มต้นถูกจำกัดไว้ที่ max_tiles เพราะพื้นที่หนาแน่นจะถูกแบ่งย่อยภายหลังอยู่แล้ว
+    การเริ่มจากตารางหยาบจึงใช้ API call น้อยกว่าในพื้นที่ที่มีธุรกิจเบาบาง
+
+    Args:
+        bbox (BoundingBox): กรอบพื้นที่
+        tile_km (float): ความกว้างของแต่ละช่อง (กิโลเมตร)
+        max_tiles (int): จำนวนช่องเริ่มต้นสูงสุด
+
+    Returns:
+        list: รายการ BoundingBox
+    """
+    lat, _ = bbox.center
+    km_per_lat = 110.574
+    km_per_lng = 111.320 * math.cos(math.radians(lat))
+    rows = max(1, round(bbox.lat_span * km_per_lat / tile_km))
+    cols = max(1, round(bbox.lng_span * km_per_lng / tile_km))
+
+    if rows * cols > max_tiles:
+        scale = math.sqrt(max_tiles / (rows * cols))
+        rows = max(1, int(rows * scale))
+        cols = max(1, int(cols * scale))
+
+    return bbox.split(rows, cols)
+
+
+class TileSearchStats:
+    """
+    สถิติการค้นหาแบบแบ่งพื้นที่
+    """
+
+    def __init__(self):
+        self.tiles_searched = 0
+        self.tiles_subdivided = 0
+        self.tiles_failed = 0
+        self.duplicates = 0
+        self.truncated = False
+
+
+class TileResult:
+    """
+    ผลลัพธ์ของการค้นหาหนึ่งช่อง
+    """
+
+    def __init__(self, tile, depth, results, duplicates, full, error=None, pending=0):
+        self.tile = tile
+        self.depth = depth
+        # ผลลัพธ์ดิบที่ไม่ซ้ำกับช่องก่อนหน้า
+        self.results = results
+        self.duplicates = duplicates
+        self.full = full
+        self.error = error
+        # จำนวนช่องที่รอค้นหาต่อ (ช่องที่เหลือในระดับนี้และช่องย่อยที่แบ่งแล้ว)
+        self.pending = pending
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class TileSearcher:
+    """
+    ค้นหาแบบแบ่งพื้นที่เป็นตาราง (geo-grid tiling)
+
+    ค้นหาแต่ละช่องพร้อมกัน ช่องที่ได้ผลลัพธ์เต็มเพดานของ Google Maps
+    จะถูกแบ่งเป็น 4 ช่องย่อยแล้วค้นหาซ้ำ จนกว่าจะไม่เต็มหรือถึงความลึกสูงสุด
+    เพื่อประหยัด API call ช่องที่ยังแบ่งต่อได้จะดึงเพียงหน้าแรก
+    ส่วนช่องที่ความลึกสูงสุดจะดึงครบทุกหน้า
+    """
+
+    def __init__(self, searcher, max_workers=4, max_depth=3, max_tiles=200, tile_km=25.0,
+                 page_size=20, budget=None):
+        self.searcher = searcher
+        self.max_workers = max(1, int(max_workers))
+        self.max_depth = max_depth
+        self.max_tiles = max_tiles
+        self.tile_km = tile_km
+        self.page_size = page_size
+        # งบ credit รวมทุกช่อง (None คือไม่จำกัด)
+        self.budget = budget
+
+    def _search_tile(self, query, tile, limit, use_cache):
+        params = self.searcher.build_params(query, None, limit, ll=tile.to_ll())
+        local_results, has_more = self.searcher.fetch_local_results(
+            params, limit, use_cache, raise_errors=True, budget=self.budget
+        )
+        # ตัดผลลัพธ์ที่อยู่นอกช่องออก เพื่อไม่ให้ช่องข้างเคียงนับซ้ำ
+        inside = [
+            result for result in local_results
+            if self._in_tile(result, tile)
+        ]
+        full = has_more and len(local_results) >= limit
+        return inside, full
+
+    @staticmethod
+    def _in_tile(result, tile):
+        coords = result.get("gps_coordinates") or {}
+        lat, lng = coords.get("latitude"), coords.get("longitude")
+        if lat is None or lng is None:
+            return True
+        return tile.contains(lat, lng)
+
+    def resolve_bounds(self, query, province, district=None, use_cache=True):
+        """
+        หากรอบพื้นที่ของจังหวัดหรืออำเภอ
+
+        อำเภอ (และจังหวัดที่ไม่มีใน PROVINCE_BOUNDS) ไม่มีข้อมูลขอบเขต
+        จึงค้นหาหนึ่งหน้าก่อนแล้วใช้พิกัดของผลลัพธ์เป็นกรอบ
+
+        Args:
+            query (str): คำค้นหา
+            province (str): ชื่อจังหวัด
+            district (str): ชื่ออำเภอ (ถ้ามี)
+            use_cache (bool): ใช้ผลลัพธ์จากแคชหากมี
+
+        Returns:
+            BoundingBox: กรอบพื้นที่ หรือ None หากหาไม่ได้
+        """
+        bbox = province_bounds(province)
+        if bbox and not district:
+            return bbox
+
+        seed_ll = bbox.to_ll() if bbox else None
+        location = f"{district}, {province}" if district else province
+        params = self.searcher.build_params(query, location, 20, ll=seed_ll)
+        local_results, _ = self.searcher.fetch_local_results(
+            params, 20, use_cache, raise_errors=True, budget=self.budget
+        )
+        points = [
+            (r["gps_coordinates"]["latitude"], r["gps_coordinates"]["longitude"])
+            for r in local_results
+            if r.get("gps_coordinates", {}).get("latitude") is not None
+        ]
+        if bbox:
+            points = [point for point in points if bbox.contains(*point)]
+        if len(points) < 2:
+            return bbox
+
+        seed_bbox = BoundingBox.from_points(points)
+        return seed_bbox.intersect(bbox) if bbox else seed_bbox
+
+    def search(self, query, bbox, per_tile=60, use_cache=True, dedup_index=None):
+        """
+        ค้นหาทุกช่องในกรอบพื้นที่ และตัดผลลัพธ์ที่ซ้ำกันออก
+
+        Args:
+            query (str): คำค้นหา
+            bbox (BoundingBox): กรอบพื้นที่
+            per_tile (int): จำนวนผลลัพธ์สูงสุดต่อช่อง (เพดานต่อคำค้นหา)
+            use_cache (bool): ใช้ผลลัพธ์จากแคชหากมี
+            dedup_index (DedupIndex): ดัชนีตัดรายการซ้ำ (ถ้าไม่ระบุจะสร้างใหม่)
+
+        Returns:
+            tuple: (รายการผลลัพธ์ดิบที่ไม่ซ้ำ, TileSearchStats)
+        """
+        stats = TileSearchStats()
+        if dedup_index is None:
+            dedup_index = DedupIndex()
+        unique_results = []
+        for result in self.iter_search(query, bbox, per_tile, use_cache, dedup_index, stats):
+            unique_results.extend(result.results)
+        dedup_index.flush()
+        return unique_results, stats
+
+    def iter_search(self, query, bbox, per_tile=60, use_cache=True, dedup_index=None, stats=None,
+                    done=None):
+        """
+        ค้นหาทุกช่องในกรอบพื้นที่ และส่งผลลัพธ์ออกมาทีละช่องตามลำดับการค้นหา
+
+        ลำดับช่องขึ้นกับกรอบพื้นที่และช่องที่ถูกแบ่งเท่านั้น
+        จึงทำต่อจากช่องที่ค้นหาแล้วได้ (ส่งสถานะของช่องเหล่านั้นใน done)
+
+        Args:
+            query (str): คำค้นหา
+            bbox (BoundingBox): กรอบพื้นที่
+            per_tile (int): จำนวนผลลัพธ์สูงสุดต่อช่อง (เพดานต่อคำค้นหา)
+            use_cache (bool): ใช้ผลลัพธ์จากแคชหากมี
+            dedup_index (DedupIndex): ดัชนีตัดรายการซ้ำ (ถ้าไม่ระบุจะสร้างใหม่)
+            stats (TileSearchStats): สถิติที่อัพเดทระหว่างค้นหา (รวมช่องใน done)
+            done (dict): ช่องที่ค้นหาแล้ว {BoundingBox.key เป็น tuple: (full, ล้มเหลวหรือไม่)}
+                ช่องเหล่านี้ไม่ถูกค้นหาซ้ำ แต่ยังถูกแบ่งต่อตามสถานะเดิม
+
+        Yields:
+            TileResult: ผลลัพธ์ของช่องที่ค้นหาใหม่
+        """
+        if stats is None:
+            stats = TileSearchStats()
+        if dedup_index is None:
+            dedup_index = DedupIndex()
+        done = done or {}
+        level = initial_grid(bbox, self.tile_km)
+        depth = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while level:
+                remaining = self.max_tiles - stats.tiles_searched
+                if remaining <= 0:
+                    stats.truncated = True
+                    break
+                if len(level) > remaining:
+                    level = level[:remaining]
+                    stats.truncated = True
+
+                limit = self.page_size if depth < self.max_depth else per_tile
+                futures = [
+                    (tile, None if tuple(tile.key) in done
+                     else executor.submit(self._search_tile, query, tile, limit, use_cache))
+                    for tile in level
+                ]
+
+                next_level = []
+                try:
+                    for index, (tile, future) in enumerate(futures):
+                        stats.tiles_searched += 1
+                        error = None
+                        tile_results, new_results = [], []
+                        if future is None:
+                            full, failed = done[tuple(tile.key)]
+                            stats.tiles_failed += failed
+                        else:
+                            try:
+                                tile_results, full = future.result()
+                            except Exception as e:
+                                logger.warning("ค้นหาช่อง %r ไม่สำเร็จ: %s", tile, e)
+                                stats.tiles_failed += 1
+                                error, full = str(e), False
+                            new_results = dedup_index.filter_new(tile_results)
+                            stats.duplicates += len(tile_results) - len(new_results)
+
+                        if full and depth < self.max_depth:
+                            stats.tiles_subdivided += 1
+                            next_level.extend(tile.quadrants())
+
+                        if future is not None:
+                            yield TileResult(
+                                tile, depth, new_results, len(tile_results) - len(new_results), full, error,
+                                pending=len(futures) - index - 1 + len(next_level),
+                            )
+                finally:
+                    # ผู้เรียกหยุดกลางทาง (เช่น ยกเลิกงาน) ไม่ต้องค้นหาช่องที่เหลือ
+                    for _, future in futures:
+                        if future is not None:
+                            future.cancel()
+
+                level = next_level
+                depth += 1
@@ -0,0 +1,170 @@
+import importlib.util
+import logging
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger(__name__)
+
+# ปลายทางของ SerpApi (เปลี่ยนเป็น fixture server สำหรับทดสอบในเครื่องได้)
+SERPAPI_BASE_URL = os.getenv('SERPAPI_BASE_URL', 'https://serpapi.com')
+SERPAPI_CONNECT_TIMEOUT = float(os.getenv('SERPAPI_CONNECT_TIMEOUT', '5'))
+SERPAPI_READ_TIMEOUT = float(os.getenv('SEARCH_TIMEOUT', '30'))
+SERPAPI_POOL_SIZE = int(os.getenv('SERPAPI_POOL_SIZE', '16'))
+SERPAPI_HTTP2 = os.getenv('SERPAPI_HTTP2', 'False').lower() in ('1', 'true', 'yes')
+
+
+class SerpApiError(Exception):
+    """ข้อผิดพลาดจากการเรียก SerpApi"""
+
+    def __init__(self, message, status=None, retryable=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        # None คือให้ตัดสินจาก status (ดู resilience.is_retryable)
+        self.retryable = retryable
+        # เวลาที่ปลายทางขอให้รอก่อนลองใหม่ (วินาที) จาก header Retry-After
+        self.retry_after = retry_after
+        # key ที่ใช้โดนจำกัด/โควตาหมด แต่ยังมี key อื่นให้ลองทันที (ไม่ใช่ความล้มเหลวของ SerpApi)
+        self.rotate_key = False
+        # ข้อผิดพลาดมาจาก SerpApi จริง (False คือเกิดในเครื่องโดยไม่ได้ส่งคำขอ ไม่นับใน circuit breaker)
+        self.upstream = True
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+def _error_message(response):
+    # requests ใช้ reason ส่วน httpx ใช้ reason_phrase
+    reason = getattr(response, "reason", None) or getattr(response, "reason_phrase", None)
+    try:
+        message = response.json().get("error")
+    except (ValueError, AttributeError):
+        message = None
+    return message or reason or f"HTTP {response.status_code}"
+
+
+def parse_response(response):
+    """
+    แปลง response ของ SerpApi (requests หรือ httpx) เป็น dict
+
+    Returns:
+        dict: ผลลัพธ์จาก SerpApi
+
+    Raises:
+        SerpApiError: เมื่อ HTTP status ไม่สำเร็จ หรือเนื้อหาไม่ใช่ JSON
+    """
+    if response.status_code >= 400:
+        raise SerpApiError(
+            _error_message(response),
+            status=response.status_code,
+            retry_after=_retry_after(response),
+        )
+
+    try:
+        return response.json()
+    except ValueError as e:
+        raise SerpApiError("SerpApi ส่งข้อมูลที่ไม่ใช่ JSON", status=response.status_code) from e
+
+
+class SerpApiTransport:
+    """
+    ชั้นเชื่อมต่อ SerpApi ผ่าน requests.Session ที่ใช้ connection ซ้ำ (keep-alive)
+
+    ทุกคำขอใช้ connection pool เดียวกัน จึงไม่ต้อง handshake TCP/TLS ใหม่ทุกหน้า
+    และรับข้อมูลแบบบีบอัด (gzip) โดยอัตโนมัติ
+    """
+
+    def __init__(self, base_url=SERPAPI_BASE_URL, connect_timeout=SERPAPI_CONNECT_TIMEOUT,
+                 read_timeout=SERPAPI_READ_TIMEOUT, pool_size=SERPAPI_POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.headers = {"Accept": "application/json", "Accept-Encoding": "gzip, deflate"}
+        self.session = self._create_session()
+
+    def _create_session(self):
+        # session ที่ใช้ connection ซ้ำ (คลาสลูกเปลี่ยนไลบรารี HTTP ได้โดยใช้การตั้งค่าเดียวกัน)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({**self.headers, "Connection": "keep-alive"})
+        return session
+
+    def get_json(self, params, path="/search.json"):
+        """
+        เรียก SerpApi และแปลงผลลัพธ์เป็น dict
+
+        Args:
+            params (dict): พารามิเตอร์ของคำขอ
+            path (str): path ของ endpoint
+
+        Returns:
+            dict: ผลลัพธ์จาก SerpApi
+
+        Raises:
+            SerpApiError: เมื่อ HTTP status ไม่สำเร็จหรือเชื่อมต่อไม่ได้
+        """
+        return parse_response(self._send(params, path))
+
+    def _send(self, params, path):
+        # ส่งคำขอและคืน response (คลาสลูกเปลี่ยนไลบรารี HTTP ได้ โดยใช้ parse_response ร่วมกัน)
+        try:
+            return self.session.get(self.base_url + path, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise SerpApiError(f"เชื่อมต่อ SerpApi ไม่ได้: {e}") from e
+
+    def close(self):
+        self.session.close()
+
+
+class HttpxTransport(SerpApiTransport):
+    """
+    ชั้นเชื่อมต่อ SerpApi ผ่าน httpx พร้อม HTTP/2 (ใช้เมื่อติดตั้ง httpx และ h2)
+    """
+
+    def _create_session(self):
+        import httpx
+
+        self._httpx = httpx
+        return httpx.Client(
+            http2=True,
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            headers=self.headers,
+        )
+
+    def _send(self, params, path):
+        try:
+            return self.session.get(self.base_url + path, params=params)
+        except self._httpx.HTTPError as e:
+            raise SerpApiError(f"เชื่อมต่อ SerpApi ไม่ได้: {e}") from e
+
+
+def create_transport(base_url=SERPAPI_BASE_URL, http2=SERPAPI_HTTP2):
+    """
+    สร้างชั้นเชื่อมต่อ SerpApi ที่ดีที่สุดที่ใช้ได้ในเครื่องนี้
+
+    ใช้ HTTP/2 ผ่าน httpx เมื่อเปิดใช้และติดตั้ง httpx กับ h2 ไว้ มิฉะนั้นใช้ requests.Session
+
+    Args:
+        base_url (str): ปลายทางของ SerpApi หรือ fixture server
+        http2 (bool): พยายามใช้ HTTP/2
+
+    Returns:
+        SerpApiTransport: ชั้นเชื่อมต่อ
+    """
+    if http2:
+        if importlib.util.find_spec("httpx") and importlib.util.find_spec("h2"):
+            logger.debug("ใช้ httpx (HTTP/2) เชื่อมต่อ %s", base_url)
+            return HttpxTransport(base_url)
+        logger.warning("เปิด SERPAPI_HTTP2 แต่ไม่ได้ติดตั้ง httpx[http2] จึงใช้ HTTP/1.1 ผ่าน requests แทน")
+    return SerpApiTransport(base_url)